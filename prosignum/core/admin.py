@@ -1,8 +1,33 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils import timezone
-from django.db.models import Count, Q
-from unfold.admin import ModelAdmin
-from .models import Municipality, Initiative, Participant, Signature
+from django.utils.html import format_html, format_html_join
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from unfold.admin import ModelAdmin, TabularInline
+from unfold.decorators import action
+from .models import (
+    Municipality, PostalCode, Initiative, Participant, Signature, PaperSignatureBatch, PaperSignature, SignatureCount,
+    InitiativeResult, Job, RetentionPolicy, ReviewSample, IntakeAnomaly,
+)
+from .admin_pagination import EstimatedCountPaginator, LargeTableAdminMixin
+from .aggregates import transition_signatures
+from .finalization import initiative_is_finalized, lock_initiatives, verify_result
+from .jobs import cancel_jobs, enqueue, retry_jobs
+from .normalization import ahv_hash, name_hash
+from .sampling import discard_samples, review_result, with_review_counts
+from .search import normalize_ahv_number
+from .slow_queries import clear_queries, recent_queries, top_offenders
+from .review_queue import (
+    claim_review_batch, leased_to_other_q, release_review_batch, reviewer_municipality_ids,
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,12 +53,38 @@ class MunicipalityAdmin(ModelAdmin):
         return request.user.is_superuser
 
 
+@admin.register(PostalCode)
+class PostalCodeAdmin(ModelAdmin):
+    list_display = ['postal_code', 'locality', 'municipality', 'import_version']
+    list_filter = ['municipality__canton']
+    search_fields = ['=postal_code', 'locality']
+    list_select_related = ['municipality']
+    ordering = ['postal_code', 'locality']
+
+    def has_add_permission(self, request):
+        # Postal codes are maintained by the AMTOVZ import
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+
+class RetentionPolicyInline(TabularInline):
+    model = RetentionPolicy
+    extra = 0
+
+
 @admin.register(Initiative)
 class InitiativeAdmin(ModelAdmin):
     list_display = ['title', 'status', 'creator', 'created_at', 'total_signatures', 'pending_signatures', 'get_progress']
     list_filter = ['status', 'created_at']
     search_fields = ['title', 'description']
-    readonly_fields = ['created_at', 'updated_at', 'total_signatures', 'get_progress', 'signatures_by_municipality']
+    readonly_fields = ['created_at', 'updated_at', 'archived_at', 'total_signatures', 'get_progress', 'signatures_by_municipality']
+    inlines = [RetentionPolicyInline]
+    actions = ['apply_retention', 'draw_review_samples']
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'description', 'url', 'banner_image', 'status')
@@ -42,7 +93,7 @@ class InitiativeAdmin(ModelAdmin):
             'fields': ('collection_start_date', 'collection_end_date', 'target_signatures')
         }),
         ('Metadata', {
-            'fields': ('creator', 'created_at', 'updated_at', 'closed_at'),
+            'fields': ('creator', 'created_at', 'updated_at', 'closed_at', 'archived_at'),
             'classes': ('collapse',)
         }),
         ('Statistics', {
@@ -51,8 +102,25 @@ class InitiativeAdmin(ModelAdmin):
         }),
     )
 
+    # Rows shown inline on the change form, the full table is paginated separately
+    municipality_preview_rows = 25
+    municipality_page_size = 100
+
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        # Signature counts for all initiatives on a page from the maintained aggregates
+        def count_of(status):
+            return Coalesce(Subquery(
+                SignatureCount.objects
+                .filter(initiative=OuterRef('pk'), status=status)
+                .values('initiative')
+                .annotate(total=Sum('count'))
+                .values('total')
+            ), 0)
+
+        qs = super().get_queryset(request).annotate(
+            accepted_count=count_of('accepted'),
+            pending_count=count_of('pending'),
+        )
         if request.user.is_superuser:
             return qs
         # Users with view permission can see initiatives
@@ -60,10 +128,35 @@ class InitiativeAdmin(ModelAdmin):
             return qs
         return qs.none()
 
+    def get_urls(self):
+        urls = [
+            path(
+                '<path:object_id>/municipalities/',
+                self.admin_site.admin_view(self.municipalities_view),
+                name='core_initiative_municipalities',
+            ),
+        ]
+        return urls + super().get_urls()
+
     def has_add_permission(self, request):
         # Only superusers can add initiatives
         return request.user.is_superuser
 
+    def apply_retention(self, request, queryset):
+        archived = queryset.filter(status='archived')
+        for initiative in archived:
+            enqueue('apply_retention', {'initiative_id': initiative.pk}, created_by=request.user)
+        self.message_user(request, f'Anonymization of {archived.count()} archived initiative(s) queued.')
+    apply_retention.short_description = 'Anonymize signer data due for retention (archived only)'
+    apply_retention.allowed_permissions = ['change']
+
+    def draw_review_samples(self, request, queryset):
+        for initiative in queryset:
+            enqueue('draw_review_samples', {'initiative_id': initiative.pk}, created_by=request.user)
+        self.message_user(request, f'Drawing review samples for {queryset.count()} initiative(s) queued.')
+    draw_review_samples.short_description = 'Draw review samples per municipality'
+    draw_review_samples.allowed_permissions = ['change']
+
     def has_change_permission(self, request, obj=None):
         # Only superusers can change initiatives
         return request.user.is_superuser
@@ -77,37 +170,96 @@ class InitiativeAdmin(ModelAdmin):
             obj.creator = request.user
         super().save_model(request, obj, form, change)
 
-    def total_signatures(self, obj):
+    def _accepted_count(self, obj):
+        if hasattr(obj, 'accepted_count'):
+            return obj.accepted_count
         return obj.get_total_signatures()
+
+    def total_signatures(self, obj):
+        return self._accepted_count(obj)
     total_signatures.short_description = 'Total Accepted Signatures'
+    total_signatures.admin_order_field = 'accepted_count'
 
     def pending_signatures(self, obj):
+        if hasattr(obj, 'pending_count'):
+            return obj.pending_count
         return obj.signatures.filter(status='pending').count()
     pending_signatures.short_description = 'Total Pending'
+    pending_signatures.admin_order_field = 'pending_count'
 
     def get_progress(self, obj):
-        percentage = obj.get_progress_percentage()
-        return f"{percentage}% ({obj.get_total_signatures()}/{obj.target_signatures})"
+        total = self._accepted_count(obj)
+        percentage = obj.get_progress_percentage(total)
+        return f"{percentage}% ({total}/{obj.target_signatures})"
     get_progress.short_description = 'Progress'
 
+    def _municipality_rows(self, obj):
+        """Accepted signatures per municipality, cached for INITIATIVE_STATS_CACHE_TIMEOUT"""
+        key = f'core:initiative:{obj.pk}:signatures_by_municipality'
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(obj.get_signatures_by_municipality())
+            cache.set(key, rows, settings.INITIATIVE_STATS_CACHE_TIMEOUT)
+        return rows
+
+    def _municipality_table(self, rows):
+        return format_html(
+            "<table style='width:100%'><tr><th>Municipality</th><th>Count</th></tr>{}</table>",
+            format_html_join(
+                '',
+                "<tr><td>{} ({})</td><td>{}</td></tr>",
+                ((row['municipality__name'], row['municipality__canton'], row['count']) for row in rows),
+            ),
+        )
+
     def signatures_by_municipality(self, obj):
-        results = obj.get_signatures_by_municipality()
-        if not results:
+        if not obj.pk:
             return "No accepted signatures yet"
-        output = "<table style='width:100%'><tr><th>Municipality</th><th>Count</th></tr>"
-        for result in results:
-            output += f"<tr><td>{result['municipality__name']} ({result['municipality__canton']})</td><td>{result['count']}</td></tr>"
-        output += "</table>"
-        return output
+        rows = self._municipality_rows(obj)
+        if not rows:
+            return "No accepted signatures yet"
+        table = self._municipality_table(rows[:self.municipality_preview_rows])
+        if len(rows) <= self.municipality_preview_rows:
+            return table
+        url = reverse('admin:core_initiative_municipalities', args=[obj.pk])
+        return format_html("{}<p><a href='{}'>Show all {} municipalities</a></p>", table, url, len(rows))
     signatures_by_municipality.short_description = 'Signatures by Municipality'
-    signatures_by_municipality.allow_tags = True
+
+    def municipalities_view(self, request, object_id):
+        """Paginated table of accepted signatures per municipality"""
+        obj = get_object_or_404(self.get_queryset(request), pk=object_id)
+        if not self.has_view_permission(request, obj):
+            raise PermissionDenied
+
+        paginator = Paginator(self._municipality_rows(obj), self.municipality_page_size)
+        page = paginator.get_page(request.GET.get('p'))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': obj,
+            'title': f'Signatures by Municipality: {obj}',
+            'page': page,
+            'page_range': paginator.get_elided_page_range(page.number),
+            'table': self._municipality_table(page.object_list),
+        }
+        return TemplateResponse(request, 'admin/core/initiative/signatures_by_municipality.html', context)
 
 
 @admin.register(Participant)
 class ParticipantAdmin(ModelAdmin):
     list_display = ['get_full_name', 'ahv_number', 'get_birth_date', 'created_at']
-    search_fields = ['swiyu_profile__given_name', 'swiyu_profile__family_name', 'user__username', 'ahv_number']
+    # Names are served by trigram indexes, AHV numbers (blind index) and usernames by exact lookups
+    search_fields = ['swiyu_profile__given_name', 'swiyu_profile__family_name']
     readonly_fields = ['user', 'swiyu_profile', 'ahv_number', 'created_at', 'updated_at']
+    list_select_related = ['swiyu_profile']
+
+    def get_search_results(self, request, queryset, search_term):
+        if normalize_ahv_number(search_term):
+            return queryset.filter(ahv_number_index=ahv_hash(search_term)), False
+        if search_term.strip().startswith('swiyu_'):
+            return queryset.filter(user__username=search_term.strip()), False
+        return super().get_search_results(request, queryset, search_term)
 
     def get_full_name(self, obj):
         return f"{obj.swiyu_profile.given_name} {obj.swiyu_profile.family_name}"
@@ -130,13 +282,67 @@ class ParticipantAdmin(ModelAdmin):
         return request.user.is_superuser
 
 
+class ReviewBatchFilter(admin.SimpleListFilter):
+    title = 'Review batch'
+    parameter_name = 'review_batch'
+
+    def lookups(self, request, model_admin):
+        return [('mine', 'My current batch')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'mine':
+            return queryset.filter(
+                review_lease_owner=request.user,
+                review_lease_expires_at__gte=timezone.now(),
+            )
+        return queryset
+
+
+class ReviewSampleFilter(admin.SimpleListFilter):
+    title = 'Review sample'
+    parameter_name = 'review_sample'
+
+    def lookups(self, request, model_admin):
+        samples = ReviewSample.objects.filter(status='open').select_related('municipality')
+        if not request.user.is_superuser:
+            samples = samples.filter(municipality_id__in=reviewer_municipality_ids(request.user))
+        return [(str(sample.pk), f'#{sample.pk} {sample.municipality.name}') for sample in samples[:50]]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(review_samples=self.value())
+        return queryset
+
+
+def _name_search_filter(search_term):
+    """
+    Exact (case- and accent-insensitive) match of a search term on the signer's name
+
+    A single name matches the given or family name, "Given Family" and
+    "Family Given" match both; multi-word names like "von Arx" match as a
+    whole. Returns None for an empty term.
+    """
+    words = search_term.split()
+    if not words:
+        return None
+    whole = name_hash(search_term)
+    q = Q(family_name_index=whole) | Q(given_name_index=whole)
+    for split in range(1, len(words)):
+        first, second = name_hash(' '.join(words[:split])), name_hash(' '.join(words[split:]))
+        q |= Q(given_name_index=first, family_name_index=second) | Q(family_name_index=first, given_name_index=second)
+    return q
+
+
 @admin.register(Signature)
-class SignatureAdmin(ModelAdmin):
+class SignatureAdmin(LargeTableAdminMixin, ModelAdmin):
     list_display = ['get_participant_name', 'initiative', 'municipality', 'status', 'signed_at']
-    list_filter = ['status', 'municipality__canton', 'signed_at']
-    search_fields = ['participant__swiyu_profile__given_name', 'participant__swiyu_profile__family_name', 'initiative__title']
-    readonly_fields = ['participant', 'initiative', 'given_name', 'family_name', 'birth_date', 'address', 'id_number', 'signed_at', 'updated_at']
+    list_filter = [ReviewBatchFilter, ReviewSampleFilter, 'initiative', 'status', 'municipality__canton', 'signed_at']
+    # Everything list_display touches, including Participant.__str__ -> swiyu_profile
+    list_select_related = ['initiative', 'municipality', 'participant__swiyu_profile']
+    show_facets = admin.ShowFacets.NEVER
+    readonly_fields = ['participant', 'initiative', 'given_name', 'family_name', 'birth_date', 'address', 'id_number', 'signed_at', 'updated_at', 'review_lease_owner', 'review_lease_expires_at']
     actions = ['accept_signatures', 'reject_signatures']
+    actions_list = ['next_review_batch', 'release_my_batch']
 
     fieldsets = (
         ('Signature Information', {
@@ -146,7 +352,7 @@ class SignatureAdmin(ModelAdmin):
             'fields': ('given_name', 'family_name', 'birth_date', 'address', 'id_number')
         }),
         ('Review', {
-            'fields': ('reviewed_by', 'reviewed_at', 'review_notes')
+            'fields': ('reviewed_by', 'reviewed_at', 'review_notes', 'review_lease_owner', 'review_lease_expires_at')
         }),
         ('Timestamps', {
             'fields': ('signed_at', 'updated_at'),
@@ -154,6 +360,19 @@ class SignatureAdmin(ModelAdmin):
         }),
     )
 
+    def get_search_fields(self, request):
+        # Only enables the search box: names are encrypted, so get_search_results() is the single entry point
+        # (exact name and AHV searches through the blind indexes); the initiative is a list filter
+        return ['blind indexes']
+
+    def get_search_results(self, request, queryset, search_term):
+        if normalize_ahv_number(search_term):
+            return queryset.filter(participant__ahv_number_index=ahv_hash(search_term)), False
+        names = _name_search_filter(search_term)
+        if names is None:
+            return queryset, False
+        return queryset.filter(names), False
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
@@ -161,20 +380,9 @@ class SignatureAdmin(ModelAdmin):
 
         # Municipality reviewers only see signatures from their municipalities
         if request.user.has_perm('core.can_review_signatures'):
-            # Get municipalities this user can review (based on group membership)
-            user_groups = request.user.groups.values_list('name', flat=True)
-
-            # Build case-insensitive query for municipalities
-            q = Q()
-            for group_name in user_groups:
-                if group_name.startswith('municipality_'):
-                    # Extract municipality name from group name
-                    # Format: municipality_{name} (created by signal in models.py)
-                    mun_name = group_name[13:].replace('_', ' ')  # Remove prefix, restore spaces
-                    q |= Q(municipality__name__iexact=mun_name)
-
-            if q:
-                return qs.filter(q)
+            municipality_ids = reviewer_municipality_ids(request.user)
+            if municipality_ids:
+                return qs.filter(municipality_id__in=municipality_ids)
 
         return qs.none()
 
@@ -183,42 +391,405 @@ class SignatureAdmin(ModelAdmin):
         return False
 
     def has_change_permission(self, request, obj=None):
+        if obj and (obj.anonymized_at or initiative_is_finalized(obj.initiative_id)):
+            # Counted in the final result
+            return False
+
+        if obj and obj.review_lease_owner_id not in (None, request.user.pk) \
+                and obj.review_lease_expires_at and obj.review_lease_expires_at >= timezone.now():
+            # Leased to another reviewer's batch
+            return False
+
         if request.user.is_superuser:
             return True
 
         # Municipality reviewers can change signatures in their municipalities
         if request.user.has_perm('core.can_review_signatures') and obj:
-            user_groups = request.user.groups.values_list('name', flat=True)
-            for group_name in user_groups:
-                if group_name.startswith('municipality_'):
-                    mun_name = group_name[13:].replace('_', ' ')  # Remove prefix, restore spaces
-                    if obj.municipality.name.lower() == mun_name.lower():
-                        return True
+            return obj.municipality_id in reviewer_municipality_ids(request.user)
 
         return False
 
+    def save_model(self, request, obj, form, change):
+        if 'status' in form.changed_data:
+            if lock_initiatives([obj.initiative_id]):
+                # The final tally started after the form was opened
+                raise PermissionDenied
+            # Reviewed signatures leave the work queue
+            obj.review_lease_owner = None
+            obj.review_lease_expires_at = None
+        super().save_model(request, obj, form, change)
+
     def has_delete_permission(self, request, obj=None):
         # Only superusers can delete
         return request.user.is_superuser
 
     def get_participant_name(self, obj):
-        return str(obj.participant)
+        return str(obj.participant) if obj.participant else '(anonymized)'
     get_participant_name.short_description = 'Participant'
 
-    def accept_signatures(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
-            status='accepted',
+    def _review(self, request, queryset, status):
+        # Signatures in another reviewer's batch or of finalized initiatives are left alone
+        return transition_signatures(
+            queryset.filter(status='pending', initiative__final_result__isnull=True).exclude(leased_to_other_q(request.user)),
+            status,
             reviewed_by=request.user,
-            reviewed_at=timezone.now()
+            reviewed_at=timezone.now(),
+            review_lease_owner=None,
+            review_lease_expires_at=None,
         )
+
+    def accept_signatures(self, request, queryset):
+        updated = self._review(request, queryset, 'accepted')
         self.message_user(request, f'{updated} signature(s) accepted.')
     accept_signatures.short_description = 'Accept selected signatures'
 
     def reject_signatures(self, request, queryset):
-        updated = queryset.filter(status='pending').update(
-            status='rejected',
-            reviewed_by=request.user,
-            reviewed_at=timezone.now()
-        )
+        updated = self._review(request, queryset, 'rejected')
         self.message_user(request, f'{updated} signature(s) rejected.')
     reject_signatures.short_description = 'Reject selected signatures'
+
+    @action(description='Next batch to review', url_path='next-batch', permissions=['core.can_review_signatures'])
+    def next_review_batch(self, request):
+        claimed = claim_review_batch(request.user)
+        if claimed:
+            self.message_user(request, f'{claimed} signature(s) reserved for your review.')
+        else:
+            self.message_user(request, 'No pending signatures left to review.', level=messages.WARNING)
+        return redirect(f"{reverse('admin:core_signature_changelist')}?review_batch=mine")
+
+    @action(description='Release my batch', url_path='release-batch', permissions=['core.can_review_signatures'])
+    def release_my_batch(self, request):
+        released = release_review_batch(request.user)
+        self.message_user(request, f'{released} unreviewed signature(s) returned to the queue.')
+        return redirect(reverse('admin:core_signature_changelist'))
+
+
+class PaperSignatureBatchForm(forms.ModelForm):
+    csv_file = forms.FileField(help_text="CSV (semicolon separated): given_name;family_name;birth_date;street_and_number;postal_code;bfs_number;ahv_number")
+
+    class Meta:
+        model = PaperSignatureBatch
+        fields = ['initiative']
+
+    def clean_initiative(self):
+        initiative = self.cleaned_data['initiative']
+        if initiative_is_finalized(initiative.pk):
+            raise forms.ValidationError("The final tally of this initiative has started.")
+        return initiative
+
+
+@admin.register(PaperSignatureBatch)
+class PaperSignatureBatchAdmin(ModelAdmin):
+    list_display = ['__str__', 'initiative', 'total_rows', 'imported_rows', 'duplicate_rows', 'error_rows', 'created_at', 'completed_at']
+    list_filter = ['initiative']
+    list_select_related = ['initiative']
+    readonly_fields = ['file_name', 'uploaded_by', 'total_rows', 'imported_rows', 'duplicate_rows', 'error_rows', 'errors', 'created_at', 'completed_at']
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is None:
+            kwargs['form'] = PaperSignatureBatchForm
+        return super().get_form(request, obj, **kwargs)
+
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ['initiative', 'csv_file']
+        return ['initiative'] + self.readonly_fields
+
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return []
+        return ['initiative'] + self.readonly_fields
+
+    def has_add_permission(self, request):
+        # Only superusers can import paper signatures
+        return request.user.is_superuser
+
+    def has_change_permission(self, request, obj=None):
+        # Batches are immutable once imported
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def save_model(self, request, obj, form, change):
+        upload = form.cleaned_data['csv_file']
+        obj.file_name = upload.name
+        obj.source_file = upload
+        obj.uploaded_by = request.user
+        super().save_model(request, obj, form, change)
+
+        # Large files take minutes to import, so a worker processes them
+        job = enqueue('import_paper_signatures', {'batch_id': obj.pk}, created_by=request.user)
+        self.message_user(
+            request,
+            format_html(
+                'The file is being imported in the background (<a href="{}">job #{}</a>).',
+                reverse('admin:core_job_change', args=[job.pk]), job.pk,
+            ),
+            level=messages.INFO,
+        )
+
+
+@admin.register(PaperSignature)
+class PaperSignatureAdmin(ModelAdmin):
+    list_display = ['given_name', 'family_name', 'initiative', 'municipality', 'status', 'conflict', 'batch']
+    list_filter = ['status', 'conflict', 'municipality__canton']
+    list_select_related = ['initiative', 'municipality', 'batch__initiative']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_search_fields(self, request):
+        # Only enables the search box: names are encrypted, see SignatureAdmin.get_search_fields()
+        return ['blind indexes']
+
+    def get_search_results(self, request, queryset, search_term):
+        if normalize_ahv_number(search_term):
+            return queryset.filter(ahv_number_index=ahv_hash(search_term)), False
+        names = _name_search_filter(search_term)
+        if names is None:
+            return queryset, False
+        return queryset.filter(names), False
+
+    def has_add_permission(self, request):
+        # Paper signatures are imported in batches
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+
+@admin.register(InitiativeResult)
+class InitiativeResultAdmin(ModelAdmin):
+    list_display = ['initiative', 'total_accepted', 'started_at', 'completed_at', 'digest_valid']
+    list_select_related = ['initiative']
+    readonly_fields = [
+        'initiative', 'total_accepted', 'sha256', 'digest_valid', 'started_at', 'completed_at', 'created_by',
+        'signature_checkpoint', 'paper_checkpoint', 'snapshot',
+    ]
+    exclude = ['partial_counts']
+
+    def digest_valid(self, obj):
+        if not obj.completed_at:
+            return None
+        return verify_result(obj)
+    digest_valid.short_description = 'Digest valid'
+    digest_valid.boolean = True
+
+    def has_add_permission(self, request):
+        # Created by the finalize_initiative command/job
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Only unfinished tallies may be discarded
+        return request.user.is_superuser and obj is not None and obj.completed_at is None
+
+
+@admin.register(ReviewSample)
+class ReviewSampleAdmin(ModelAdmin):
+    list_display = [
+        'id', 'initiative', 'municipality', 'status', 'population_size', 'review_progress', 'error_rate',
+        'confidence_interval', 'verdict', 'created_at',
+    ]
+    list_filter = ['status', 'initiative', 'municipality__canton']
+    list_select_related = ['initiative', 'municipality']
+    readonly_fields = [
+        'initiative', 'municipality', 'status', 'seed', 'population_size', 'max_signature_id', 'review_progress',
+        'error_rate', 'confidence_interval', 'verdict', 'accepted_count', 'created_by', 'created_at', 'completed_at',
+    ]
+    exclude = ['signatures']
+    actions = ['accept_population', 'discard_selected']
+
+    def get_queryset(self, request):
+        qs = with_review_counts(super().get_queryset(request))
+        if request.user.is_superuser:
+            return qs
+        # Municipality reviewers only see the samples of their municipalities
+        if request.user.has_perm('core.can_review_signatures'):
+            return qs.filter(municipality_id__in=reviewer_municipality_ids(request.user))
+        return qs.none()
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser or request.user.has_perm('core.can_review_signatures')
+
+    def has_add_permission(self, request):
+        # Drawn per initiative (admin action on initiatives or review_samples command)
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_review_permission(self, request):
+        return request.user.is_superuser or request.user.has_perm('core.can_review_signatures')
+
+    def _result(self, obj):
+        if not hasattr(obj, '_review_result'):
+            obj._review_result = review_result(obj)
+        return obj._review_result
+
+    def review_progress(self, obj):
+        result = self._result(obj)
+        url = f"{reverse('admin:core_signature_changelist')}?review_sample={obj.pk}"
+        return format_html("<a href='{}'>{}/{} reviewed</a>", url, result['reviewed'], result['size'])
+    review_progress.short_description = 'Sample'
+
+    def error_rate(self, obj):
+        result = self._result(obj)
+        if result['error_rate'] is None:
+            return '-'
+        return f"{result['error_rate']:.2%} ({result['errors']})"
+    error_rate.short_description = 'Error rate'
+
+    def confidence_interval(self, obj):
+        result = self._result(obj)
+        return f"{result['lower']:.2%} – {result['upper']:.2%} ({result['confidence']:.0%})"
+    confidence_interval.short_description = 'Confidence interval'
+
+    def verdict(self, obj):
+        if obj.status != 'open':
+            return obj.get_status_display()
+        return {
+            'incomplete': 'Review sample',
+            'pass': 'Population can be accepted',
+            'fail': 'Review all signatures',
+        }[self._result(obj)['verdict']]
+    verdict.short_description = 'Verdict'
+
+    def accept_population(self, request, queryset):
+        queued = 0
+        for sample in queryset.filter(status='open'):
+            if self._result(sample)['verdict'] == 'pass':
+                enqueue('accept_review_sample', {'sample_id': sample.pk}, created_by=request.user)
+                queued += 1
+        self.message_user(request, f'Bulk acceptance of {queued} sample population(s) queued.')
+        if queued < queryset.count():
+            self.message_user(
+                request, 'Samples that are not open or not passed were left alone.', level=messages.WARNING,
+            )
+    accept_population.short_description = 'Accept remaining signatures of passed samples'
+    accept_population.allowed_permissions = ['review']
+
+    def discard_selected(self, request, queryset):
+        discarded = discard_samples(queryset)
+        self.message_user(request, f'{discarded} sample(s) discarded.')
+    discard_selected.short_description = 'Discard selected open samples'
+    discard_selected.allowed_permissions = ['review']
+
+
+@admin.register(IntakeAnomaly)
+class IntakeAnomalyAdmin(ModelAdmin):
+    list_display = ['minute', 'kind', 'initiative', 'municipality', 'observed', 'expected', 'threshold', 'process', 'acknowledged']
+    list_filter = ['kind', ('acknowledged_at', admin.EmptyFieldListFilter), 'initiative', 'municipality__canton']
+    list_select_related = ['initiative', 'municipality']
+    readonly_fields = [
+        'kind', 'initiative', 'municipality', 'minute', 'observed', 'expected', 'threshold', 'detail', 'process',
+        'acknowledged_by', 'acknowledged_at', 'created_at',
+    ]
+    actions = ['acknowledge_selected']
+
+    def acknowledged(self, obj):
+        return obj.acknowledged_at is not None
+    acknowledged.short_description = 'Acknowledged'
+    acknowledged.boolean = True
+
+    def has_add_permission(self, request):
+        # Flagged by the application processes
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_acknowledge_permission(self, request):
+        # The change permission is granted for acknowledging, the fields themselves stay read-only
+        return request.user.is_superuser or request.user.has_perm('core.change_intakeanomaly')
+
+    def acknowledge_selected(self, request, queryset):
+        updated = queryset.filter(acknowledged_at__isnull=True).update(
+            acknowledged_by=request.user, acknowledged_at=timezone.now(),
+        )
+        self.message_user(request, f'{updated} anomaly(ies) acknowledged.')
+    acknowledge_selected.short_description = 'Acknowledge selected anomalies'
+    acknowledge_selected.allowed_permissions = ['acknowledge']
+
+
+@admin.register(Job)
+class JobAdmin(ModelAdmin):
+    list_display = ['__str__', 'job_type', 'status', 'progress_display', 'attempts', 'worker', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'job_type']
+    list_select_related = ['created_by']
+    readonly_fields = [
+        'job_type', 'payload', 'status', 'priority', 'attempts', 'max_attempts', 'run_after',
+        'worker', 'started_at', 'heartbeat_at', 'finished_at',
+        'progress', 'progress_total', 'progress_message', 'result', 'error',
+        'created_by', 'created_at', 'updated_at',
+    ]
+    actions = ['retry_selected', 'cancel_selected']
+
+    def progress_display(self, obj):
+        percentage = obj.get_progress_percentage()
+        if percentage is not None:
+            return f"{percentage}% ({obj.progress}/{obj.progress_total})"
+        return obj.progress_message or obj.progress or "-"
+    progress_display.short_description = "Progress"
+
+    def has_add_permission(self, request):
+        # Jobs are created by the application
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_manage_permission(self, request):
+        # Retrying or cancelling jobs affects the work of other users
+        return request.user.is_superuser
+
+    def retry_selected(self, request, queryset):
+        updated = retry_jobs(queryset)
+        self.message_user(request, f'{updated} job(s) queued again.')
+    retry_selected.short_description = 'Retry selected failed/cancelled jobs'
+    retry_selected.allowed_permissions = ['manage']
+
+    def cancel_selected(self, request, queryset):
+        updated = cancel_jobs(queryset)
+        self.message_user(request, f'{updated} job(s) cancelled.')
+    cancel_selected.short_description = 'Cancel selected queued jobs'
+    cancel_selected.allowed_permissions = ['manage']
+
+
+def slow_queries_view(request):
+    """Captured slow queries grouped by normalized SQL, and the most recent captures"""
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if request.method == 'POST':
+        clear_queries()
+        messages.success(request, 'Captured slow queries cleared.')
+        return redirect('slow_queries')
+
+    order_by = request.GET.get('o') if request.GET.get('o') in ('total', 'count', 'max') else 'total'
+    records = recent_queries()
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Slow queries',
+        'enabled': settings.SLOW_QUERY_LOG_ENABLED,
+        'threshold_ms': settings.SLOW_QUERY_THRESHOLD_MS,
+        'buffer_size': settings.SLOW_QUERY_BUFFER_SIZE,
+        'order_by': order_by,
+        'groups': top_offenders(records, order_by)[:50],
+        'recent': records[:100],
+    }
+    return TemplateResponse(request, 'admin/core/slow_queries.html', context)
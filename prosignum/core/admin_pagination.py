@@ -0,0 +1,163 @@
+"""
+Changelist helpers for tables with millions of rows
+
+- EstimatedCountPaginator replaces COUNT(*) with planner estimates
+- KeysetChangeList pages through the default ordering with a "next page"
+  cursor instead of deep OFFSETs
+"""
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from unfold.views import ChangeList
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_count(queryset):
+    """
+    Estimate the number of rows of a queryset without counting them
+
+    Unfiltered querysets use the table statistics in pg_class, filtered ones
+    the row estimate of the query plan. Returns None if no estimate is available.
+    """
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 for tables that have never been analyzed
+            return row[0] if row and row[0] >= 0 else None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that only counts exactly when the estimate is small"""
+
+    template_name = 'admin/core/keyset_pagination.html'
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        try:
+            estimate = estimate_count(self.object_list)
+        except Exception as e:
+            logger.warning(f"Could not estimate changelist count: {e}")
+            estimate = None
+
+        threshold = getattr(settings, 'ADMIN_EXACT_COUNT_THRESHOLD', 10000)
+        if estimate is None or estimate < threshold:
+            return super().count
+
+        self.is_estimate = True
+        return estimate
+
+
+def encode_cursor(value, pk):
+    return f"{value.isoformat()}|{pk}"
+
+
+def decode_cursor(cursor):
+    """Return (value, pk) from a cursor string, or None if it is missing or invalid"""
+    if not cursor:
+        return None
+    try:
+        value, pk = cursor.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except ValueError:
+        return None
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that pages with a (keyset_field, pk) cursor on the default ordering
+
+    The model admin's default ordering must be descending on
+    ``model_admin.keyset_field``. Sorting by another column or "show all"
+    fall back to regular offset pagination.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.next_page_url = None
+        self.first_page_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing filters, search or ordering starts again at the first page
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [*(remove or []), CURSOR_VAR]
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def keyset_active(self):
+        return ORDER_VAR not in self.params and not self.show_all
+
+    def get_results(self, request):
+        if not self.keyset_active:
+            return super().get_results(request)
+
+        field = self.model_admin.keyset_field
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+        queryset = self.queryset
+        position = decode_cursor(self.cursor)
+        if position:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:self.list_per_page + 1])
+        has_next = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        if has_next:
+            last = rows[-1]
+            self.next_page_url = self.get_query_string({CURSOR_VAR: encode_cursor(getattr(last, field), last.pk)})
+        if position:
+            self.first_page_url = self.get_query_string()
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = paginator
+
+
+class LargeTableAdminMixin:
+    """ModelAdmin mixin for changelists over tables with millions of rows"""
+
+    keyset_field = 'signed_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,197 @@
+"""
+Incrementally maintained signature counts (SignatureCount)
+
+Every change of a signature's (initiative, municipality, status) is applied
+as a +1/-1 delta to SignatureCount with a single upsert:
+
+- single signatures (create, save, delete) through the signal handlers below
+- bulk review transitions through transition_signatures()
+- paper signatures once per imported batch (add_paper_batch_counts())
+
+rebuild_signature_counts() recomputes the table from the signature tables
+(management command rebuild_signature_counts or the job of the same name).
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .finalization import lock_initiatives
+from .http_cache import content_changed, initiative_tags
+from .models import Initiative, Municipality, PaperSignature, PaperSignatureBatch, Signature, SignatureCount
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ELECTRONIC = 'electronic'
+PAPER = 'paper'
+
+
+def adjust_counts(deltas):
+    """
+    Apply count deltas
+
+    Args:
+        deltas: Mapping of (initiative_id, municipality_id, channel, status) -> delta
+    """
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+
+    table = SignatureCount._meta.db_table
+    values = ', '.join(['(%s::bigint, %s::bigint, %s::varchar, %s::varchar, %s::bigint)'] * len(rows))
+    params = [value for key, delta in rows for value in (*key, delta)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (initiative_id, municipality_id, canton, channel, status, count)
+            SELECT d.initiative_id, d.municipality_id, m.canton, d.channel, d.status, d.delta
+            FROM (VALUES {values}) AS d (initiative_id, municipality_id, channel, status, delta)
+            JOIN {Municipality._meta.db_table} m ON m.id = d.municipality_id
+            ORDER BY d.initiative_id, d.municipality_id, d.channel, d.status
+            ON CONFLICT (initiative_id, municipality_id, channel, status)
+            DO UPDATE SET count = {table}.count + EXCLUDED.count
+            """,
+            params,
+        )
+    # Public pages showing these counts are revalidated (see core/http_cache.py)
+    content_changed(*[tag for initiative_id in {key[0] for key, _ in rows} for tag in initiative_tags(initiative_id)])
+
+
+def transition_signatures(queryset, status, **fields):
+    """
+    Set the status (and further ``fields``) of signatures and update the counts
+
+    Signatures of initiatives whose final tally has started are left alone.
+    Returns the number of updated signatures.
+    """
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update(of=('self',))
+            .values_list('id', 'initiative_id', 'municipality_id', 'status')
+        )
+        # Re-checked under the initiative lock, so the tally cannot miss this change
+        finalized = lock_initiatives(row[1] for row in rows)
+        rows = [row for row in rows if row[1] not in finalized]
+        if not rows:
+            return 0
+
+        Signature.objects.filter(id__in=[row[0] for row in rows]).update(status=status, **fields)
+
+        deltas = Counter()
+        for _, initiative_id, municipality_id, old_status in rows:
+            if old_status != status:
+                deltas[(initiative_id, municipality_id, ELECTRONIC, old_status)] -= 1
+                deltas[(initiative_id, municipality_id, ELECTRONIC, status)] += 1
+        adjust_counts(deltas)
+        return len(rows)
+
+
+def add_paper_batch_counts(batch, sign=1):
+    """Add (or with ``sign=-1`` remove) the paper signatures of an imported batch"""
+    rows = (
+        PaperSignature.objects
+        .filter(batch=batch)
+        .values('initiative_id', 'municipality_id', 'status')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    adjust_counts({
+        (row['initiative_id'], row['municipality_id'], PAPER, row['status']): sign * row['n']
+        for row in rows
+    })
+
+
+def rebuild_signature_counts(initiative_id=None):
+    """
+    Recompute SignatureCount from the signature tables (all initiatives or one)
+
+    Meant for repairs and backfills; signatures changing while the rebuild
+    runs may be counted twice, so run it when intake is quiet.
+    """
+    table = SignatureCount._meta.db_table
+    where = 'AND s.initiative_id = %s' if initiative_id else ''
+    params = [initiative_id] if initiative_id else []
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+            counts = SignatureCount.objects.all()
+            if initiative_id:
+                counts = counts.filter(initiative_id=initiative_id)
+            counts.delete()
+
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (initiative_id, municipality_id, canton, channel, status, count)
+                SELECT s.initiative_id, s.municipality_id, m.canton, 'electronic', s.status, COUNT(*)
+                FROM {Signature._meta.db_table} s
+                JOIN {Municipality._meta.db_table} m ON m.id = s.municipality_id
+                WHERE TRUE {where}
+                GROUP BY s.initiative_id, s.municipality_id, m.canton, s.status
+                UNION ALL
+                SELECT s.initiative_id, s.municipality_id, m.canton, 'paper', s.status, COUNT(*)
+                FROM {PaperSignature._meta.db_table} s
+                JOIN {PaperSignatureBatch._meta.db_table} b ON b.id = s.batch_id AND b.completed_at IS NOT NULL
+                JOIN {Municipality._meta.db_table} m ON m.id = s.municipality_id
+                WHERE TRUE {where}
+                GROUP BY s.initiative_id, s.municipality_id, m.canton, s.status
+                """,
+                params * 2,
+            )
+            rows = cursor.rowcount
+
+    initiative_ids = [initiative_id] if initiative_id else Initiative.objects.values_list('pk', flat=True)
+    content_changed(*[tag for pk in initiative_ids for tag in initiative_tags(pk)])
+    return rows
+
+
+# Signal handlers
+
+def _counted_state(instance):
+    # Read from __dict__ so that deferred fields are not loaded
+    values = instance.__dict__
+    if not all(field in values for field in ('initiative_id', 'municipality_id', 'status')):
+        return None
+    return values['initiative_id'], values['municipality_id'], values['status']
+
+
+@receiver(post_init, sender=Signature)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._counted_state = _counted_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Signature)
+def count_saved_signature(sender, instance, created, **kwargs):
+    new = _counted_state(instance)
+    old = None if created else instance._counted_state
+    if new == old or (old is None and not created):
+        # Unchanged, or saved from a partially loaded instance (status unknown)
+        return
+
+    deltas = Counter()
+    if old:
+        deltas[(old[0], old[1], ELECTRONIC, old[2])] -= 1
+    deltas[(new[0], new[1], ELECTRONIC, new[2])] += 1
+    adjust_counts(deltas)
+    instance._counted_state = new
+
+
+@receiver(post_delete, sender=Signature)
+def count_deleted_signature(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Initiative):
+        # The counts are deleted together with the initiative
+        return
+    state = _counted_state(instance)
+    if state:
+        adjust_counts({(state[0], state[1], ELECTRONIC, state[2]): -1})
+
+
+@receiver(pre_delete, sender=PaperSignatureBatch)
+def uncount_paper_batch(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Initiative) or not instance.completed_at:
+        return
+    add_paper_batch_counts(instance, sign=-1)
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Signal handlers maintaining SignatureCount
+        from . import aggregates  # noqa: F401
+        # Signal handlers versioning the cached public pages
+        from . import http_cache  # noqa: F401
+        # Slow-query capture on new database connections (opt-in)
+        from . import slow_queries  # noqa: F401
+        # Intake anomaly detection on new signatures
+        from . import intake_monitor  # noqa: F401
+        # Register background job types
+        from . import job_handlers  # noqa: F401
@@ -0,0 +1,229 @@
+"""
+Certifications of voting rights (Stimmrechtsbescheinigungen) per municipality
+
+generate_certifications() renders one printable HTML document per
+municipality listing the accepted signatures (electronic and paper) of an
+initiative. Municipalities are rendered in parallel in a process pool:
+
+- Every worker process opens its own database connection (the parent
+  closes its connections before the pool is started, so forked workers do
+  not share a socket with it).
+- Signatures are streamed per municipality with server-side cursors and
+  written in chunks, so memory stays flat for large municipalities.
+- The output is deterministic: rows are ordered by channel and id, files
+  are named by BFS number and contain no generation timestamp.
+  SHA256SUMS lists the digest of every document, so two runs over the same
+  data can be compared byte for byte.
+- A run limited to some municipalities rebuilds index.html and SHA256SUMS
+  from all documents in the directory, so the documents of earlier runs
+  stay listed.
+
+Files are written to <output_dir>/initiative-<id>/ through a temporary
+file and renamed when complete.
+
+Models are imported inside the functions: with the spawn/forkserver start
+methods this module is imported by the workers before django.setup().
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.text import slugify
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Signatures rendered and fetched per chunk
+CHUNK_SIZE = 2000
+
+
+def initiative_directory(output_dir, initiative_id):
+    return Path(output_dir) / f'initiative-{initiative_id}'
+
+
+def certification_filename(municipality):
+    return f'{municipality.bfs_number:04d}-{slugify(municipality.name)}.html'
+
+
+def certified_municipalities(initiative_id):
+    """(municipality_id, accepted signatures) with at least one accepted signature, largest first"""
+    from .models import SignatureCount
+
+    rows = (
+        SignatureCount.objects
+        .filter(initiative_id=initiative_id, status='accepted')
+        .values('municipality_id')
+        .annotate(n=Sum('count'))
+        .filter(n__gt=0)
+        .order_by('-n', 'municipality_id')
+    )
+    return [(row['municipality_id'], row['n']) for row in rows]
+
+
+def _signature_rows(initiative_id, municipality_id):
+    """Accepted electronic signatures of a municipality, then paper signatures, each in id order"""
+    from .models import PaperSignature, Signature
+
+    # Names are encrypted, so the database cannot sort by them
+    fields = ('family_name', 'given_name', 'birth_date', 'id', 'street_and_number', 'postal_code')
+    electronic = (
+        Signature.objects
+        .filter(initiative_id=initiative_id, municipality_id=municipality_id, status='accepted')
+        .order_by('id')
+        .values_list(*fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    paper = (
+        PaperSignature.objects
+        .filter(
+            initiative_id=initiative_id, municipality_id=municipality_id, status='accepted',
+            batch__completed_at__isnull=False,
+        )
+        .order_by('id')
+        .values_list(*fields)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for row in electronic:
+        yield (*row, 'electronic')
+    for row in paper:
+        yield (*row, 'paper')
+
+
+def generate_certification(initiative_id, municipality_id, output_dir, language):
+    """
+    Render the certification of one municipality (runs in a worker process)
+
+    Returns (bfs_number, filename, signature count, sha256).
+    """
+    from .models import Initiative, Municipality
+
+    initiative = Initiative.objects.get(pk=initiative_id)
+    municipality = Municipality.objects.get(pk=municipality_id)
+    directory = initiative_directory(output_dir, initiative_id)
+    filename = certification_filename(municipality)
+    path = directory / filename
+    temporary = directory / f'.{filename}.{os.getpid()}.tmp'
+
+    digest = hashlib.sha256()
+    count = 0
+
+    def write(fh, html):
+        data = html.encode()
+        digest.update(data)
+        fh.write(data)
+
+    with translation.override(language), open(temporary, 'wb') as fh:
+        context = {'initiative': initiative, 'municipality': municipality}
+        write(fh, render_to_string('core/certification/header.html', context))
+
+        chunk = []
+        for row in _signature_rows(initiative_id, municipality_id):
+            count += 1
+            chunk.append({
+                'number': count,
+                'family_name': row[0],
+                'given_name': row[1],
+                'birth_date': row[2],
+                'street_and_number': row[4],
+                'postal_code': row[5],
+                'channel': row[6],
+            })
+            if len(chunk) >= CHUNK_SIZE:
+                write(fh, render_to_string('core/certification/rows.html', {'rows': chunk}))
+                chunk = []
+        if chunk:
+            write(fh, render_to_string('core/certification/rows.html', {'rows': chunk}))
+
+        write(fh, render_to_string('core/certification/footer.html', {**context, 'count': count}))
+
+    os.replace(temporary, path)
+    return municipality.bfs_number, filename, count, digest.hexdigest()
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def generate_certifications(initiative, output_dir, workers=None, municipality_ids=None, language=None, progress=None):
+    """
+    Render the certifications of all municipalities of an initiative in parallel
+
+    Args:
+        output_dir: Base directory; documents go to <output_dir>/initiative-<id>/
+        workers: Number of worker processes (default: number of CPUs)
+        municipality_ids: Only render these municipalities
+        language: Language of the documents (default: LANGUAGE_CODE)
+        progress: Optional callable(done, total, filename) called per finished document
+
+    Returns the list of (bfs_number, filename, count, sha256) ordered by BFS number.
+    """
+    language = language or settings.LANGUAGE_CODE
+    municipalities = certified_municipalities(initiative.pk)
+    if municipality_ids is not None:
+        municipality_ids = set(municipality_ids)
+        municipalities = [row for row in municipalities if row[0] in municipality_ids]
+
+    directory = initiative_directory(output_dir, initiative.pk)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # Forked workers must not reuse the parent's database connection
+    connections.close_all()
+
+    results = []
+    # Largest municipalities are submitted first so that they do not finish last
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [
+            pool.submit(generate_certification, initiative.pk, municipality_id, str(output_dir), language)
+            for municipality_id, _ in municipalities
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+            if progress:
+                progress(len(results), len(futures), results[-1][1])
+
+    results.sort()
+    _write_index(initiative, directory, results if municipality_ids is None else _existing_documents(directory), language)
+    logger.info(f'Generated {len(results)} certification(s) for initiative {initiative.pk} in {directory}')
+    return results
+
+
+def _existing_documents(directory):
+    """(bfs_number, filename, count, sha256) of every document in the directory, counted from its rows"""
+    documents = []
+    for path in sorted(directory.glob('[0-9]*-*.html')):
+        bfs_number = path.name.split('-', 1)[0]
+        if not bfs_number.isdigit():
+            continue
+        digest = hashlib.sha256()
+        count = 0
+        with open(path, 'rb') as fh:
+            for line in fh:
+                digest.update(line)
+                if line.lstrip().startswith(b'<td class="number">'):
+                    count += 1
+        documents.append((int(bfs_number), path.name, count, digest.hexdigest()))
+    return sorted(documents)
+
+
+def _write_index(initiative, directory, results, language):
+    with translation.override(language):
+        html = render_to_string('core/certification/index.html', {
+            'initiative': initiative,
+            'documents': [
+                {'bfs_number': bfs_number, 'filename': filename, 'count': count}
+                for bfs_number, filename, count, _ in results
+            ],
+            'total': sum(row[2] for row in results),
+        })
+    (directory / 'index.html').write_text(html, encoding='utf-8')
+
+    checksums = ''.join(f'{sha256}  {filename}\n' for _, filename, _, sha256 in sorted(results, key=lambda row: row[1]))
+    (directory / 'SHA256SUMS').write_text(checksums, encoding='utf-8')
@@ -0,0 +1,241 @@
+"""
+Field-level encryption of personal data
+
+Encrypted fields store ``enc$<Fernet token>`` in a text column and decrypt
+transparently when loaded. Tokens are encrypted with the first key of
+FIELD_ENCRYPTION_KEYS; all keys of the list are tried for decryption, so a
+new key is introduced by prepending it and the old data is re-encrypted
+with ``python manage.py reencrypt_fields`` (after which the old key can be
+removed). Values without the prefix are plaintext written before the
+column was encrypted; they are still readable and are encrypted by the
+same command.
+
+Encryption is randomized, so the database cannot compare encrypted
+columns. Equality lookups go through a BlindIndexField companion column
+instead: an HMAC-SHA256 (keyed with BLIND_INDEX_KEY) of the normalized
+source value, which is an ordinary indexed column:
+
+    Participant.objects.filter(ahv_number_index=ahv_hash(value))   # see core/normalization.py
+
+Changing BLIND_INDEX_KEY requires recomputing all blind indexes
+(``reencrypt_fields`` does that as well); lookups miss until it finished.
+"""
+import base64
+import hashlib
+import hmac
+import json
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+
+PREFIX = 'enc$'
+
+
+def _derived_key(purpose):
+    # Development fallback, never used with DEBUG off
+    if not settings.DEBUG:
+        raise ImproperlyConfigured(
+            'FIELD_ENCRYPTION_KEYS and BLIND_INDEX_KEY must be set when DEBUG is off'
+        )
+    return base64.urlsafe_b64encode(hashlib.sha256(f'{purpose}:{settings.SECRET_KEY}'.encode()).digest()).decode()
+
+
+@lru_cache(maxsize=4)
+def _fernet(keys):
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def get_fernet():
+    return _fernet(tuple(settings.FIELD_ENCRYPTION_KEYS) or (_derived_key('field-encryption'),))
+
+
+def encrypt(value: str) -> str:
+    return PREFIX + get_fernet().encrypt(value.encode()).decode()
+
+
+def decrypt(value: str) -> str:
+    if not value.startswith(PREFIX):
+        # Written before encryption was enabled
+        return value
+    try:
+        return get_fernet().decrypt(value[len(PREFIX):].encode()).decode()
+    except InvalidToken:
+        raise ValueError('Encrypted value cannot be decrypted with any of FIELD_ENCRYPTION_KEYS')
+
+
+def blind_index(purpose, value):
+    """Keyed hash of a normalized value (None stays None)"""
+    if value is None:
+        return None
+    key = (settings.BLIND_INDEX_KEY or _derived_key('blind-index')).encode()
+    return hmac.new(key, f'{purpose}:{value}'.encode(), hashlib.sha256).hexdigest()
+
+
+class EncryptedMixin:
+    """Stores the encrypted string form of the value in a text column"""
+
+    def get_internal_type(self):
+        return 'TextField'
+
+    def get_lookup(self, lookup_name):
+        # Ciphertexts cannot be compared; query the blind index instead
+        if lookup_name == 'isnull':
+            return super().get_lookup(lookup_name)
+        return None
+
+    def get_transform(self, lookup_name):
+        return None
+
+    def to_db_string(self, value):
+        return str(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if not prepared:
+            value = self.get_prep_value(value)
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return encrypt(self.to_db_string(value))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.to_python(decrypt(value))
+
+
+class EncryptedCharField(EncryptedMixin, models.CharField):
+    # max_length applies to the plaintext (form validation), the column is text
+    pass
+
+
+class EncryptedDateField(EncryptedMixin, models.DateField):
+
+    def to_db_string(self, value):
+        return value.isoformat()
+
+
+class EncryptedJSONField(EncryptedMixin, models.JSONField):
+
+    def to_db_string(self, value):
+        return json.dumps(value, cls=self.encoder)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        # JSONField.get_prep_value() is the identity, skip its JSON adaptation
+        if value is None or hasattr(value, 'as_sql'):
+            return value
+        return encrypt(self.to_db_string(value))
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return json.loads(decrypt(value), cls=self.decoder)
+
+
+class BlindIndexField(models.CharField):
+    """
+    Keyed hash of one or more source fields, computed on every save
+
+    Args:
+        source_fields: Names of the fields the index is computed from
+        purpose: Shared by indexes that must match each other (e.g. 'ahv' on
+            Participant and PaperSignature)
+        normalize: Module-level function(*source values) -> str or None
+    """
+
+    def __init__(self, *source_fields, purpose=None, normalize=None, **kwargs):
+        self.source_fields = source_fields
+        self.purpose = purpose
+        self.normalize = normalize
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('editable', False)
+        super().__init__(**kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        args = list(self.source_fields)
+        kwargs['purpose'] = self.purpose
+        kwargs['normalize'] = self.normalize
+        if kwargs.get('max_length') == 64:
+            del kwargs['max_length']
+        kwargs.pop('editable', None)
+        return name, path, args, kwargs
+
+    def compute(self, instance):
+        values = [getattr(instance, field) for field in self.source_fields]
+        return blind_index(self.purpose, self.normalize(*values))
+
+    def pre_save(self, model_instance, add):
+        value = self.compute(model_instance)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def protected_fields(model):
+    """Encrypted and blind index fields of a model"""
+    return [field for field in model._meta.concrete_fields if isinstance(field, (EncryptedMixin, BlindIndexField))]
+
+
+def _update_rows(model, fields, rows):
+    # One UPDATE ... FROM (VALUES ...) per chunk; bulk_update() builds a CASE per column and row
+    pk = model._meta.pk
+    columns = [pk.column] + [field.column for field in fields]
+    quote = connection.ops.quote_name
+    placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    params = []
+    for row in rows:
+        params.append(pk.get_db_prep_value(row.pk, connection))
+        params.extend(field.get_db_prep_save(getattr(row, field.attname), connection) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {quote(model._meta.db_table)} AS t
+            SET {', '.join(f'{quote(field.column)} = v.{quote(field.column)}' for field in fields)}
+            FROM (VALUES {', '.join([placeholder] * len(rows))}) AS v ({', '.join(quote(column) for column in columns)})
+            WHERE t.{quote(pk.column)} = v.{quote(pk.column)}::{pk.db_type(connection)}
+            """,
+            params,
+        )
+
+
+def reencrypt_model(model, chunk_size=1000, start_after=None, progress=None):
+    """
+    Re-encrypt all rows of a model with the current key and recompute its blind indexes
+
+    Rows are processed in primary key order, one transaction per chunk, so
+    memory is bounded by ``chunk_size`` and an interrupted run can continue
+    with ``start_after`` (the last reported primary key).
+
+    Args:
+        progress: Optional callable(rows, last_pk) called after every chunk
+
+    Returns the number of rows processed.
+    """
+    fields = protected_fields(model)
+    if not fields:
+        return 0
+    indexes = [field for field in fields if isinstance(field, BlindIndexField)]
+    load = {field.name for field in fields} | {source for field in indexes for source in field.source_fields}
+
+    manager = model._base_manager
+    total = 0
+    last_pk = start_after
+    while True:
+        queryset = manager.order_by('pk').only(*load)
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(queryset[:chunk_size])
+        if not rows:
+            return total
+
+        for row in rows:
+            for field in indexes:
+                setattr(row, field.attname, field.compute(row))
+        with transaction.atomic():
+            _update_rows(model, fields, rows)
+
+        total += len(rows)
+        last_pk = rows[-1].pk
+        if progress:
+            progress(len(rows), last_pk)
@@ -0,0 +1,199 @@
+"""
+Final tally of closed initiatives
+
+finalize_initiative() counts all signatures of a closed initiative straight
+from the signature tables (not from the maintained SignatureCount table),
+in id order and in chunks. After every chunk the running counts and the
+last counted id are saved on the InitiativeResult, so an interrupted run
+resumes where it stopped. The finished tally is written as a snapshot with
+the SHA-256 digest of its canonical JSON and never changes afterwards.
+
+Reviews and paper imports are blocked for an initiative as soon as its
+tally has started (see initiative_is_finalized()). The result is created
+under a lock of the initiative row that status changes share
+(lock_initiatives()), so nothing changes between the check and the count.
+"""
+import hashlib
+import json
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Initiative, InitiativeResult, Municipality, PaperSignature, Signature, SignatureCount
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FinalizationError(Exception):
+    pass
+
+
+def canonical_json(data):
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def snapshot_digest(snapshot):
+    return hashlib.sha256(canonical_json(snapshot).encode()).hexdigest()
+
+
+def verify_result(result):
+    """Whether a completed result still matches its digest"""
+    return bool(result.snapshot) and snapshot_digest(result.snapshot) == result.sha256
+
+
+def initiative_is_finalized(initiative_id):
+    """Whether the final tally of an initiative has started (signatures must not change anymore)"""
+    return InitiativeResult.objects.filter(initiative_id=initiative_id).exists()
+
+
+def lock_initiatives(initiative_ids):
+    """
+    Share-lock initiative rows until the end of the transaction and return
+    the ids of those whose final tally has started
+
+    finalize_initiative() creates the result under an exclusive lock of the
+    same row, so a status change committed while the lock is held is either
+    counted by the tally or refused.
+    """
+    ids = sorted(set(initiative_ids))
+    if not ids:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM {Initiative._meta.db_table} WHERE id = ANY(%s) ORDER BY id FOR SHARE',
+            [ids],
+        )
+    return set(InitiativeResult.objects.filter(initiative_id__in=ids).values_list('initiative_id', flat=True))
+
+
+def _count_chunks(result, queryset, checkpoint_field, channel, chunk_size, progress):
+    counts = result.partial_counts
+    while True:
+        rows = list(
+            queryset.filter(id__gt=getattr(result, checkpoint_field))
+            .order_by('id')
+            .values_list('id', 'municipality_id', 'status')[:chunk_size]
+        )
+        if not rows:
+            return
+
+        for _, municipality_id, status in rows:
+            by_status = counts.setdefault(str(municipality_id), {})
+            key = f'{channel}:{status}'
+            by_status[key] = by_status.get(key, 0) + 1
+
+        # Counts and checkpoint are saved together
+        setattr(result, checkpoint_field, rows[-1][0])
+        result.partial_counts = counts
+        result.save(update_fields=[checkpoint_field, 'partial_counts'])
+        if progress:
+            progress(channel, len(rows))
+
+
+def _build_snapshot(initiative, counts, finalized_at):
+    municipalities = Municipality.objects.in_bulk([int(pk) for pk in counts])
+    totals = defaultdict(int)
+    cantons = defaultdict(lambda: {'electronic': 0, 'paper': 0})
+    municipality_rows = []
+
+    for pk, by_status in counts.items():
+        for key, count in by_status.items():
+            totals[key] += count
+        municipality = municipalities[int(pk)]
+        electronic = by_status.get('electronic:accepted', 0)
+        paper = by_status.get('paper:accepted', 0)
+        if not electronic and not paper:
+            continue
+        municipality_rows.append({
+            'bfs_number': municipality.bfs_number,
+            'name': municipality.name,
+            'canton': municipality.canton,
+            'electronic': electronic,
+            'paper': paper,
+            'count': electronic + paper,
+        })
+        cantons[municipality.canton]['electronic'] += electronic
+        cantons[municipality.canton]['paper'] += paper
+
+    accepted = totals['electronic:accepted'] + totals['paper:accepted']
+    return {
+        'initiative': {
+            'id': initiative.pk,
+            'title': initiative.title,
+            'collection_start_date': initiative.collection_start_date.isoformat() if initiative.collection_start_date else None,
+            'collection_end_date': initiative.collection_end_date.isoformat() if initiative.collection_end_date else None,
+            'target_signatures': initiative.target_signatures,
+        },
+        'finalized_at': finalized_at.isoformat(),
+        'totals': {**dict(sorted(totals.items())), 'accepted': accepted},
+        'cantons': [
+            {'canton': canton, **values, 'count': values['electronic'] + values['paper']}
+            for canton, values in sorted(cantons.items())
+        ],
+        'municipalities': sorted(municipality_rows, key=lambda row: row['bfs_number']),
+    }
+
+
+def finalize_initiative(initiative, chunk_size=10000, allow_pending=False, user=None, progress=None):
+    """
+    Count the signatures of a closed initiative and store the final result
+
+    Resumes an interrupted run and returns an already completed result
+    unchanged. Raises FinalizationError if the initiative is not closed or
+    (unless ``allow_pending``) still has unreviewed signatures.
+
+    Args:
+        progress: Optional callable(channel, rows) called after every chunk
+    """
+    result = InitiativeResult.objects.filter(initiative=initiative).first()
+    if result and result.completed_at:
+        return result
+
+    if initiative.status != 'closed':
+        raise FinalizationError(f'Initiative "{initiative}" is not closed')
+
+    if result is None:
+        with transaction.atomic():
+            # Waits for running reviews and paper imports (see lock_initiatives())
+            Initiative.objects.select_for_update().filter(pk=initiative.pk).first()
+            pending = initiative.signatures.filter(status='pending').count()
+            if pending and not allow_pending:
+                raise FinalizationError(f'{pending} signature(s) of "{initiative}" are not reviewed yet')
+            if initiative.paper_signature_batches.filter(completed_at__isnull=True).exists():
+                raise FinalizationError(f'A paper signature import of "{initiative}" is still running')
+            # From here on reviews and imports of this initiative are blocked
+            result, _ = InitiativeResult.objects.get_or_create(initiative=initiative, defaults={'created_by': user})
+
+    _count_chunks(
+        result, Signature.objects.filter(initiative=initiative),
+        'signature_checkpoint', 'electronic', chunk_size, progress,
+    )
+    _count_chunks(
+        result, PaperSignature.objects.filter(initiative=initiative, batch__completed_at__isnull=False),
+        'paper_checkpoint', 'paper', chunk_size, progress,
+    )
+
+    finalized_at = timezone.now()
+    snapshot = _build_snapshot(initiative, result.partial_counts, finalized_at)
+
+    with transaction.atomic():
+        result = InitiativeResult.objects.select_for_update().get(pk=result.pk)
+        if result.completed_at:
+            return result
+        result.snapshot = snapshot
+        result.sha256 = snapshot_digest(snapshot)
+        result.total_accepted = snapshot['totals']['accepted']
+        result.completed_at = finalized_at
+        result.save(update_fields=['snapshot', 'sha256', 'total_accepted', 'completed_at'])
+
+    maintained = SignatureCount.objects.filter(initiative=initiative, status='accepted').values_list('count', flat=True)
+    if sum(maintained) != result.total_accepted:
+        logger.warning(
+            f'Final tally of initiative {initiative.pk} ({result.total_accepted}) differs from '
+            f'the maintained counts ({sum(maintained)}); run rebuild_signature_counts'
+        )
+    logger.info(f'Finalized initiative {initiative.pk}: {result.total_accepted} signatures, sha256 {result.sha256}')
+    return result
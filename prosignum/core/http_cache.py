@@ -0,0 +1,219 @@
+"""
+HTTP caching of the public pages
+
+Anonymous visitors get the same home, result and legal pages, so these are
+served with validators and shared-cache headers and kept at the edge
+(Cloudflare):
+
+- Every public page depends on cache tags: 'initiatives' (the listing),
+  'initiative-<id>' (one initiative and its counts) and 'pages' (static
+  pages). The version of a tag is the time of its last change, kept in the
+  Django cache. Initiative and result changes bump it through the signal
+  handlers below, count changes through adjust_counts() (core/aggregates.py),
+  always after the transaction committed.
+- ETag and Last-Modified are derived from the versions of a page's tags,
+  the language and HTTP_CACHE_RELEASE, so revalidations are answered with
+  304 without rendering the page.
+- Responses to anonymous visitors without session or message cookies that
+  set no cookie themselves are public (s-maxage for the CDN, browsers
+  revalidate); everything else is private. The language is part of the
+  URL (i18n_patterns), so every language prefix is cached separately.
+- Public responses list their tags in CDN_CACHE_TAG_HEADER. A changed tag
+  is purged at the CDN by the purge_cdn_cache job, scheduled
+  CDN_PURGE_INTERVAL seconds after the first change so that a burst of
+  signatures causes one purge per tag and interval.
+
+The edge must bypass its cache for requests with a session cookie (logged
+in visitors see their own page under the same URL).
+"""
+import hashlib
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import wraps
+
+import requests
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .jobs import enqueue
+from .models import Initiative, InitiativeResult
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'http-cache'
+# Cloudflare accepts up to 30 tags per purge request
+PURGE_CHUNK_SIZE = 30
+
+
+def initiative_tag(initiative_id):
+    return f'initiative-{initiative_id}'
+
+
+def initiative_tags(initiative_id):
+    return ['initiatives', initiative_tag(initiative_id)]
+
+
+def all_tags():
+    return ['initiatives', 'pages', *(initiative_tag(pk) for pk in Initiative.objects.values_list('pk', flat=True))]
+
+
+def tag_versions(tags, create=True):
+    """tag -> version (time of the last change); unknown tags start now, or are left out without ``create``"""
+    keys = {f'{KEY_PREFIX}:version:{tag}': tag for tag in tags}
+    versions = cache.get_many(keys)
+    if create:
+        for key in keys.keys() - versions.keys():
+            cache.add(key, time.time(), timeout=None)
+            versions[key] = cache.get(key) or time.time()
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def _set_versions(tags):
+    now = time.time()
+    cache.set_many({f'{KEY_PREFIX}:version:{tag}': now for tag in tags}, timeout=None)
+
+
+def _bump(tags):
+    _set_versions(tags)
+    if settings.CLOUDFLARE_ZONE_ID:
+        due = [tag for tag in tags if cache.add(f'{KEY_PREFIX}:purge:{tag}', 1, timeout=settings.CDN_PURGE_INTERVAL)]
+        if due:
+            enqueue(
+                'purge_cdn_cache', {'tags': due},
+                run_after=timezone.now() + timedelta(seconds=settings.CDN_PURGE_INTERVAL),
+            )
+
+
+def content_changed(*tags):
+    """Mark tags as changed once the current transaction commits"""
+    tags = sorted(set(tags))
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def purge_cdn(tags):
+    """Purge cached responses by tag at Cloudflare (no-op without CLOUDFLARE_ZONE_ID)"""
+    if not settings.CLOUDFLARE_ZONE_ID:
+        return 0
+    url = f'https://api.cloudflare.com/client/v4/zones/{settings.CLOUDFLARE_ZONE_ID}/purge_cache'
+    tags = sorted(set(tags))
+    for start in range(0, len(tags), PURGE_CHUNK_SIZE):
+        response = requests.post(
+            url,
+            json={'tags': tags[start:start + PURGE_CHUNK_SIZE]},
+            headers={'Authorization': f'Bearer {settings.CLOUDFLARE_API_TOKEN}'},
+            timeout=10,
+        )
+        response.raise_for_status()
+    logger.info(f'Purged CDN cache tags: {", ".join(tags)}')
+    return len(tags)
+
+
+def invalidate(tags):
+    """Change the versions of tags and purge them at the CDN right away (e.g. after a deployment)"""
+    _set_versions(tags)
+    return purge_cdn(tags)
+
+
+def is_cacheable(request):
+    """Whether the request gets the page every anonymous visitor gets"""
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def public_page(*tags, changed_at=None):
+    """
+    Serve a view as a public page depending on ``tags``
+
+    Tags are formatted with the view's keyword arguments (e.g.
+    'initiative-{initiative_id}'). ``changed_at(request, **kwargs)`` can
+    return the time of a change no tag records (e.g. an initiative whose
+    collection period started).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            page_tags = [tag.format(**kwargs) for tag in tags]
+            if not is_cacheable(request):
+                response = view(request, *args, **kwargs)
+                response.cache_tags = None
+                return response
+
+            versions = tag_versions(page_tags)
+            last_change = max(versions.values())
+            extra = changed_at(request, **kwargs) if changed_at else None
+            if extra:
+                last_change = max(last_change, extra.timestamp())
+            key = '|'.join([
+                settings.HTTP_CACHE_RELEASE, request.LANGUAGE_CODE, request.path,
+                *(f'{tag}={versions[tag]!r}' for tag in sorted(versions)),
+                repr(extra.timestamp()) if extra else '',
+            ])
+            etag = hashlib.sha256(key.encode()).hexdigest()[:32]
+            last_modified = datetime.fromtimestamp(last_change, tz=dt_timezone.utc)
+
+            response = condition(
+                etag_func=lambda *a, **k: etag,
+                last_modified_func=lambda *a, **k: last_modified,
+            )(view)(request, *args, **kwargs)
+            response.cache_tags = page_tags
+            return response
+        return wrapper
+    return decorator
+
+
+class PublicCacheMiddleware:
+    """
+    Cache-Control and cache tags of public pages
+
+    Placed above the session, CSRF and message middleware, so that cookies
+    set by them are seen.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not hasattr(response, 'cache_tags'):
+            return response
+
+        if response.cache_tags is not None and response.status_code in (200, 304) and not response.cookies:
+            patch_cache_control(
+                response, public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE,
+                s_maxage=settings.PUBLIC_CACHE_S_MAXAGE,
+                stale_while_revalidate=settings.PUBLIC_CACHE_STALE_WHILE_REVALIDATE,
+            )
+            if settings.CDN_CACHE_TAG_HEADER:
+                response.headers[settings.CDN_CACHE_TAG_HEADER] = ','.join(response.cache_tags)
+        else:
+            patch_cache_control(response, private=True, no_cache=True, max_age=0)
+            del response['ETag']
+            del response['Last-Modified']
+        return response
+
+
+# Signal handlers
+
+@receiver(post_save, sender=Initiative)
+@receiver(post_delete, sender=Initiative)
+def initiative_changed(sender, instance, **kwargs):
+    content_changed(*initiative_tags(instance.pk))
+
+
+@receiver(post_save, sender=InitiativeResult)
+def initiative_result_changed(sender, instance, **kwargs):
+    if instance.completed_at:
+        content_changed(*initiative_tags(instance.initiative_id))
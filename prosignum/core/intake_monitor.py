@@ -0,0 +1,231 @@
+"""
+Anomaly detection on the signature intake
+
+Every new Signature (post_save) is counted in memory, per process, in
+per-minute windows of two streams: the initiative's municipality and the
+initiative as a whole. Nothing is queried or written for a normal
+signature; the cost is a few dictionary operations under a lock.
+
+- When a minute is over, its count is folded into the stream's baseline,
+  an exponentially weighted mean and variance of the per-minute count with
+  a span of INTAKE_BASELINE_MINUTES (idle minutes count as zero). The
+  baseline gives the threshold of the next minutes:
+  max(INTAKE_ANOMALY_MIN_COUNT, mean + INTAKE_ANOMALY_SIGMA * std).
+- burst: the count of the current minute reaches the threshold.
+- regular: signatures of a municipality arrive at near constant intervals
+  (coefficient of variation of the inter-arrival times below
+  INTAKE_REGULARITY_MAX_CV over at least REGULARITY_MIN_ARRIVALS
+  signatures). People sign at random times; a steady beat points to a
+  script or a replaying integration.
+- Nothing is flagged during the first INTAKE_WARMUP_MINUTES of a process,
+  while its baselines are learned.
+
+A stream is flagged at most once per minute; the flag is stored as an
+IntakeAnomaly row after the signature's transaction committed and shown in
+the admin. With INTAKE_THROTTLE_ENABLED, intake_admitted() refuses
+signatures of a stream that is flagged for a burst once the current minute
+reached the threshold again, so intake is capped at the threshold until the
+minute is over.
+
+Each application process only sees its own share of the traffic and
+learns its own baselines; thresholds therefore apply per process.
+"""
+import math
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import IntakeAnomaly, Signature
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+BURST = 'burst'
+REGULAR = 'regular'
+# Inter-arrival statistics need this many signatures before they are judged
+REGULARITY_MIN_ARRIVALS = 20
+# Weight of a new inter-arrival time in its moving statistics
+REGULARITY_SMOOTHING = 0.1
+# Only streams arriving at least this often are checked for regularity (seconds)
+REGULARITY_MAX_INTERVAL = 60
+
+
+class _Stream:
+    __slots__ = (
+        'minute', 'count', 'mean', 'var', 'threshold', 'flagged_minute',
+        'last_arrival', 'arrivals', 'interval_mean', 'interval_var', 'regular_minute',
+    )
+
+    def __init__(self, minute, threshold):
+        self.minute = minute
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.threshold = threshold
+        self.flagged_minute = None
+        self.last_arrival = None
+        self.arrivals = 0
+        self.interval_mean = 0.0
+        self.interval_var = 0.0
+        self.regular_minute = None
+
+
+class IntakeMonitor:
+    """Sliding-window intake counters of one process"""
+
+    def __init__(self, baseline_minutes=None, warmup_minutes=None, sigma=None, min_count=None, regularity_max_cv=None):
+        baseline_minutes = baseline_minutes or settings.INTAKE_BASELINE_MINUTES
+        self.alpha = 2 / (baseline_minutes + 1)
+        # Beyond this many idle minutes the baseline has decayed to (almost) nothing
+        self.max_idle_minutes = 3 * baseline_minutes
+        self.warmup_minutes = settings.INTAKE_WARMUP_MINUTES if warmup_minutes is None else warmup_minutes
+        self.sigma = sigma or settings.INTAKE_ANOMALY_SIGMA
+        self.min_count = min_count or settings.INTAKE_ANOMALY_MIN_COUNT
+        self.regularity_max_cv = regularity_max_cv or settings.INTAKE_REGULARITY_MAX_CV
+        self.started_minute = None
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def _roll(self, stream, minute):
+        """Fold the finished minutes of a stream into its baseline"""
+        count = stream.count
+        for _ in range(min(minute - stream.minute, self.max_idle_minutes)):
+            diff = count - stream.mean
+            increment = self.alpha * diff
+            stream.mean += increment
+            stream.var = (1 - self.alpha) * (stream.var + diff * increment)
+            count = 0
+        stream.minute = minute
+        stream.count = 0
+        stream.threshold = max(self.min_count, stream.mean + self.sigma * math.sqrt(stream.var))
+
+    def _observe(self, key, minute, now, warm, anomalies):
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = self._streams[key] = _Stream(minute, self.min_count)
+        elif minute > stream.minute:
+            self._roll(stream, minute)
+        stream.count += 1
+
+        if warm and stream.count >= stream.threshold and stream.flagged_minute != minute:
+            stream.flagged_minute = minute
+            anomalies.append((BURST, key, minute, stream.count, stream.mean, stream.threshold, ''))
+
+        if key[1] is None:
+            return
+        # Inter-arrival times of the municipality stream
+        if stream.last_arrival is not None:
+            interval = now - stream.last_arrival
+            if stream.arrivals == 1:
+                stream.interval_mean = interval
+            else:
+                diff = interval - stream.interval_mean
+                increment = REGULARITY_SMOOTHING * diff
+                stream.interval_mean += increment
+                stream.interval_var = (1 - REGULARITY_SMOOTHING) * (stream.interval_var + diff * increment)
+        stream.last_arrival = now
+        stream.arrivals += 1
+        if (
+            warm and stream.arrivals >= REGULARITY_MIN_ARRIVALS and stream.regular_minute != minute
+            and 0 < stream.interval_mean <= REGULARITY_MAX_INTERVAL
+            and math.sqrt(stream.interval_var) < self.regularity_max_cv * stream.interval_mean
+        ):
+            stream.regular_minute = minute
+            cv = math.sqrt(stream.interval_var) / stream.interval_mean
+            anomalies.append((
+                REGULAR, key, minute, stream.count, stream.mean, stream.threshold,
+                f'Signatures every {stream.interval_mean:.1f}s (coefficient of variation {cv:.2f})',
+            ))
+
+    def record(self, initiative_id, municipality_id, now=None):
+        """
+        Count a new signature
+
+        Returns the anomalies it revealed as tuples (kind, (initiative_id,
+        municipality_id or None), minute, observed, expected, threshold, detail).
+        """
+        now = time.time() if now is None else now
+        minute = int(now // 60)
+        anomalies = []
+        with self._lock:
+            if self.started_minute is None:
+                self.started_minute = minute
+            warm = minute - self.started_minute >= self.warmup_minutes
+            self._observe((initiative_id, municipality_id), minute, now, warm, anomalies)
+            self._observe((initiative_id, None), minute, now, warm, anomalies)
+        return anomalies
+
+    def admitted(self, initiative_id, municipality_id, now=None):
+        """False while a burst of the stream is flagged and the current minute reached its threshold"""
+        minute = int((time.time() if now is None else now) // 60)
+        for key in ((initiative_id, municipality_id), (initiative_id, None)):
+            stream = self._streams.get(key)
+            if stream and stream.flagged_minute == minute == stream.minute and stream.count >= stream.threshold:
+                return False
+        return True
+
+
+_monitor = None
+
+
+def get_monitor():
+    global _monitor
+    if _monitor is None:
+        _monitor = IntakeMonitor()
+    return _monitor
+
+
+def intake_admitted(initiative_id, municipality_id):
+    """Whether a new signature may be taken (always True unless INTAKE_THROTTLE_ENABLED)"""
+    if not settings.INTAKE_MONITOR_ENABLED or not settings.INTAKE_THROTTLE_ENABLED:
+        return True
+    return get_monitor().admitted(initiative_id, municipality_id)
+
+
+def _process_name():
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def store_anomalies(anomalies):
+    IntakeAnomaly.objects.bulk_create([
+        IntakeAnomaly(
+            kind=kind,
+            initiative_id=initiative_id,
+            municipality_id=municipality_id,
+            minute=datetime.fromtimestamp(minute * 60, tz=dt_timezone.utc),
+            observed=observed,
+            expected=round(expected, 2),
+            threshold=round(threshold, 2),
+            detail=detail,
+            process=_process_name(),
+        )
+        for kind, (initiative_id, municipality_id), minute, observed, expected, threshold, detail in anomalies
+    ])
+    for kind, key, minute, observed, _, threshold, _ in anomalies:
+        logger.warning(f'Intake anomaly ({kind}) for initiative/municipality {key}: {observed} signatures in minute, threshold {threshold:.1f}')
+
+
+def _store_after_commit(anomalies):
+    try:
+        store_anomalies(anomalies)
+    except Exception:
+        logger.exception('Could not store intake anomalies')
+
+
+# Signal handlers
+
+@receiver(post_save, sender=Signature)
+def monitor_new_signature(sender, instance, created, **kwargs):
+    if not created or not settings.INTAKE_MONITOR_ENABLED:
+        return
+    anomalies = get_monitor().record(instance.initiative_id, instance.municipality_id)
+    if anomalies:
+        transaction.on_commit(lambda: _store_after_commit(anomalies))
@@ -0,0 +1,130 @@
+"""
+Job types executed by the run_worker command (see core/jobs.py)
+
+Imported by CoreConfig.ready() so that the registry is filled in every process.
+"""
+import io
+
+from .aggregates import rebuild_signature_counts
+from .finalization import finalize_initiative
+from .http_cache import purge_cdn
+from .jobs import job_handler
+from .models import Initiative, PaperSignatureBatch, ReviewSample
+from .paper_signatures import import_paper_signatures
+from .retention import apply_retention, archived_initiatives, due_statuses, pending_rows
+from .sampling import accept_population, draw_samples
+
+
+@job_handler('import_paper_signatures', concurrency=2)
+def import_paper_signatures_job(job):
+    """Import an uploaded paper signature CSV (payload: batch_id)"""
+    batch = PaperSignatureBatch.objects.select_related('initiative').get(pk=job.payload['batch_id'])
+    if batch.completed_at:
+        return {'batch_id': batch.pk, 'skipped': 'already imported'}
+
+    # A previous attempt may have loaded part of the file
+    batch.signatures.all().delete()
+
+    with batch.source_file.open('rb') as f:
+        stream = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+        conflicts = import_paper_signatures(
+            batch, stream,
+            progress=lambda rows: job.set_progress(rows, message=f"{rows} rows read"),
+        )
+
+    # The rows are in the database now; the upload is personal data
+    batch.source_file.delete(save=False)
+    batch.save(update_fields=['source_file'])
+
+    job.set_progress(batch.total_rows, batch.total_rows, message="Import complete")
+    return {
+        'batch_id': batch.pk,
+        'imported': batch.imported_rows,
+        'errors': batch.error_rows,
+        **conflicts,
+    }
+
+
+@job_handler('rebuild_signature_counts', concurrency=1)
+def rebuild_signature_counts_job(job):
+    """Recompute SignatureCount (payload: optional initiative_id)"""
+    rows = rebuild_signature_counts(job.payload.get('initiative_id'))
+    return {'rows': rows}
+
+
+@job_handler('finalize_initiative', concurrency=1)
+def finalize_initiative_job(job):
+    """Final tally of a closed initiative (payload: initiative_id, optional allow_pending)"""
+    initiative = Initiative.objects.get(pk=job.payload['initiative_id'])
+    total = initiative.signatures.count() + initiative.paper_signatures.count()
+    counted = [0]
+
+    def progress(channel, rows):
+        # Rows counted by this attempt (a resumed tally starts at its checkpoint)
+        counted[0] += rows
+        job.set_progress(counted[0], total, message=f"Counting {channel} signatures")
+
+    result = finalize_initiative(
+        initiative,
+        allow_pending=job.payload.get('allow_pending', False),
+        user=job.created_by,
+        progress=progress,
+    )
+    job.set_progress(total, total, message="Final tally complete")
+    return {'initiative_id': initiative.pk, 'total_accepted': result.total_accepted, 'sha256': result.sha256}
+
+
+@job_handler('apply_retention', concurrency=1)
+def apply_retention_job(job):
+    """Anonymize signer data due for retention (payload: optional initiative_id, else all archived)"""
+    initiatives = archived_initiatives()
+    if job.payload.get('initiative_id'):
+        initiatives = initiatives.filter(pk=job.payload['initiative_id'])
+
+    work = [(initiative, due_statuses(initiative)) for initiative in initiatives]
+    total = sum(sum(pending_rows(initiative, statuses).values()) for initiative, statuses in work)
+    done = [0]
+
+    def progress(channel, status, rows):
+        done[0] += rows
+        job.set_progress(done[0], total, message=f"Anonymizing {channel} {status} signatures")
+
+    anonymized = {}
+    for initiative, statuses in work:
+        if statuses:
+            results = apply_retention(initiative, progress=progress)
+            anonymized[initiative.pk] = {f'{channel}:{status}': rows for (channel, status), rows in results.items()}
+    return {'anonymized': anonymized}
+
+
+@job_handler('draw_review_samples', concurrency=1)
+def draw_review_samples_job(job):
+    """Draw review samples per municipality (payload: initiative_id, optional municipality_ids, seed)"""
+    initiative = Initiative.objects.get(pk=job.payload['initiative_id'])
+    samples = draw_samples(
+        initiative,
+        municipality_ids=job.payload.get('municipality_ids'),
+        seed=job.payload.get('seed'),
+        user=job.created_by,
+    )
+    return {'initiative_id': initiative.pk, 'samples': len(samples), 'seed': samples[0].seed if samples else None}
+
+
+@job_handler('accept_review_sample', concurrency=2)
+def accept_review_sample_job(job):
+    """Accept the population of a passed review sample (payload: sample_id)"""
+    sample = ReviewSample.objects.get(pk=job.payload['sample_id'])
+    if sample.status == 'accepted':
+        return {'sample_id': sample.pk, 'skipped': 'already accepted'}
+    total = sample.population_size
+    accepted = accept_population(
+        sample, user=job.created_by,
+        progress=lambda rows: job.set_progress(rows, total, message=f"{rows} signatures accepted"),
+    )
+    return {'sample_id': sample.pk, 'accepted': accepted}
+
+
+@job_handler('purge_cdn_cache', concurrency=1)
+def purge_cdn_cache_job(job):
+    """Purge changed public pages at the CDN (payload: tags)"""
+    return {'purged': purge_cdn(job.payload['tags'])}
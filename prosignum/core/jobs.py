@@ -0,0 +1,253 @@
+"""
+PostgreSQL-backed background jobs
+
+Long running operations (imports, exports, bulk reviews, counter rebuilds,
+purges) are registered as job types and executed by
+``python manage.py run_worker`` instead of inside a web request:
+
+    @job_handler('rebuild_counts', concurrency=1)
+    def rebuild_counts(job):
+        ...
+        job.set_progress(done, total)
+        return {'rows': done}
+
+    enqueue('rebuild_counts', {'initiative_id': 1})
+
+Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+number of workers can poll the table without blocking each other. Job
+types with a concurrency limit are claimed under a transaction-level
+advisory lock on the job type, which makes the "running < limit" check
+race free. Failed jobs are retried with exponential backoff until
+max_attempts is reached, and running jobs whose heartbeat stopped (worker
+crashed or was killed) are put back into the queue.
+"""
+import random
+import threading
+import traceback
+import zlib
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Job
+from .slow_queries import query_source
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class JobType(NamedTuple):
+    name: str
+    handler: Callable
+    concurrency: Optional[int]
+    max_attempts: int
+
+
+_registry = {}
+
+
+def job_handler(name, concurrency=None, max_attempts=3):
+    """
+    Register a function as handler of a job type
+
+    Args:
+        name: Job type stored in Job.job_type
+        concurrency: Maximum number of jobs of this type running at once (None = unlimited)
+        max_attempts: Attempts before the job is marked as failed
+    """
+    def decorator(func):
+        _registry[name] = JobType(name, func, concurrency, max_attempts)
+        return func
+    return decorator
+
+
+def get_job_type(name):
+    return _registry.get(name)
+
+
+def registered_job_types():
+    return sorted(_registry)
+
+
+def enqueue(job_type, payload=None, priority=0, run_after=None, created_by=None):
+    """Queue a job for the workers"""
+    registered = _registry.get(job_type)
+    if registered is None:
+        raise ValueError(f"Unknown job type '{job_type}'")
+    return Job.objects.create(
+        job_type=job_type,
+        payload=payload or {},
+        priority=priority,
+        run_after=run_after or timezone.now(),
+        max_attempts=registered.max_attempts,
+        created_by=created_by,
+    )
+
+
+def _advisory_lock_key(job_type):
+    # Signed 32 bit key, namespaced so it does not collide with other advisory locks
+    return zlib.crc32(f'core.job:{job_type}'.encode()) - 2**31
+
+
+def claim_job(worker, job_types=None):
+    """
+    Claim the next runnable job for a worker
+
+    Returns the claimed Job (status 'running') or None if there is nothing to do.
+    """
+    job_types = list(job_types or _registry)
+    if not job_types:
+        return None
+
+    now = timezone.now()
+    limited = {name: _registry[name].concurrency for name in job_types if _registry[name].concurrency}
+    skipped = set()
+
+    with transaction.atomic():
+        if limited:
+            running = dict(
+                Job.objects.filter(status='running', job_type__in=limited)
+                .values_list('job_type')
+                .annotate(count=Count('id'))
+            )
+            skipped = {name for name, limit in limited.items() if running.get(name, 0) >= limit}
+
+        while True:
+            candidates = [name for name in job_types if name not in skipped]
+            if not candidates:
+                return None
+
+            job = (
+                Job.objects
+                .filter(status='queued', run_after__lte=now, job_type__in=candidates)
+                .order_by('-priority', 'run_after', 'id')
+                .select_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                return None
+
+            limit = limited.get(job.job_type)
+            if limit:
+                # Serialize claims of this type until the end of the transaction
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)', [_advisory_lock_key(job.job_type)])
+                if Job.objects.filter(status='running', job_type=job.job_type).count() >= limit:
+                    skipped.add(job.job_type)
+                    continue
+
+            job.status = 'running'
+            job.attempts = F('attempts') + 1
+            job.worker = worker
+            job.started_at = now
+            job.heartbeat_at = now
+            job.finished_at = None
+            job.save(update_fields=['status', 'attempts', 'worker', 'started_at', 'heartbeat_at', 'finished_at', 'updated_at'])
+            job.refresh_from_db(fields=['attempts'])
+            return job
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, in seconds"""
+    base = settings.JOB_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0)
+    return min(base, settings.JOB_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+
+def _fail(job, error):
+    """Requeue a job for another attempt or mark it as failed"""
+    fields = {'error': error, 'finished_at': timezone.now(), 'worker': ''}
+    if job.attempts < job.max_attempts:
+        fields.update(status='queued', run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)))
+    else:
+        fields.update(status='failed')
+    # Only touch the job if it is still ours (it may have been requeued as stale meanwhile)
+    Job.objects.filter(pk=job.pk, status='running', worker=job.worker).update(**fields)
+    return fields['status']
+
+
+class _Heartbeat(threading.Thread):
+    """Touches heartbeat_at of a running job while its handler works"""
+
+    def __init__(self, job_id, interval):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                Job.objects.filter(pk=self.job_id, status='running').update(heartbeat_at=timezone.now())
+        except Exception as e:
+            logger.warning(f"Heartbeat of job {self.job_id} failed: {e}")
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome. Returns the final status."""
+    registered = _registry.get(job.job_type)
+    if registered is None:
+        return _fail(job, f"No handler registered for job type '{job.job_type}'")
+
+    heartbeat = _Heartbeat(job.pk, settings.JOB_HEARTBEAT_INTERVAL)
+    heartbeat.start()
+    try:
+        with query_source(f'job:{job.job_type}'):
+            result = registered.handler(job)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception(f"Job {job.pk} ({job.job_type}) failed on attempt {job.attempts}")
+        return _fail(job, error)
+    finally:
+        heartbeat.stop()
+
+    Job.objects.filter(pk=job.pk, status='running', worker=job.worker).update(
+        status='succeeded',
+        result=result,
+        error='',
+        finished_at=timezone.now(),
+    )
+    return 'succeeded'
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Recover running jobs whose worker stopped sending heartbeats
+
+    Returns the number of recovered jobs.
+    """
+    timeout = timeout or settings.JOB_STALE_TIMEOUT
+    now = timezone.now()
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=now - timedelta(seconds=timeout))
+    error = 'Worker stopped sending heartbeats'
+
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', error=error, finished_at=now, worker=''
+        )
+        requeued = stale.update(status='queued', error=error, run_after=now, worker='')
+    if failed or requeued:
+        logger.warning(f"Recovered stale jobs: {requeued} requeued, {failed} failed")
+    return failed + requeued
+
+
+def retry_jobs(queryset):
+    """Put failed or cancelled jobs back into the queue with fresh attempts"""
+    return queryset.filter(Q(status='failed') | Q(status='cancelled')).update(
+        status='queued', attempts=0, run_after=timezone.now(), error='', finished_at=None
+    )
+
+
+def cancel_jobs(queryset):
+    """Cancel jobs that have not started yet"""
+    return queryset.filter(status='queued').update(status='cancelled', finished_at=timezone.now())
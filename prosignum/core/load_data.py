@@ -0,0 +1,346 @@
+"""
+Synthetic participants and signatures for benchmarks, loaded with COPY
+
+Every participant is a User, a SwiyuUserProfile and a Participant and signs
+one or more distinct initiatives. Primary keys are reserved from the
+sequences up front, which makes chunks of participants independent: each
+chunk is generated and written with COPY (all four tables, then the
+SignatureCount deltas) in its own transaction, and chunks run in parallel
+in a process pool.
+
+- Participants live in a municipality drawn with the municipality's
+  weight: its population from a CSV with bfs_number and population columns
+  (e.g. the BFS STATPOP table) or else its number of localities.
+- Initiatives are drawn with weights 1, 1/2, 1/3, ... in the given order,
+  statuses with the given shares.
+- The random generator is reseeded from the seed every SEED_BLOCK
+  participants (chunks are multiples of it), so the data depends neither
+  on the number of workers nor on the chunk size.
+
+Personal data is encrypted and indexed like the application does it, but
+every distinct name, birth date and street is encrypted once per process
+and the ciphertext reused, so the Fernet cost stays off the hot loop
+(equal values are visible in the database, acceptable for synthetic data).
+
+Models are imported inside the functions: with the spawn/forkserver start
+methods this module is imported by the workers before django.setup().
+"""
+import bisect
+import csv
+import hashlib
+import io
+import os
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.db import connection, connections, transaction
+from django.db.models import Count
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+GIVEN_NAMES = [
+    'Anna', 'Andrea', 'Beat', 'Claudia', 'Daniel', 'Elena', 'Fabian', 'Franziska', 'Giulia', 'Hans',
+    'Isabelle', 'Jan', 'Jürg', 'Karin', 'Laura', 'Lea', 'Luca', 'Marco', 'Maria', 'Martin',
+    'Michael', 'Monika', 'Nicole', 'Noah', 'Patrick', 'Peter', 'Raphael', 'Reto', 'Sandra', 'Sarah',
+    'Simon', 'Sophie', 'Stefan', 'Thomas', 'Ursula', 'Urs', 'Valérie', 'Yannick', 'Zoé', 'Élodie',
+]
+FAMILY_NAMES = [
+    'Müller', 'Meier', 'Schmid', 'Keller', 'Weber', 'Huber', 'Schneider', 'Meyer', 'Steiner', 'Fischer',
+    'Gerber', 'Brunner', 'Baumann', 'Frei', 'Zimmermann', 'Moser', 'Widmer', 'Wyss', 'Graf', 'Roth',
+    'Rochat', 'Favre', 'Bonvin', 'Rey', 'Morel', 'Bernasconi', 'Rossi', 'Bianchi', 'Ferrari', 'Caduff',
+    'Cadruvi', 'Sommer', 'Bühler', 'Suter', 'Lüthi', 'Kälin', 'Zürcher', 'Hofmann', 'Bachmann', 'Egli',
+]
+STREETS = [
+    'Bahnhofstrasse', 'Hauptstrasse', 'Dorfstrasse', 'Kirchweg', 'Schulstrasse', 'Seestrasse',
+    'Rue de la Gare', 'Rue du Lac', 'Chemin des Vignes', 'Via Cantonale', 'Via San Gottardo', 'Gassa Sutò',
+]
+# Fixed timestamps, so that the seed alone determines the data
+REFERENCE_TIME = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+# Participants per random generator seed
+SEED_BLOCK = 1000
+
+USER_COLUMNS = [
+    'id', 'password', 'is_superuser', 'username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+    'date_joined',
+]
+PROFILE_COLUMNS = [
+    'id', 'user_id', 'given_name', 'family_name', 'birth_date', 'birth_place', 'eid_hash', 'verified_at',
+    'last_verified',
+]
+PARTICIPANT_COLUMNS = ['id', 'user_id', 'swiyu_profile_id', 'ahv_number', 'ahv_number_index', 'created_at', 'updated_at']
+SIGNATURE_COLUMNS = [
+    'id', 'initiative_id', 'participant_id', 'municipality_id', 'given_name', 'family_name', 'birth_date',
+    'given_name_index', 'family_name_index', 'street_and_number', 'postal_code', 'address', 'id_number',
+    'identity_hash', 'status', 'reviewed_at', 'review_notes', 'signed_at', 'updated_at',
+]
+
+
+class LoadDataError(Exception):
+    pass
+
+
+def municipality_weights(population_file=None):
+    """[(municipality_id, postal codes)] and their cumulative weights"""
+    from .models import Municipality, PostalCode
+
+    localities = {}
+    for municipality_id, postal_code in PostalCode.objects.order_by('municipality_id', 'postal_code').values_list(
+        'municipality_id', 'postal_code'
+    ):
+        localities.setdefault(municipality_id, []).append(postal_code)
+    municipalities = list(Municipality.objects.order_by('bfs_number').values_list('id', 'bfs_number', 'postal_code'))
+    if not municipalities:
+        raise LoadDataError('No municipalities imported (run import_municipalities first)')
+
+    if population_file:
+        with open(population_file, newline='', encoding='utf-8-sig') as f:
+            population = {int(row['bfs_number']): int(row['population']) for row in csv.DictReader(f)}
+        weights = [population.get(bfs_number, 0) for _, bfs_number, _ in municipalities]
+    else:
+        counts = dict(PostalCode.objects.values_list('municipality_id').annotate(n=Count('id')).order_by())
+        weights = [counts.get(pk, 1) for pk, _, _ in municipalities]
+    if not sum(weights):
+        raise LoadDataError('All municipality weights are zero')
+
+    rows = [(pk, localities.get(pk) or [postal_code or '']) for pk, _, postal_code in municipalities]
+    return rows, list(accumulate(weights))
+
+
+def ahv_number(number):
+    """Formatted AHV number 756.xxxx.xxxx.xc with a valid EAN-13 check digit"""
+    digits = f'756{number % 10 ** 9:09d}'
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    value = digits + str(check)
+    return f'{value[:3]}.{value[3:7]}.{value[7:11]}.{value[11:]}'
+
+
+class Generator:
+    """
+    Args:
+        initiatives: [(initiative_id, collection start, collection end)], most popular first
+        statuses: {status: share}
+        with_ahv: Give every participant an AHV number (one Fernet encryption each)
+    """
+
+    def __init__(self, initiatives, statuses, population_file=None, with_ahv=False):
+        self.initiatives = initiatives
+        self.initiative_weights = list(accumulate(1 / (rank + 1) for rank in range(len(initiatives))))
+        self.statuses = sorted(statuses)
+        self.status_weights = list(accumulate(statuses[status] for status in self.statuses))
+        self.municipalities, self.municipality_weights = municipality_weights(population_file)
+        self.with_ahv = with_ahv
+        self.ciphertexts = {}
+        self.name_indexes = {}
+
+    def _encrypted(self, value):
+        from .encryption import encrypt
+
+        ciphertext = self.ciphertexts.get(value)
+        if ciphertext is None:
+            ciphertext = self.ciphertexts[value] = encrypt(value)
+        return ciphertext
+
+    def _name_index(self, name):
+        from .encryption import blind_index
+        from .normalization import NAME, name_index_value
+
+        index = self.name_indexes.get(name)
+        if index is None:
+            normalized = name_index_value(name)
+            index = self.name_indexes[name] = (blind_index(NAME, normalized), normalized)
+        return index
+
+    def chunk(self, seed, first, offset, plan, signature_id):
+        """
+        COPY buffers of the participants offset .. offset + len(plan) - 1
+
+        Args:
+            first: First reserved primary key per table ('user', 'profile', 'participant')
+            plan: Number of signatures per participant
+            signature_id: Primary key of the chunk's first signature
+
+        Returns ({table: buffer}, count deltas).
+        """
+        from .aggregates import ELECTRONIC
+        from .encryption import blind_index, encrypt
+        from .normalization import AHV, IDENTITY, ahv_index_value
+
+        users, profiles, participants, signatures = (io.StringIO() for _ in range(4))
+        deltas = Counter()
+        now = REFERENCE_TIME.isoformat()
+        initiative_count = len(self.initiatives)
+
+        for i, signs in enumerate(plan):
+            n = offset + i
+            if n % SEED_BLOCK == 0:
+                rng = random.Random(f'{seed}:{n // SEED_BLOCK}')
+            user_id, profile_id, participant_id = first['user'] + n, first['profile'] + n, first['participant'] + n
+            given_name = rng.choice(GIVEN_NAMES)
+            family_name = rng.choice(FAMILY_NAMES)
+            birth_date = (date(1930, 1, 1) + timedelta(days=rng.randrange(365 * 77))).isoformat()
+            municipality_id, postal_codes = self.municipalities[
+                bisect.bisect_right(self.municipality_weights, rng.random() * self.municipality_weights[-1])
+            ]
+            postal_code = rng.choice(postal_codes)
+            street = f'{rng.choice(STREETS)} {rng.randint(1, 120)}'
+
+            users.write(f'{user_id}\t!\tf\tload-{user_id}\t\t\t\tf\tt\t{now}\n')
+            profiles.write(
+                f'{profile_id}\t{user_id}\t{given_name}\t{family_name}\t{birth_date}\t\t'
+                f'{hashlib.sha256(f"load-data:{user_id}".encode()).hexdigest()}\t{now}\t{now}\n'
+            )
+            if self.with_ahv:
+                ahv = ahv_number(participant_id)
+                ahv_columns = f'{encrypt(ahv)}\t{blind_index(AHV, ahv_index_value(ahv))}'
+            else:
+                ahv_columns = '\\N\t\\N'
+            participants.write(f'{participant_id}\t{user_id}\t{profile_id}\t{ahv_columns}\t{now}\t{now}\n')
+            if not signs:
+                continue
+
+            given_index, given_normalized = self._name_index(given_name)
+            family_index, family_normalized = self._name_index(family_name)
+            # Same value as identity_value() (names normalized by name_index_value())
+            identity = blind_index(IDENTITY, f'{given_normalized}|{family_normalized}|{birth_date}')
+            personal = '\t'.join(self._encrypted(value) for value in (given_name, family_name, birth_date))
+            encrypted_street = self._encrypted(street)
+
+            chosen = set(range(initiative_count)) if signs == initiative_count else set()
+            while len(chosen) < signs:
+                chosen.add(bisect.bisect_right(self.initiative_weights, rng.random() * self.initiative_weights[-1]))
+            for index in sorted(chosen):
+                initiative_id, start, end = self.initiatives[index]
+                status = self.statuses[bisect.bisect_right(self.status_weights, rng.random() * self.status_weights[-1])]
+                signed_at = start + timedelta(seconds=rng.uniform(0, max((end - start).total_seconds(), 1)))
+                reviewed_at = '\\N' if status == 'pending' else (signed_at + timedelta(hours=rng.randint(1, 72))).isoformat()
+                signatures.write(
+                    f'{signature_id}\t{initiative_id}\t{participant_id}\t{municipality_id}\t{personal}\t'
+                    f'{given_index}\t{family_index}\t{encrypted_street}\t{postal_code}\t\t\t{identity}\t'
+                    f'{status}\t{reviewed_at}\t\t{signed_at.isoformat()}\t{signed_at.isoformat()}\n'
+                )
+                deltas[(initiative_id, municipality_id, ELECTRONIC, status)] += 1
+                signature_id += 1
+
+        return {'user': users, 'profile': profiles, 'participant': participants, 'signature': signatures}, deltas
+
+
+def _tables():
+    from django.contrib.auth.models import User
+    from swiyu.models import SwiyuUserProfile
+    from .models import Participant, Signature
+
+    return [
+        ('user', User, USER_COLUMNS),
+        ('profile', SwiyuUserProfile, PROFILE_COLUMNS),
+        ('participant', Participant, PARTICIPANT_COLUMNS),
+        ('signature', Signature, SIGNATURE_COLUMNS),
+    ]
+
+
+def reserve_ids(participants, signatures):
+    """First primary key per table, reserved by advancing the sequences"""
+    counts = {'user': participants, 'profile': participants, 'participant': participants, 'signature': signatures}
+    first = {}
+    with connection.cursor() as cursor:
+        for key, model, _ in _tables():
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [model._meta.db_table])
+            sequence = cursor.fetchone()[0]
+            cursor.execute('SELECT nextval(%s)', [sequence])
+            first[key] = cursor.fetchone()[0]
+            cursor.execute('SELECT setval(%s, %s)', [sequence, first[key] + max(counts[key], 1) - 1])
+    return first
+
+
+# Generator of the current (worker) process
+_generator = None
+
+
+def _init_worker(config):
+    import django
+    django.setup()
+    global _generator
+    _generator = Generator(**config)
+
+
+def load_chunk(seed, first, offset, plan, signature_id):
+    """Generate and COPY one chunk of participants (runs in a worker process). Returns the signature count."""
+    from .aggregates import adjust_counts
+
+    buffers, deltas = _generator.chunk(seed, first, offset, plan, signature_id)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for key, model, columns in _tables():
+                buffer = buffers[key]
+                buffer.seek(0)
+                cursor.copy_expert(f'COPY {model._meta.db_table} ({", ".join(columns)}) FROM STDIN', buffer)
+        adjust_counts(deltas)
+    return sum(plan)
+
+
+def generate_load_data(
+    participants, signatures, initiatives, statuses, seed=1, population_file=None, with_ahv=False,
+    chunk_size=50000, workers=None, progress=None,
+):
+    """
+    Create synthetic participants and signatures
+
+    Args:
+        initiatives: Initiatives to sign, most popular first
+        statuses: {status: share} of the signatures
+        workers: Number of worker processes (default: number of CPUs)
+        progress: Optional callable(participants, signatures) called per finished chunk
+    """
+    if participants <= 0 or not 0 <= signatures <= participants * len(initiatives):
+        raise LoadDataError('Every participant signs an initiative at most once: need signatures <= participants * initiatives')
+
+    config = {
+        'initiatives': [
+            (
+                initiative.pk,
+                initiative.collection_start_date or initiative.created_at,
+                min(
+                    initiative.collection_end_date or REFERENCE_TIME,
+                    (initiative.collection_start_date or initiative.created_at) + timedelta(days=180),
+                ),
+            )
+            for initiative in initiatives
+        ],
+        'statuses': statuses,
+        'population_file': population_file,
+        'with_ahv': with_ahv,
+    }
+    # Fails early (e.g. no municipalities) instead of in every worker
+    municipality_weights(population_file)
+
+    chunk_size = max(SEED_BLOCK, chunk_size // SEED_BLOCK * SEED_BLOCK)
+    first = reserve_ids(participants, signatures)
+    per_participant, extra = divmod(signatures, participants)
+    tasks = []
+    signature_id = first['signature']
+    for offset in range(0, participants, chunk_size):
+        plan = [per_participant + (1 if n < extra else 0) for n in range(offset, min(offset + chunk_size, participants))]
+        tasks.append((seed, first, offset, plan, signature_id))
+        signature_id += sum(plan)
+
+    # Forked workers must not reuse the parent's database connection
+    connections.close_all()
+
+    done = [0, 0]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(config,)) as pool:
+        futures = {pool.submit(load_chunk, *task): len(task[3]) for task in tasks}
+        for future in as_completed(futures):
+            done[0] += futures[future]
+            done[1] += future.result()
+            if progress:
+                progress(*done)
+
+    with connection.cursor() as cursor:
+        for _, model, _ in _tables():
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+    logger.info(f'Generated {participants} participants and {signatures} signatures (seed {seed})')
+    return first
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.retention import apply_retention, archived_initiatives, due_statuses, pending_rows
+
+
+class Command(BaseCommand):
+    help = 'Anonymize signer data of archived initiatives whose retention period has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--initiative', type=int, help='Only this (archived) initiative')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the rows that are due')
+        parser.add_argument('--batch-size', type=int, help='Rows per transaction (default: RETENTION_BATCH_SIZE)')
+        parser.add_argument('--duty-cycle', type=float, help='Share of time spent writing (default: RETENTION_DUTY_CYCLE)')
+
+    def handle(self, *args, **options):
+        initiatives = archived_initiatives()
+        if options['initiative']:
+            initiatives = initiatives.filter(pk=options['initiative'])
+            if not initiatives.exists():
+                raise CommandError(f"Initiative {options['initiative']} not found or not archived")
+
+        for initiative in initiatives:
+            statuses = due_statuses(initiative)
+            if not statuses:
+                self.stdout.write(f'"{initiative.title}": nothing due yet')
+                continue
+
+            pending = pending_rows(initiative, statuses)
+            self.stdout.write(f'"{initiative.title}": {sum(pending.values())} signature(s) due ({", ".join(statuses)})')
+            if options['dry_run']:
+                for (channel, status), rows in sorted(pending.items()):
+                    self.stdout.write(f'  {channel} {status}: {rows}')
+                continue
+
+            totals = {}
+
+            def progress(channel, status, rows):
+                key = (channel, status)
+                totals[key] = totals.get(key, 0) + rows
+                self.stdout.write(f'  {channel} {status}: {totals[key]}/{pending.get(key, totals[key])}')
+
+            results = apply_retention(
+                initiative,
+                batch_size=options['batch_size'],
+                duty_cycle=options['duty_cycle'],
+                progress=progress,
+            )
+            self.stdout.write(self.style.SUCCESS(f'  Anonymized {sum(results.values())} signature(s)'))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.finalization import FinalizationError, finalize_initiative, verify_result
+from core.models import Initiative, InitiativeResult
+
+
+class Command(BaseCommand):
+    help = 'Compute the final, immutable signature tally of a closed initiative (resumes interrupted runs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('initiative_id', type=int, help='Closed initiative to finalize')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Signatures per checkpoint')
+        parser.add_argument('--allow-pending', action='store_true', help='Finalize although signatures are not reviewed yet')
+        parser.add_argument('--verify', action='store_true', help='Only check the digest of an existing result')
+
+    def handle(self, *args, **options):
+        try:
+            initiative = Initiative.objects.get(pk=options['initiative_id'])
+        except Initiative.DoesNotExist:
+            raise CommandError(f"Initiative {options['initiative_id']} not found")
+
+        if options['verify']:
+            result = InitiativeResult.objects.filter(initiative=initiative, completed_at__isnull=False).first()
+            if result is None:
+                raise CommandError(f'"{initiative.title}" has no final result')
+            if not verify_result(result):
+                raise CommandError(f'Digest mismatch for "{initiative.title}": the stored snapshot was modified')
+            self.stdout.write(self.style.SUCCESS(f'Digest OK: {result.sha256}'))
+            return
+
+        def progress(channel, rows):
+            self.stdout.write(f'  {rows} {channel} signature(s) counted')
+
+        self.stdout.write(f'Finalizing "{initiative.title}"...')
+        try:
+            result = finalize_initiative(
+                initiative,
+                chunk_size=options['chunk_size'],
+                allow_pending=options['allow_pending'],
+                progress=progress,
+            )
+        except FinalizationError as e:
+            raise CommandError(str(e))
+
+        totals = result.snapshot['totals']
+        self.stdout.write(self.style.SUCCESS(
+            f'\nFinal result:\n'
+            f'  Accepted signatures: {result.total_accepted}\n'
+            f'  Electronic: {totals.get("electronic:accepted", 0)} '
+            f'(rejected {totals.get("electronic:rejected", 0)}, pending {totals.get("electronic:pending", 0)})\n'
+            f'  Paper: {totals.get("paper:accepted", 0)} (duplicates {totals.get("paper:duplicate", 0)})\n'
+            f'  Cantons: {len(result.snapshot["cantons"])}, municipalities: {len(result.snapshot["municipalities"])}\n'
+            f'  SHA-256: {result.sha256}'
+        ))
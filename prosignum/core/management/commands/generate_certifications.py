@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.certification import generate_certifications, initiative_directory
+from core.models import Initiative, Municipality
+
+
+class Command(BaseCommand):
+    help = 'Render the certifications of voting rights of all municipalities of an initiative in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('initiative_id', type=int, help='Initiative ID')
+        parser.add_argument('--output', default=settings.CERTIFICATION_OUTPUT_DIR, help='Output directory')
+        parser.add_argument('--workers', type=int, default=settings.CERTIFICATION_WORKERS, help='Worker processes (0 = number of CPUs)')
+        parser.add_argument('--bfs', type=int, nargs='+', help='Only these municipalities (BFS numbers)')
+        parser.add_argument('--language', choices=[code for code, _ in settings.LANGUAGES], help='Document language')
+
+    def handle(self, *args, **options):
+        try:
+            initiative = Initiative.objects.get(pk=options['initiative_id'])
+        except Initiative.DoesNotExist:
+            raise CommandError(f"Initiative {options['initiative_id']} not found")
+
+        municipality_ids = None
+        if options['bfs']:
+            municipality_ids = list(Municipality.objects.filter(bfs_number__in=options['bfs']).values_list('id', flat=True))
+            if len(municipality_ids) != len(set(options['bfs'])):
+                raise CommandError('Unknown BFS number(s)')
+
+        verbosity = options['verbosity']
+
+        def progress(done, total, filename):
+            if verbosity > 1 or done == total or done % 100 == 0:
+                self.stdout.write(f'  {done}/{total} {filename}')
+
+        self.stdout.write(f'Generating certifications for "{initiative.title}"...')
+        started = time.monotonic()
+        results = generate_certifications(
+            initiative,
+            options['output'],
+            workers=options['workers'] or None,
+            municipality_ids=municipality_ids,
+            language=options['language'],
+            progress=progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{len(results)} certification(s) with {sum(row[2] for row in results)} signatures '
+            f'written to {initiative_directory(options["output"], initiative.pk)} '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
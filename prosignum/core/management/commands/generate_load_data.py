@@ -0,0 +1,78 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.load_data import LoadDataError, generate_load_data
+from core.models import Initiative, Signature
+
+DEFAULT_STATUS_MIX = 'pending:0.2,accepted:0.75,rejected:0.05'
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic participants and signatures with PostgreSQL COPY (benchmarking only, see core/load_data.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, required=True, help='Number of participants to create')
+        parser.add_argument('--signatures', type=int, required=True, help='Number of signatures to create')
+        parser.add_argument(
+            '--initiative', type=int, action='append', dest='initiatives',
+            help='Initiative to sign, most popular first (repeatable, default: all active initiatives)',
+        )
+        parser.add_argument(
+            '--status-mix', default=DEFAULT_STATUS_MIX,
+            help=f'Share of signatures per status (default: {DEFAULT_STATUS_MIX})',
+        )
+        parser.add_argument('--population', help='CSV with bfs_number and population columns (default: weight by localities)')
+        parser.add_argument('--ahv', action='store_true', help='Give every participant an AHV number (slower)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Participants per COPY transaction (rounded to a multiple of 1000)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: number of CPUs)')
+        parser.add_argument('--force', action='store_true', help='Allow running with DEBUG off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('This writes synthetic personal data; pass --force to run it with DEBUG off')
+        if connection.vendor != 'postgresql':
+            raise CommandError('generate_load_data requires PostgreSQL (COPY)')
+
+        initiative_ids = options['initiatives'] or list(
+            Initiative.objects.filter(status='active').order_by('id').values_list('id', flat=True)
+        )
+        initiatives = Initiative.objects.in_bulk(initiative_ids)
+        missing = [pk for pk in initiative_ids if pk not in initiatives]
+        if not initiative_ids or missing:
+            raise CommandError(f'Initiatives not found: {missing}' if missing else 'No active initiative')
+
+        try:
+            statuses = {
+                status: float(share)
+                for status, share in (item.split(':') for item in options['status_mix'].split(','))
+            }
+        except ValueError:
+            raise CommandError(f'Invalid --status-mix, expected e.g. {DEFAULT_STATUS_MIX}')
+        if set(statuses) - {choice for choice, _ in Signature.STATUS_CHOICES} or sum(statuses.values()) <= 0:
+            raise CommandError(f'Invalid --status-mix, expected e.g. {DEFAULT_STATUS_MIX}')
+
+        started = time.monotonic()
+
+        def progress(participants, signatures):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{participants}/{options['participants']} participants, {signatures}/{options['signatures']} "
+                f"signatures ({signatures / elapsed:.0f} signatures/s)"
+            )
+
+        try:
+            generate_load_data(
+                options['participants'], options['signatures'], [initiatives[pk] for pk in initiative_ids], statuses,
+                seed=options['seed'], population_file=options['population'], with_ahv=options['ahv'],
+                chunk_size=options['chunk_size'], workers=options['workers'], progress=progress,
+            )
+        except LoadDataError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {options['participants']} participants and {options['signatures']} signatures "
+            f"in {time.monotonic() - started:.0f}s"
+        ))
@@ -1,10 +1,13 @@
 import csv
 from django.core.management.base import BaseCommand
-from core.models import Municipality
+from django.db import transaction
+from django.db.models import Max
+from core.models import Municipality, PostalCode
+from core.municipality_lookup import invalidate_municipality_lookup
 
 
 class Command(BaseCommand):
-    help = 'Import municipalities from CSV file (AMTOVZ format)'
+    help = 'Import municipalities and their postal codes from CSV file (AMTOVZ format)'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to CSV file')
@@ -20,6 +23,8 @@ class Command(BaseCommand):
 
         # Track unique municipalities by BFS number
         municipalities_data = {}
+        # Every distinct (PLZ, locality, BFS number) combination
+        postal_code_rows = set()
 
         try:
             with open(csv_file, 'r', encoding='utf-8-sig') as f:
@@ -31,8 +36,9 @@ class Command(BaseCommand):
                         gemeindename = row['Gemeindename'].strip()
                         canton = row['Kantonskürzel'].strip()
                         postal_code = row['PLZ'].strip()
+                        locality = (row.get('Ortschaftsname') or gemeindename).strip()
 
-                        # Use first occurrence of each BFS number
+                        # Use first occurrence of each BFS number as primary postal code
                         if bfs_number not in municipalities_data:
                             municipalities_data[bfs_number] = {
                                 'name': gemeindename,
@@ -40,33 +46,57 @@ class Command(BaseCommand):
                                 'postal_code': postal_code
                             }
 
+                        postal_code_rows.add((postal_code, locality, bfs_number))
+
                     except (KeyError, ValueError) as e:
                         errors += 1
                         self.stdout.write(self.style.WARNING(f'Error parsing row: {e}'))
                         continue
 
-            # Now create or update municipalities
-            for bfs_number, data in municipalities_data.items():
-                municipality, created_flag = Municipality.objects.update_or_create(
-                    bfs_number=bfs_number,
-                    defaults={
-                        'name': data['name'],
-                        'canton': data['canton'],
-                        'postal_code': data['postal_code']
-                    }
+            with transaction.atomic():
+                # Now create or update municipalities
+                municipality_ids = {}
+                for bfs_number, data in municipalities_data.items():
+                    municipality, created_flag = Municipality.objects.update_or_create(
+                        bfs_number=bfs_number,
+                        defaults={
+                            'name': data['name'],
+                            'canton': data['canton'],
+                            'postal_code': data['postal_code']
+                        }
+                    )
+                    municipality_ids[bfs_number] = municipality.id
+
+                    if created_flag:
+                        created += 1
+                    else:
+                        updated += 1
+
+                # Replace the PLZ mapping and bump the import version
+                version = (PostalCode.objects.aggregate(version=Max('import_version'))['version'] or 0) + 1
+                PostalCode.objects.all().delete()
+                PostalCode.objects.bulk_create(
+                    [
+                        PostalCode(
+                            postal_code=postal_code,
+                            locality=locality,
+                            municipality_id=municipality_ids[bfs_number],
+                            import_version=version,
+                        )
+                        for postal_code, locality, bfs_number in sorted(postal_code_rows)
+                    ],
+                    batch_size=2000,
                 )
 
-                if created_flag:
-                    created += 1
-                else:
-                    updated += 1
+            invalidate_municipality_lookup()
 
             self.stdout.write(self.style.SUCCESS(
                 f'\nImport complete!\n'
                 f'  Created: {created}\n'
                 f'  Updated: {updated}\n'
                 f'  Errors: {errors}\n'
-                f'  Total unique municipalities: {len(municipalities_data)}'
+                f'  Total unique municipalities: {len(municipalities_data)}\n'
+                f'  Postal code entries: {len(postal_code_rows)} (import version {version})'
             ))
 
         except FileNotFoundError:
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Initiative, PaperSignatureBatch
+from core.paper_signatures import import_paper_signatures
+
+
+class Command(BaseCommand):
+    help = 'Import a CSV file of scanned paper signatures and deduplicate it against existing signatures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('initiative_id', type=int, help='Initiative the signatures belong to')
+        parser.add_argument('csv_file', type=str, help='Path to CSV file')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        try:
+            initiative = Initiative.objects.get(pk=options['initiative_id'])
+        except Initiative.DoesNotExist:
+            raise CommandError(f"Initiative {options['initiative_id']} not found")
+
+        csv_file = options['csv_file']
+        self.stdout.write(f'Importing paper signatures from {csv_file} for "{initiative.title}"...')
+
+        batch = PaperSignatureBatch.objects.create(initiative=initiative, file_name=csv_file)
+
+        def progress(rows):
+            self.stdout.write(f'  {rows} rows read')
+
+        try:
+            with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+                conflicts = import_paper_signatures(batch, f, chunk_size=options['chunk_size'], progress=progress)
+        except FileNotFoundError:
+            batch.delete()
+            raise CommandError(f'File not found: {csv_file}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nImport complete!\n'
+            f'  Rows: {batch.total_rows}\n'
+            f'  Accepted: {batch.imported_rows}\n'
+            f'  Duplicates of electronic signatures (AHV): {conflicts["electronic_ahv"]}\n'
+            f'  Duplicates of electronic signatures (name/birth date): {conflicts["electronic"]}\n'
+            f'  Duplicates of paper signatures: {conflicts["paper"]}\n'
+            f'  Errors: {batch.error_rows}'
+        ))
+        if batch.errors:
+            self.stdout.write(self.style.WARNING(batch.errors))
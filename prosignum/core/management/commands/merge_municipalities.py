@@ -0,0 +1,65 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.municipality_merger import MergerError, affected_rows, merge_municipality, resolve_mapping
+
+
+class Command(BaseCommand):
+    help = 'Merge municipalities into their successors (old BFS number -> new BFS number) and retire the old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('mapping_file', nargs='?', help='CSV with old and new BFS number per row (header optional, ; or , separated)')
+        parser.add_argument('--map', action='append', default=[], metavar='OLD:NEW', help='Mapping of one municipality (repeatable)')
+        parser.add_argument('--batch-size', type=int, help='Signatures per transaction (default: MERGER_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the affected rows')
+
+    def _read_mapping(self, options):
+        pairs = []
+        try:
+            for item in options['map']:
+                old, new = item.split(':')
+                pairs.append((int(old), int(new)))
+            if options['mapping_file']:
+                with open(options['mapping_file'], newline='', encoding='utf-8-sig') as f:
+                    dialect = csv.Sniffer().sniff(f.read(4096), delimiters=';,')
+                    f.seek(0)
+                    for row in csv.reader(f, dialect):
+                        if len(row) >= 2 and row[0].strip().isdigit():
+                            pairs.append((int(row[0]), int(row[1])))
+        except (OSError, csv.Error, ValueError) as e:
+            raise CommandError(f'Invalid mapping: {e}')
+        if not pairs:
+            raise CommandError('No mapping given (mapping_file or --map OLD:NEW)')
+        return pairs
+
+    def handle(self, *args, **options):
+        try:
+            mergers = resolve_mapping(self._read_mapping(options))
+        except MergerError as e:
+            raise CommandError(str(e))
+
+        for old, new in mergers:
+            rows = affected_rows(old)
+            self.stdout.write(
+                f'{old.bfs_number} {old} -> {new.bfs_number} {new}: '
+                + ', '.join(f'{count} {kind.replace("_", " ")}' for kind, count in rows.items())
+            )
+            if options['dry_run']:
+                continue
+
+            started = time.monotonic()
+
+            def progress(channel, moved):
+                self.stdout.write(f'  {moved} {channel} signature(s) moved')
+
+            result = merge_municipality(old, new, batch_size=options['batch_size'], progress=progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"  Merged in {time.monotonic() - started:.1f}s: {result['signatures']} electronic, "
+                f"{result['paper_signatures']} paper signature(s), {result['reviewers']} reviewer(s) added to the new group"
+            ))
+            if result['reviewer_group_shared']:
+                self.stdout.write(self.style.WARNING(
+                    f'  The reviewer group of {old} is shared with another municipality of the same name and was '
+                    f'left unchanged: reassign the reviewers of {old.bfs_number} to {new} by hand'
+                ))
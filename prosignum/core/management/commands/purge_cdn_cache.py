@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.http_cache import all_tags, invalidate
+
+
+class Command(BaseCommand):
+    help = 'Invalidate the cached public pages (new ETags) and purge them at the CDN'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tag', action='append', dest='tags',
+            help="Cache tag to purge, e.g. 'pages' or 'initiative-3' (repeatable, default: all)",
+        )
+
+    def handle(self, *args, **options):
+        tags = options['tags'] or all_tags()
+        purged = invalidate(tags)
+        if purged:
+            self.stdout.write(self.style.SUCCESS(f'Invalidated and purged {len(tags)} tag(s)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Invalidated {len(tags)} tag(s) (CDN purging is not configured)'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.aggregates import rebuild_signature_counts
+from core.models import Initiative
+
+
+class Command(BaseCommand):
+    help = 'Recompute the maintained signature counts (SignatureCount) from the signature tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--initiative', type=int, help='Only rebuild the counts of this initiative')
+
+    def handle(self, *args, **options):
+        initiative_id = options['initiative']
+        if initiative_id and not Initiative.objects.filter(pk=initiative_id).exists():
+            raise CommandError(f'Initiative {initiative_id} not found')
+
+        rows = rebuild_signature_counts(initiative_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt signature counts: {rows} rows'))
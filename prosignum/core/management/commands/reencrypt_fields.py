@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from core.encryption import protected_fields, reencrypt_model
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt personal data with the current key and recompute blind indexes (key rotation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', help='Only this model (app_label.Model), repeatable')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per transaction')
+        parser.add_argument('--start-after', help='Continue after this primary key (single model only)')
+
+    def handle(self, *args, **options):
+        if options['model']:
+            try:
+                models = [apps.get_model(label) for label in options['model']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+        else:
+            models = [model for model in apps.get_models() if protected_fields(model)]
+
+        if options['start_after'] and len(models) != 1:
+            raise CommandError('--start-after requires exactly one --model')
+
+        for model in models:
+            label = model._meta.label
+            if not protected_fields(model):
+                raise CommandError(f'{label} has no encrypted fields')
+            self.stdout.write(f'{label}...')
+            done = [0]
+
+            def progress(rows, last_pk):
+                done[0] += rows
+                self.stdout.write(f'  {done[0]} rows (last pk {last_pk})')
+
+            rows = reencrypt_model(
+                model,
+                chunk_size=options['chunk_size'],
+                start_after=options['start_after'],
+                progress=progress,
+            )
+            self.stdout.write(self.style.SUCCESS(f'{label}: {rows} rows re-encrypted'))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Initiative, Municipality, ReviewSample
+from core.sampling import SamplingError, accept_population, draw_samples, review_result, with_review_counts
+
+
+class Command(BaseCommand):
+    help = 'Draw review samples of pending signatures per municipality and report their error rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('initiative_id', type=int)
+        parser.add_argument('--draw', action='store_true', help='Draw samples for municipalities without an open sample')
+        parser.add_argument('--bfs', type=int, nargs='+', help='Only these municipalities (BFS numbers)')
+        parser.add_argument('--seed', help='Seed of the draw (default: random, recorded on the samples)')
+        parser.add_argument('--accept', action='store_true', help='Accept the population of every passed open sample')
+
+    def handle(self, *args, **options):
+        try:
+            initiative = Initiative.objects.get(pk=options['initiative_id'])
+        except Initiative.DoesNotExist:
+            raise CommandError(f"Initiative {options['initiative_id']} not found")
+
+        municipality_ids = None
+        if options['bfs']:
+            municipality_ids = list(Municipality.objects.filter(bfs_number__in=options['bfs']).values_list('id', flat=True))
+            if len(municipality_ids) != len(set(options['bfs'])):
+                raise CommandError('Unknown BFS number')
+
+        if options['draw']:
+            try:
+                samples = draw_samples(initiative, municipality_ids=municipality_ids, seed=options['seed'])
+            except SamplingError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'Drew {len(samples)} sample(s)' + (f' with seed {samples[0].seed}' if samples else '')
+            ))
+
+        samples = with_review_counts(
+            ReviewSample.objects.filter(initiative=initiative, status='open').select_related('municipality')
+        ).order_by('municipality__name')
+        if municipality_ids is not None:
+            samples = samples.filter(municipality_id__in=municipality_ids)
+
+        for sample in samples:
+            result = review_result(sample)
+            rate = f"{result['error_rate']:.2%}" if result['error_rate'] is not None else '-'
+            self.stdout.write(
+                f"#{sample.pk} {sample.municipality}: {result['reviewed']}/{result['size']} of "
+                f"{sample.population_size} reviewed, errors {result['errors']} ({rate}, "
+                f"{result['confidence']:.0%} CI {result['lower']:.2%}-{result['upper']:.2%}): {result['verdict']}"
+            )
+            if options['accept'] and result['verdict'] == 'pass':
+                try:
+                    accepted = accept_population(sample)
+                except SamplingError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(self.style.SUCCESS(f'  {accepted} signature(s) accepted'))
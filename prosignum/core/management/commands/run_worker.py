@@ -0,0 +1,60 @@
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from core.jobs import claim_job, registered_job_types, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run a background job worker (start several processes for parallelism)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', type=str, default='', help='Comma separated job types to run (default: all)')
+        parser.add_argument('--name', type=str, default='', help='Worker name shown in the admin (default: host:pid)')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+
+    def handle(self, *args, **options):
+        job_types = [t.strip() for t in options['types'].split(',') if t.strip()] or registered_job_types()
+        unknown = set(job_types) - set(registered_job_types())
+        if unknown:
+            raise CommandError(f"Unknown job type(s): {', '.join(sorted(unknown))}")
+
+        worker = options['name'] or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+
+        def stop(signum, frame):
+            # Finish the current job, then exit
+            self.stopping = True
+            self.stdout.write(self.style.WARNING('Stopping after the current job...'))
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f'Worker {worker} running job types: {", ".join(job_types)}')
+        last_stale_check = float('-inf')
+
+        while not self.stopping:
+            close_old_connections()
+
+            if time.monotonic() - last_stale_check >= settings.JOB_STALE_TIMEOUT / 2:
+                requeue_stale_jobs()
+                last_stale_check = time.monotonic()
+
+            job = claim_job(worker, job_types)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+
+            self.stdout.write(f'Running {job}, attempt {job.attempts}/{job.max_attempts}')
+            started = time.monotonic()
+            status = run_job(job)
+            style = self.style.SUCCESS if status == 'succeeded' else self.style.ERROR
+            self.stdout.write(style(f'  {job.job_type} #{job.pk}: {status} ({time.monotonic() - started:.1f}s)'))
+
+        self.stdout.write('Worker stopped')
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand
+from core.slow_queries import clear_queries, recent_queries, top_offenders
+
+
+class Command(BaseCommand):
+    help = 'Show the slowest captured queries grouped by normalized SQL (see SLOW_QUERY_LOG_ENABLED)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of query groups to show')
+        parser.add_argument(
+            '--order-by', choices=['total', 'count', 'max'], default='total',
+            help='Order by total time, number of captures or slowest capture',
+        )
+        parser.add_argument('--plans', action='store_true', help='Show a sampled EXPLAIN plan per group')
+        parser.add_argument('--json', action='store_true', help='Dump the raw captured records as JSON')
+        parser.add_argument('--clear', action='store_true', help='Empty the ring buffer')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_queries()
+            self.stdout.write(self.style.SUCCESS('Cleared captured slow queries'))
+            return
+
+        records = recent_queries()
+        if options['json']:
+            self.stdout.write(json.dumps(records, indent=2, default=str))
+            return
+        if not records:
+            self.stdout.write('No slow queries captured')
+            return
+
+        for row in top_offenders(records, options['order_by'])[:options['top']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{row['fingerprint']}  {row['count']}x  total {row['total_ms']} ms  "
+                f"mean {row['mean_ms']} ms  max {row['max_ms']} ms  last {row['last_at']}"
+            ))
+            self.stdout.write(f"  sources: {', '.join(row['sources'])}")
+            self.stdout.write(f"  {row['sql']}")
+            if options['plans'] and row['plan']:
+                self.stdout.write('  ' + row['plan'].replace('\n', '\n  '))
+            self.stdout.write('')
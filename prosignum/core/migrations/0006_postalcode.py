@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_initiative_initiative_committee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostalCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('postal_code', models.CharField(help_text='PLZ', max_length=10)),
+                ('locality', models.CharField(help_text='Locality name (Ortschaftsname)', max_length=255)),
+                ('import_version', models.PositiveIntegerField(db_index=True, default=0)),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postal_codes', to='core.municipality')),
+            ],
+            options={
+                'verbose_name': 'Postal Code',
+                'verbose_name_plural': 'Postal Codes',
+                'ordering': ['postal_code', 'locality'],
+                'indexes': [models.Index(fields=['postal_code'], name='core_postal_postal__66ad5e_idx'), models.Index(fields=['locality'], name='core_postal_localit_920b67_idx')],
+                'unique_together': {('postal_code', 'locality', 'municipality')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_postalcode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(fields=['-signed_at', '-id'], name='core_signat_signed__keyset_idx'),
+        ),
+    ]
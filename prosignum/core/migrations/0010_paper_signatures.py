@@ -0,0 +1,143 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:04
+
+import hashlib
+import unicodedata
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+
+def _normalize_name(value):
+    # Frozen copy of core.normalization.normalize_name() as of this migration
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def _identity_hash(given_name, family_name, birth_date):
+    value = f"{_normalize_name(given_name)}|{_normalize_name(family_name)}|{birth_date}"
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def backfill_identity_hash(apps, schema_editor):
+    """Compute identity_hash for existing signatures, one transaction per chunk"""
+    Signature = apps.get_model('core', 'Signature')
+    last_id = 0
+    while True:
+        rows = list(
+            Signature.objects.filter(id__gt=last_id, identity_hash='')
+            .order_by('id')
+            .only('id', 'given_name', 'family_name', 'birth_date')[:5000]
+        )
+        if not rows:
+            break
+        for row in rows:
+            row.identity_hash = _identity_hash(row.given_name, row.family_name, row.birth_date)
+        with transaction.atomic():
+            Signature.objects.bulk_update(rows, ['identity_hash'], batch_size=1000)
+        last_id = rows[-1].id
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per chunk instead of holding one transaction over all signatures
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_signature_review_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaperSignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('given_name', models.CharField(max_length=255)),
+                ('family_name', models.CharField(max_length=255)),
+                ('birth_date', models.DateField()),
+                ('street_and_number', models.CharField(blank=True, help_text='Strasse und Hausnummer', max_length=255)),
+                ('postal_code', models.CharField(blank=True, help_text='PLZ', max_length=10)),
+                ('ahv_number', models.CharField(blank=True, help_text='Swiss AHV/AVS social security number', max_length=16, null=True)),
+                ('identity_hash', models.CharField(editable=False, max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending Deduplication'), ('accepted', 'Accepted'), ('duplicate', 'Duplicate')], default='pending', max_length=20)),
+                ('conflict', models.CharField(blank=True, choices=[('electronic_ahv', 'Electronic signature (AHV number)'), ('electronic', 'Electronic signature (name and birth date)'), ('paper', 'Other paper signature')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Paper Signature',
+                'verbose_name_plural': 'Paper Signatures',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaperSignatureBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('total_rows', models.IntegerField(default=0)),
+                ('imported_rows', models.IntegerField(default=0)),
+                ('duplicate_rows', models.IntegerField(default=0)),
+                ('error_rows', models.IntegerField(default=0)),
+                ('errors', models.TextField(blank=True, help_text='First parse errors of the file')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Paper Signature Batch',
+                'verbose_name_plural': 'Paper Signature Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='signature',
+            name='identity_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(fields=['initiative', 'identity_hash'], name='core_signat_initiat_084605_idx'),
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='initiative',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_signatures', to='core.initiative'),
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='municipality',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='paper_signatures', to='core.municipality'),
+        ),
+        migrations.AddField(
+            model_name='papersignaturebatch',
+            name='initiative',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper_signature_batches', to='core.initiative'),
+        ),
+        migrations.AddField(
+            model_name='papersignaturebatch',
+            name='uploaded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='paper_signature_batches', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='batch',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signatures', to='core.papersignaturebatch'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['initiative', 'identity_hash'], name='core_papers_initiat_24635e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['initiative', 'ahv_number'], name='core_papers_initiat_48aac3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['initiative', 'status'], name='core_papers_initiat_6fd615_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['batch', 'status'], name='core_papers_batch_i_0b76ab_idx'),
+        ),
+        migrations.RunPython(backfill_identity_hash, migrations.RunPython.noop),
+    ]
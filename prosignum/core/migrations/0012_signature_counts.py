@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Initial counts from the existing signatures (later maintained by core/aggregates.py)
+BACKFILL_SQL = """
+INSERT INTO core_signaturecount (initiative_id, municipality_id, canton, channel, status, count)
+SELECT s.initiative_id, s.municipality_id, m.canton, 'electronic', s.status, COUNT(*)
+FROM core_signature s
+JOIN core_municipality m ON m.id = s.municipality_id
+GROUP BY s.initiative_id, s.municipality_id, m.canton, s.status
+UNION ALL
+SELECT s.initiative_id, s.municipality_id, m.canton, 'paper', s.status, COUNT(*)
+FROM core_papersignature s
+JOIN core_papersignaturebatch b ON b.id = s.batch_id AND b.completed_at IS NOT NULL
+JOIN core_municipality m ON m.id = s.municipality_id
+GROUP BY s.initiative_id, s.municipality_id, m.canton, s.status
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignatureCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('canton', models.CharField(max_length=2)),
+                ('channel', models.CharField(choices=[('electronic', 'Electronic'), ('paper', 'Paper')], max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('initiative', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_counts', to='core.initiative')),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_counts', to='core.municipality')),
+            ],
+            options={
+                'verbose_name': 'Signature Count',
+                'verbose_name_plural': 'Signature Counts',
+                'indexes': [models.Index(fields=['initiative', 'status', 'canton'], name='core_signat_initiat_9c3e40_idx')],
+                'constraints': [models.UniqueConstraint(fields=('initiative', 'municipality', 'channel', 'status'), name='core_signaturecount_unique')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
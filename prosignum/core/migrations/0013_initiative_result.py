@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_signature_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InitiativeResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signature_checkpoint', models.BigIntegerField(default=0, help_text='Last counted Signature id')),
+                ('paper_checkpoint', models.BigIntegerField(default=0, help_text='Last counted PaperSignature id')),
+                ('partial_counts', models.JSONField(blank=True, default=dict)),
+                ('snapshot', models.JSONField(blank=True, null=True)),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('total_accepted', models.BigIntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('initiative', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='final_result', to='core.initiative')),
+            ],
+            options={
+                'verbose_name': 'Initiative Result',
+                'verbose_name_plural': 'Initiative Results',
+            },
+        ),
+    ]
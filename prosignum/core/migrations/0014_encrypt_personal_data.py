@@ -0,0 +1,105 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:27
+
+import core.encryption
+import core.normalization
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_initiative_result'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='papersignature',
+            name='core_papers_initiat_48aac3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='participant',
+            name='core_partic_ahv_num_579ac2_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='signature',
+            name='core_signat_given_trgm_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='signature',
+            name='core_signat_family_trgm_idx',
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='ahv_number_index',
+            field=core.encryption.BlindIndexField('ahv_number', normalize=core.normalization.ahv_index_value, null=True, purpose='ahv'),
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='ahv_number_index',
+            field=core.encryption.BlindIndexField('ahv_number', db_index=True, normalize=core.normalization.ahv_index_value, null=True, purpose='ahv'),
+        ),
+        migrations.AddField(
+            model_name='signature',
+            name='family_name_index',
+            field=core.encryption.BlindIndexField('family_name', normalize=core.normalization.name_index_value, null=True, purpose='name'),
+        ),
+        migrations.AddField(
+            model_name='signature',
+            name='given_name_index',
+            field=core.encryption.BlindIndexField('given_name', normalize=core.normalization.name_index_value, null=True, purpose='name'),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='ahv_number',
+            field=core.encryption.EncryptedCharField(blank=True, help_text='Swiss AHV/AVS social security number', max_length=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='identity_hash',
+            field=core.encryption.BlindIndexField('given_name', 'family_name', 'birth_date', normalize=core.normalization.identity_value, purpose='identity'),
+        ),
+        migrations.AlterField(
+            model_name='participant',
+            name='ahv_number',
+            field=core.encryption.EncryptedCharField(blank=True, help_text='Swiss AHV/AVS social security number', max_length=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='birth_date',
+            field=core.encryption.EncryptedDateField(),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='family_name',
+            field=core.encryption.EncryptedCharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='given_name',
+            field=core.encryption.EncryptedCharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='identity_hash',
+            field=core.encryption.BlindIndexField('given_name', 'family_name', 'birth_date', blank=True, normalize=core.normalization.identity_value, purpose='identity'),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='street_and_number',
+            field=core.encryption.EncryptedCharField(blank=True, help_text='Strasse und Hausnummer', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['initiative', 'ahv_number_index'], name='core_papers_initiat_6d9983_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(fields=['family_name_index'], name='core_signat_family__bc3102_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(fields=['given_name_index'], name='core_signat_given_n_b3c0e1_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:35
+
+import core.encryption
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_encrypt_personal_data'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('duplicate', 'Duplicate (paper)')], max_length=20)),
+                ('retention_days', models.PositiveIntegerField(help_text='Days after archiving until the signer data is anonymized')),
+            ],
+            options={
+                'verbose_name': 'Retention Policy',
+                'verbose_name_plural': 'Retention Policies',
+            },
+        ),
+        migrations.AddField(
+            model_name='initiative',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='anonymized_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='signature',
+            name='anonymized_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='birth_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='birth_date',
+            field=core.encryption.EncryptedDateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='signature',
+            name='participant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='signatures', to='core.participant'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(condition=models.Q(('anonymized_at__isnull', True)), fields=['initiative', 'status', 'id'], name='core_papers_retention_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='signature',
+            index=models.Index(condition=models.Q(('anonymized_at__isnull', True)), fields=['initiative', 'status', 'id'], name='core_signat_retention_idx'),
+        ),
+        migrations.AddField(
+            model_name='retentionpolicy',
+            name='initiative',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='retention_policies', to='core.initiative'),
+        ),
+        migrations.AddConstraint(
+            model_name='retentionpolicy',
+            constraint=models.UniqueConstraint(fields=('initiative', 'status'), name='core_retentionpolicy_unique'),
+        ),
+        migrations.RunSQL(
+            "UPDATE core_initiative SET archived_at = updated_at WHERE status = 'archived'",
+            migrations.RunSQL.noop,
+        ),
+    ]
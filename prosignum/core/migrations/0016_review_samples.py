@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.CharField(max_length=64)),
+                ('population_size', models.PositiveIntegerField(help_text='Pending signatures at the draw')),
+                ('max_signature_id', models.BigIntegerField(help_text='Population: pending signatures up to this id')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('accepted', 'Population accepted'), ('discarded', 'Discarded')], default='open', max_length=20)),
+                ('accepted_count', models.PositiveIntegerField(blank=True, help_text='Signatures accepted in bulk', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('initiative', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_samples', to='core.initiative')),
+                ('municipality', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_samples', to='core.municipality')),
+                ('signatures', models.ManyToManyField(blank=True, related_name='review_samples', to='core.signature')),
+            ],
+            options={
+                'verbose_name': 'Review Sample',
+                'verbose_name_plural': 'Review Samples',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'open')), fields=('initiative', 'municipality'), name='core_reviewsample_one_open')],
+            },
+        ),
+    ]
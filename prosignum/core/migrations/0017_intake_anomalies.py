@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_review_samples'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntakeAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('burst', 'Burst'), ('regular', 'Regular intervals')], max_length=20)),
+                ('minute', models.DateTimeField(help_text='Start of the minute')),
+                ('observed', models.PositiveIntegerField(help_text='Signatures in the minute when flagged')),
+                ('expected', models.FloatField(help_text='Baseline signatures per minute')),
+                ('threshold', models.FloatField()),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('process', models.CharField(help_text='Host and process id that flagged it', max_length=100)),
+                ('acknowledged_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('acknowledged_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('initiative', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='intake_anomalies', to='core.initiative')),
+                ('municipality', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='intake_anomalies', to='core.municipality')),
+            ],
+            options={
+                'verbose_name': 'Intake Anomaly',
+                'verbose_name_plural': 'Intake Anomalies',
+                'ordering': ['-minute', '-id'],
+                'indexes': [models.Index(fields=['initiative', '-minute'], name='core_intake_initiat_98c99b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:09
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_intake_anomalies'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='papersignaturebatch',
+            name='source_file',
+            field=models.FileField(blank=True, help_text='Uploaded CSV, imported by a background job and deleted afterwards', storage=core.models.paper_signature_storage, upload_to='paper_signatures/'),
+        ),
+    ]
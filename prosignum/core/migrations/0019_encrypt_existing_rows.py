@@ -0,0 +1,70 @@
+from django.db import connection, migrations, transaction
+
+# Encrypted and blind index fields per model as of this migration (0014_encrypt_personal_data)
+FIELDS = {
+    'Participant': ['ahv_number', 'ahv_number_index'],
+    'Signature': [
+        'given_name', 'family_name', 'birth_date', 'street_and_number',
+        'given_name_index', 'family_name_index', 'identity_hash',
+    ],
+    'PaperSignature': ['ahv_number', 'ahv_number_index', 'identity_hash'],
+}
+
+
+def _update_rows(model, fields, rows):
+    # Frozen copy of core.encryption._update_rows() as of this migration: one UPDATE ... FROM (VALUES ...) per chunk
+    pk = model._meta.pk
+    columns = [pk.column] + [field.column for field in fields]
+    quote = connection.ops.quote_name
+    placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    params = []
+    for row in rows:
+        params.append(pk.get_db_prep_value(row.pk, connection))
+        params.extend(field.get_db_prep_save(getattr(row, field.attname), connection) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {quote(model._meta.db_table)} AS t
+            SET {', '.join(f'{quote(field.column)} = v.{quote(field.column)}' for field in fields)}
+            FROM (VALUES {', '.join([placeholder] * len(rows))}) AS v ({', '.join(quote(column) for column in columns)})
+            WHERE t.{quote(pk.column)} = v.{quote(pk.column)}::{pk.db_type(connection)}
+            """,
+            params,
+        )
+
+
+def _reencrypt(model, names, chunk_size=2000):
+    # Frozen copy of the chunk loop of core.encryption.reencrypt_model() as of this migration
+    fields = [model._meta.get_field(name) for name in names]
+    indexes = [field for field in fields if hasattr(field, 'source_fields')]
+    load = {field.name for field in fields} | {source for field in indexes for source in field.source_fields}
+    last_pk = 0
+    while True:
+        rows = list(model._base_manager.filter(pk__gt=last_pk).order_by('pk').only(*load)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            for field in indexes:
+                setattr(row, field.attname, field.compute(row))
+        with transaction.atomic():
+            _update_rows(model, fields, rows)
+        last_pk = rows[-1].pk
+
+
+def encrypt_existing_rows(apps, schema_editor):
+    """Encrypt plaintext rows and fill the blind indexes, one transaction per chunk (see reencrypt_fields)"""
+    for model_name, names in FIELDS.items():
+        _reencrypt(apps.get_model('core', model_name), names)
+
+
+class Migration(migrations.Migration):
+    # Data only: commits per chunk, an interrupted run is simply repeated
+    atomic = False
+
+    dependencies = [
+        ('core', '0018_paper_signature_private_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(encrypt_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:48
+
+import core.encryption
+import core.normalization
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_encrypt_existing_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papersignature',
+            name='family_name_index',
+            field=core.encryption.BlindIndexField('family_name', normalize=core.normalization.name_index_value, null=True, purpose='name'),
+        ),
+        migrations.AddField(
+            model_name='papersignature',
+            name='given_name_index',
+            field=core.encryption.BlindIndexField('given_name', normalize=core.normalization.name_index_value, null=True, purpose='name'),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='birth_date',
+            field=core.encryption.EncryptedDateField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='family_name',
+            field=core.encryption.EncryptedCharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='given_name',
+            field=core.encryption.EncryptedCharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='papersignature',
+            name='street_and_number',
+            field=core.encryption.EncryptedCharField(blank=True, help_text='Strasse und Hausnummer', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['family_name_index'], name='core_papers_family__849cd5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='papersignature',
+            index=models.Index(fields=['given_name_index'], name='core_papers_given_n_344324_idx'),
+        ),
+    ]
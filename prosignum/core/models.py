@@ -1,8 +1,14 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User, Group
+from django.core.files.storage import FileSystemStorage
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .encryption import BlindIndexField, EncryptedCharField, EncryptedDateField
+from .normalization import AHV, IDENTITY, NAME, ahv_index_value, identity_value, name_index_value
 
 
 class Municipality(models.Model):
@@ -29,6 +35,30 @@ class Municipality(models.Model):
         return f"{self.name} ({self.canton})"
 
 
+class PostalCode(models.Model):
+    """Postal code (PLZ) and locality served by a municipality (one row per AMTOVZ entry)"""
+
+    postal_code = models.CharField(max_length=10, help_text="PLZ")
+    locality = models.CharField(max_length=255, help_text="Locality name (Ortschaftsname)")
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, related_name='postal_codes')
+
+    # Incremented on every AMTOVZ import, used to invalidate in-memory lookups
+    import_version = models.PositiveIntegerField(default=0, db_index=True)
+
+    class Meta:
+        verbose_name = "Postal Code"
+        verbose_name_plural = "Postal Codes"
+        ordering = ['postal_code', 'locality']
+        unique_together = [('postal_code', 'locality', 'municipality')]
+        indexes = [
+            models.Index(fields=['postal_code']),
+            models.Index(fields=['locality']),
+        ]
+
+    def __str__(self):
+        return f"{self.postal_code} {self.locality}"
+
+
 class Initiative(models.Model):
     """Referendum/Initiative"""
 
@@ -58,6 +88,8 @@ class Initiative(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     closed_at = models.DateTimeField(null=True, blank=True)
+    # Start of the retention periods of signer data (see RetentionPolicy)
+    archived_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         verbose_name = "Initiative"
@@ -71,6 +103,11 @@ class Initiative(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if self.status == 'archived' and not self.archived_at:
+            self.archived_at = timezone.now()
+        super().save(*args, **kwargs)
+
     def is_collecting(self):
         """Check if initiative is currently in collection period"""
         from django.utils import timezone
@@ -87,27 +124,67 @@ class Initiative(models.Model):
 
         return True
 
-    def get_total_signatures(self):
-        """Get total accepted signatures"""
-        return self.signatures.filter(status='accepted').count()
+    def get_final_result(self):
+        """Completed InitiativeResult of a closed initiative, or None"""
+        if self.status != 'closed':
+            return None
+        try:
+            result = self.final_result
+        except InitiativeResult.DoesNotExist:
+            return None
+        return result if result.completed_at else None
 
-    def get_progress_percentage(self):
-        """Get signature collection progress as percentage"""
+    def get_total_signatures(self):
+        """Get total accepted signatures (electronic and paper)"""
+        result = self.get_final_result()
+        if result:
+            return result.total_accepted
+        return self.signature_counts.filter(status='accepted').aggregate(
+            total=models.Sum('count', default=0)
+        )['total']
+
+    def get_progress_percentage(self, total=None):
+        """Get signature collection progress as percentage (pass ``total`` if already known)"""
         if self.target_signatures <= 0:
             return 0
-        total = self.get_total_signatures()
+        if total is None:
+            total = self.get_total_signatures()
         return min(100, int((total / self.target_signatures) * 100))
 
     def get_signatures_by_municipality(self):
-        """Get accepted signatures grouped by municipality"""
-        return (
-            self.signatures
-            .filter(status='accepted')
+        """Get accepted signatures (electronic and paper) grouped by municipality"""
+        result = self.get_final_result()
+        if result:
+            return [
+                {'municipality__name': row['name'], 'municipality__canton': row['canton'], 'count': row['count']}
+                for row in sorted(result.snapshot['municipalities'], key=lambda row: (row['name'], row['canton']))
+            ]
+        return list(
+            self.signature_counts
+            .filter(status='accepted', count__gt=0)
             .values('municipality__name', 'municipality__canton')
-            .annotate(count=models.Count('id'))
-            .order_by('municipality__name')
+            .annotate(count=models.Sum('count'))
+            .order_by('municipality__name', 'municipality__canton')
         )
 
+    def get_signatures_by_canton(self):
+        """Get accepted signatures (electronic and paper) grouped by canton"""
+        result = self.get_final_result()
+        if result:
+            return [{'canton': row['canton'], 'count': row['count']} for row in result.snapshot['cantons']]
+        return list(
+            self.signature_counts
+            .filter(status='accepted', count__gt=0)
+            .values('canton')
+            .annotate(count=models.Sum('count'))
+            .order_by('canton')
+        )
+
+    def get_signature_totals(self):
+        """Get national totals as {(channel, status): count}"""
+        rows = self.signature_counts.values('channel', 'status').annotate(total=models.Sum('count'))
+        return {(row['channel'], row['status']): row['total'] for row in rows}
+
 
 class Participant(models.Model):
     """Citizen participating in signature collection (linked to Swiyu profile)"""
@@ -117,8 +194,9 @@ class Participant(models.Model):
     # Links to Swiyu profile
     swiyu_profile = models.ForeignKey('swiyu.SwiyuUserProfile', on_delete=models.PROTECT)
 
-    # AHV (Social Security) Number
-    ahv_number = models.CharField(max_length=16, blank=True, null=True, db_index=True, help_text="Swiss AHV/AVS social security number")
+    # AHV (Social Security) Number, encrypted; lookups go through the blind index
+    ahv_number = EncryptedCharField(max_length=16, blank=True, null=True, help_text="Swiss AHV/AVS social security number")
+    ahv_number_index = BlindIndexField('ahv_number', purpose=AHV, normalize=ahv_index_value, null=True, db_index=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -126,9 +204,6 @@ class Participant(models.Model):
     class Meta:
         verbose_name = "Participant"
         verbose_name_plural = "Participants"
-        indexes = [
-            models.Index(fields=['ahv_number']),
-        ]
 
     def __str__(self):
         return f"{self.swiyu_profile.given_name} {self.swiyu_profile.family_name}"
@@ -144,31 +219,44 @@ class Signature(models.Model):
     ]
 
     initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='signatures')
-    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='signatures')
+    # Cleared when the signature is anonymized (see core/retention.py)
+    participant = models.ForeignKey(Participant, null=True, on_delete=models.CASCADE, related_name='signatures')
     municipality = models.ForeignKey(Municipality, on_delete=models.PROTECT, related_name='signatures')
 
-    # Signature data (collected at signing time)
-    given_name = models.CharField(max_length=255)
-    family_name = models.CharField(max_length=255)
-    birth_date = models.DateField()
+    # Signature data (collected at signing time, encrypted)
+    given_name = EncryptedCharField(max_length=255)
+    family_name = EncryptedCharField(max_length=255)
+    birth_date = EncryptedDateField(null=True)
+
+    # Exact name search (case- and accent-insensitive)
+    given_name_index = BlindIndexField('given_name', purpose=NAME, normalize=name_index_value, null=True)
+    family_name_index = BlindIndexField('family_name', purpose=NAME, normalize=name_index_value, null=True)
 
     # Address fields (Swiss official format)
-    street_and_number = models.CharField(max_length=255, blank=True, help_text="Strasse und Hausnummer")
+    street_and_number = EncryptedCharField(max_length=255, blank=True, help_text="Strasse und Hausnummer")
     postal_code = models.CharField(max_length=10, blank=True, help_text="PLZ")
 
     # Legacy address field (for backwards compatibility)
     address = models.TextField(blank=True)
     id_number = models.CharField(max_length=100, blank=True, help_text="National ID or similar")
 
+    # Keyed hash of name and birth date for cross-channel deduplication (see PaperSignature)
+    identity_hash = BlindIndexField('given_name', 'family_name', 'birth_date', purpose=IDENTITY, normalize=identity_value, blank=True)
+
     # Review status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     reviewed_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='reviewed_signatures')
     reviewed_at = models.DateTimeField(null=True, blank=True)
     review_notes = models.TextField(blank=True)
 
+    # Review work queue lease (see core/review_queue.py)
+    review_lease_owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='review_leases')
+    review_lease_expires_at = models.DateTimeField(null=True, blank=True)
+
     # Timestamps
     signed_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    anonymized_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Signature"
@@ -179,13 +267,23 @@ class Signature(models.Model):
             models.Index(fields=['initiative', 'status']),
             models.Index(fields=['municipality', 'status']),
             models.Index(fields=['participant', 'initiative']),
+            # Keyset pagination of the admin changelist
+            models.Index(fields=['-signed_at', '-id'], name='core_signat_signed__keyset_idx'),
+            # Admin search by exact name
+            models.Index(fields=['family_name_index']),
+            models.Index(fields=['given_name_index']),
+            # Review work queue: oldest pending signatures per municipality
+            models.Index(fields=['municipality', 'signed_at', 'id'], condition=models.Q(status='pending'), name='core_signat_pending_queue_idx'),
+            models.Index(fields=['initiative', 'identity_hash']),
+            # Retention batches: signatures still holding personal data
+            models.Index(fields=['initiative', 'status', 'id'], condition=models.Q(anonymized_at__isnull=True), name='core_signat_retention_idx'),
         ]
         permissions = [
             ('can_review_signatures', 'Can review signatures'),
         ]
 
     def __str__(self):
-        return f"{self.participant} signed {self.initiative.title} ({self.status})"
+        return f"{self.participant or 'Anonymized'} signed {self.initiative.title} ({self.status})"
 
     def clean(self):
         # Ensure participant can only sign once per initiative
@@ -198,6 +296,356 @@ class Signature(models.Model):
                 raise ValidationError("Participant has already signed this initiative.")
 
 
+def paper_signature_storage():
+    """Private storage of uploaded paper signature lists (not served, outside MEDIA_ROOT)"""
+    return FileSystemStorage(location=settings.PAPER_SIGNATURE_UPLOAD_DIR, base_url=None)
+
+
+class PaperSignatureBatch(models.Model):
+    """Uploaded list of scanned paper signatures"""
+
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='paper_signature_batches')
+    file_name = models.CharField(max_length=255, blank=True)
+    source_file = models.FileField(
+        upload_to='paper_signatures/', storage=paper_signature_storage, blank=True,
+        help_text="Uploaded CSV, imported by a background job and deleted afterwards",
+    )
+    uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='paper_signature_batches')
+
+    # Import report
+    total_rows = models.IntegerField(default=0)
+    imported_rows = models.IntegerField(default=0)
+    duplicate_rows = models.IntegerField(default=0)
+    error_rows = models.IntegerField(default=0)
+    errors = models.TextField(blank=True, help_text="First parse errors of the file")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Paper Signature Batch"
+        verbose_name_plural = "Paper Signature Batches"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name or 'Batch'} ({self.initiative.title})"
+
+
+class PaperSignature(models.Model):
+    """Signature collected on a paper list, counted together with electronic signatures"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending Deduplication'),
+        ('accepted', 'Accepted'),
+        ('duplicate', 'Duplicate'),
+    ]
+
+    CONFLICT_CHOICES = [
+        ('electronic_ahv', 'Electronic signature (AHV number)'),
+        ('electronic', 'Electronic signature (name and birth date)'),
+        ('paper', 'Other paper signature'),
+    ]
+
+    batch = models.ForeignKey(PaperSignatureBatch, on_delete=models.CASCADE, related_name='signatures')
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='paper_signatures')
+    municipality = models.ForeignKey(Municipality, on_delete=models.PROTECT, related_name='paper_signatures')
+
+    given_name = EncryptedCharField(max_length=255)
+    family_name = EncryptedCharField(max_length=255)
+    birth_date = EncryptedDateField(null=True)
+    street_and_number = EncryptedCharField(max_length=255, blank=True, help_text="Strasse und Hausnummer")
+    postal_code = models.CharField(max_length=10, blank=True, help_text="PLZ")
+    ahv_number = EncryptedCharField(max_length=16, blank=True, null=True, help_text="Swiss AHV/AVS social security number")
+    ahv_number_index = BlindIndexField('ahv_number', purpose=AHV, normalize=ahv_index_value, null=True)
+    # Exact name search (case- and accent-insensitive)
+    given_name_index = BlindIndexField('given_name', purpose=NAME, normalize=name_index_value, null=True)
+    family_name_index = BlindIndexField('family_name', purpose=NAME, normalize=name_index_value, null=True)
+
+    identity_hash = BlindIndexField('given_name', 'family_name', 'birth_date', purpose=IDENTITY, normalize=identity_value)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    conflict = models.CharField(max_length=20, choices=CONFLICT_CHOICES, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    anonymized_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = "Paper Signature"
+        verbose_name_plural = "Paper Signatures"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['initiative', 'identity_hash']),
+            models.Index(fields=['initiative', 'ahv_number_index']),
+            models.Index(fields=['family_name_index']),
+            models.Index(fields=['given_name_index']),
+            models.Index(fields=['initiative', 'status']),
+            models.Index(fields=['batch', 'status']),
+            models.Index(fields=['initiative', 'status', 'id'], condition=models.Q(anonymized_at__isnull=True), name='core_papers_retention_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.given_name} {self.family_name} (paper, {self.status})"
+
+
+class RetentionPolicy(models.Model):
+    """
+    How long signer data of an archived initiative is kept, per signature status
+
+    Counted from Initiative.archived_at. Statuses without a policy use
+    RETENTION_DAYS. Applies to electronic and paper signatures (see
+    core/retention.py).
+    """
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('accepted', 'Accepted'),
+        ('rejected', 'Rejected'),
+        ('duplicate', 'Duplicate (paper)'),
+    ]
+
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='retention_policies')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    retention_days = models.PositiveIntegerField(help_text="Days after archiving until the signer data is anonymized")
+
+    class Meta:
+        verbose_name = "Retention Policy"
+        verbose_name_plural = "Retention Policies"
+        constraints = [
+            models.UniqueConstraint(fields=['initiative', 'status'], name='core_retentionpolicy_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.initiative}: {self.status} after {self.retention_days} days"
+
+
+class ReviewSample(models.Model):
+    """
+    Random sample of the pending signatures of one municipality for an initiative
+
+    Reviewers check the sampled signatures only; once the upper confidence
+    bound of the error rate is low enough, the rest of the population
+    (signatures pending at the draw) is accepted in bulk (see
+    core/sampling.py).
+    """
+
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('accepted', 'Population accepted'),
+        ('discarded', 'Discarded'),
+    ]
+
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='review_samples')
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, related_name='review_samples')
+
+    # Reproducible draw: the population is streamed in id order with a generator seeded from the seed
+    seed = models.CharField(max_length=64)
+    population_size = models.PositiveIntegerField(help_text="Pending signatures at the draw")
+    max_signature_id = models.BigIntegerField(help_text="Population: pending signatures up to this id")
+    signatures = models.ManyToManyField(Signature, related_name='review_samples', blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    accepted_count = models.PositiveIntegerField(null=True, blank=True, help_text="Signatures accepted in bulk")
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Review Sample"
+        verbose_name_plural = "Review Samples"
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['initiative', 'municipality'], condition=models.Q(status='open'),
+                name='core_reviewsample_one_open',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Sample #{self.pk}: {self.municipality} / {self.initiative}"
+
+
+class IntakeAnomaly(models.Model):
+    """Unusual signature intake flagged by an application process (see core/intake_monitor.py)"""
+
+    KIND_CHOICES = [
+        ('burst', 'Burst'),
+        ('regular', 'Regular intervals'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='intake_anomalies')
+    # Empty for the initiative as a whole
+    municipality = models.ForeignKey(Municipality, null=True, blank=True, on_delete=models.CASCADE, related_name='intake_anomalies')
+    minute = models.DateTimeField(help_text="Start of the minute")
+    observed = models.PositiveIntegerField(help_text="Signatures in the minute when flagged")
+    expected = models.FloatField(help_text="Baseline signatures per minute")
+    threshold = models.FloatField()
+    detail = models.CharField(max_length=255, blank=True)
+    process = models.CharField(max_length=100, help_text="Host and process id that flagged it")
+
+    acknowledged_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Intake Anomaly"
+        verbose_name_plural = "Intake Anomalies"
+        ordering = ['-minute', '-id']
+        indexes = [
+            models.Index(fields=['initiative', '-minute']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.municipality or 'all municipalities'} / {self.initiative_id} at {self.minute:%Y-%m-%d %H:%M}"
+
+
+class SignatureCount(models.Model):
+    """
+    Maintained signature counts per initiative, municipality, channel and status
+
+    Updated together with every signature insert, review transition and
+    paper import (see core/aggregates.py); canton and national totals are
+    sums over this table.
+    """
+
+    CHANNEL_CHOICES = [
+        ('electronic', 'Electronic'),
+        ('paper', 'Paper'),
+    ]
+
+    initiative = models.ForeignKey(Initiative, on_delete=models.CASCADE, related_name='signature_counts')
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, related_name='signature_counts')
+    canton = models.CharField(max_length=2)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    status = models.CharField(max_length=20)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Signature Count"
+        verbose_name_plural = "Signature Counts"
+        constraints = [
+            models.UniqueConstraint(fields=['initiative', 'municipality', 'channel', 'status'], name='core_signaturecount_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['initiative', 'status', 'canton']),
+        ]
+
+    def __str__(self):
+        return f"{self.initiative_id}/{self.municipality_id} {self.channel} {self.status}: {self.count}"
+
+
+class InitiativeResult(models.Model):
+    """
+    Official final tally of a closed initiative (see core/finalization.py)
+
+    While the tally runs, the checkpoint fields record how far the
+    signatures have been counted. Once completed, the snapshot and its
+    SHA-256 digest are immutable.
+    """
+
+    initiative = models.OneToOneField(Initiative, on_delete=models.PROTECT, related_name='final_result')
+
+    # Checkpoint of the running tally
+    signature_checkpoint = models.BigIntegerField(default=0, help_text="Last counted Signature id")
+    paper_checkpoint = models.BigIntegerField(default=0, help_text="Last counted PaperSignature id")
+    partial_counts = models.JSONField(default=dict, blank=True)
+
+    # Result
+    snapshot = models.JSONField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    total_accepted = models.BigIntegerField(null=True, blank=True)
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Initiative Result"
+        verbose_name_plural = "Initiative Results"
+
+    def __str__(self):
+        return f"Result of {self.initiative}"
+
+    def save(self, *args, **kwargs):
+        if self.pk and InitiativeResult.objects.filter(pk=self.pk, completed_at__isnull=False).exists():
+            raise ValueError("Completed initiative results are immutable")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if self.completed_at:
+            raise ValueError("Completed initiative results are immutable")
+        return super().delete(*args, **kwargs)
+
+
+class Job(models.Model):
+    """Background job executed by the run_worker management command (see core/jobs.py)"""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    job_type = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+
+    # Retries
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+
+    # Execution
+    worker = models.CharField(max_length=255, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    # Progress reported by the handler
+    progress = models.BigIntegerField(default=0)
+    progress_total = models.BigIntegerField(null=True, blank=True)
+    progress_message = models.CharField(max_length=255, blank=True)
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            # Claim order of the workers
+            models.Index(fields=['-priority', 'run_after', 'id'], condition=models.Q(status='queued'), name='core_job_queue_idx'),
+            models.Index(fields=['status', 'job_type']),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_type} #{self.pk} ({self.status})"
+
+    def get_progress_percentage(self):
+        if not self.progress_total:
+            return None
+        return min(100, int(self.progress * 100 / self.progress_total))
+
+    def set_progress(self, progress, total=None, message=None):
+        """Report progress (also serves as heartbeat)"""
+        self.progress = progress
+        fields = {'progress': progress, 'heartbeat_at': timezone.now()}
+        if total is not None:
+            self.progress_total = fields['progress_total'] = total
+        if message is not None:
+            self.progress_message = fields['progress_message'] = message[:255]
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+
 # Signal handlers
 @receiver(post_save, sender=Municipality)
 def create_municipality_group(sender, instance, created, **kwargs):
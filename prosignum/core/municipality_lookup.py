@@ -0,0 +1,211 @@
+"""
+In-memory PLZ/locality/municipality lookup built from the imported AMTOVZ data
+
+The lookup is immutable and shared by all threads of a process. It is rebuilt
+only when a new import bumps ``PostalCode.import_version``.
+"""
+import bisect
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Municipality, PostalCode
+from .normalization import normalize_name
+
+
+class MunicipalityEntry(NamedTuple):
+    id: int
+    name: str
+    canton: str
+    bfs_number: int
+
+    @property
+    def display(self) -> str:
+        return f"{self.name} ({self.canton})"
+
+    def as_dict(self, postal_codes=()) -> dict:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'canton': self.canton,
+            'display': self.display,
+            'postal_codes': list(postal_codes),
+        }
+
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def _search_key(text: str) -> str:
+    """normalize_name() without punctuation ('St. Gallen' -> 'st gallen')"""
+    return ' '.join(_PUNCTUATION.sub(' ', normalize_name(text)).split())
+
+
+def _search_keys(name: str):
+    """(key, rank) pairs under which a name is found: every spelling and every word start
+
+    Bilingual names such as 'Biel/Bienne' or 'Sils im Engadin/Segl' are
+    indexed under each spelling, 'St. Gallen' is found by 'gallen' as well.
+    Rank 0 marks the start of a spelling, rank 1 an inner word.
+    """
+    keys = {}
+    for spelling in name.split('/'):
+        words = _search_key(spelling).split()
+        for i in range(len(words)):
+            key = ' '.join(words[i:])
+            keys[key] = min(keys.get(key, 1), 0 if i == 0 else 1)
+    return keys.items()
+
+
+class MunicipalityLookup:
+    """Immutable PLZ -> municipalities and name prefix index"""
+
+    # Upper bound of prefix matches inspected per rank and search (short prefixes match a lot)
+    MAX_SEARCH_CANDIDATES = 200
+
+    def __init__(self, version: int, municipalities, postal_codes):
+        """
+        Args:
+            version: Import version the lookup was built from
+            municipalities: Iterable of (id, name, canton, bfs_number)
+            postal_codes: Iterable of (postal_code, locality, municipality_id)
+        """
+        self.version = version
+
+        entries = {row[0]: MunicipalityEntry(*row) for row in municipalities}
+        self.municipalities = MappingProxyType(entries)
+
+        by_postal_code = {}
+        postal_codes_by_municipality = {}
+        locality_municipalities = {}
+        for postal_code, locality, municipality_id in postal_codes:
+            entry = entries.get(municipality_id)
+            if entry is None:
+                continue
+            bucket = by_postal_code.setdefault(postal_code, [])
+            if entry not in bucket:
+                bucket.append(entry)
+            postal_codes_by_municipality.setdefault(municipality_id, set()).add(postal_code)
+            locality_municipalities.setdefault((locality, municipality_id), set()).add(postal_code)
+
+        self._by_postal_code = MappingProxyType({
+            plz: tuple(sorted(bucket, key=lambda e: e.name))
+            for plz, bucket in by_postal_code.items()
+        })
+        self._postal_codes_by_municipality = MappingProxyType({
+            municipality_id: tuple(sorted(codes))
+            for municipality_id, codes in postal_codes_by_municipality.items()
+        })
+
+        # Search suggestions: one per municipality, plus one per locality whose
+        # name differs from its municipality (e.g. 'Leubringen' in 'Evilard')
+        suggestions = []
+        for entry in entries.values():
+            suggestions.append((entry.name, entry.as_dict(self._postal_codes_by_municipality.get(entry.id, ()))))
+        for (locality, municipality_id), codes in locality_municipalities.items():
+            entry = entries[municipality_id]
+            if normalize_name(locality) == normalize_name(entry.name):
+                continue
+            suggestion = entry.as_dict(sorted(codes))
+            suggestion['locality'] = locality
+            suggestion['display'] = f"{locality} ({entry.name}, {entry.canton})"
+            suggestions.append((locality, suggestion))
+        self._suggestions = tuple(MappingProxyType(s) for _, s in suggestions)
+
+        # Per rank sorted (key, suggestion index) pairs, searched with bisect
+        names = ([], [])
+        for index, (name, _) in enumerate(suggestions):
+            for key, rank in _search_keys(name):
+                names[rank].append((key, index))
+        self._names = tuple(tuple(sorted(pairs)) for pairs in names)
+        self._name_keys = tuple(tuple(key for key, _ in pairs) for pairs in self._names)
+
+    def municipalities_for_postal_code(self, postal_code: str) -> Tuple[MunicipalityEntry, ...]:
+        """Municipalities served by a PLZ, sorted by name"""
+        return self._by_postal_code.get(postal_code.strip(), ())
+
+    def postal_code_suggestions(self, postal_code: str) -> list:
+        """Search results for a PLZ (municipalities served by it)"""
+        return [
+            entry.as_dict(self._postal_codes_by_municipality.get(entry.id, ()))
+            for entry in self.municipalities_for_postal_code(postal_code)
+        ]
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        """Municipalities and localities whose name (or one of its words) starts with ``prefix``"""
+        key = _search_key(prefix)
+        if not key:
+            return []
+
+        # Matches at the start of a name rank before inner-word matches, so
+        # inner words are only looked at when the first rank does not fill the limit
+        matches = {}
+        for rank, (names, name_keys) in enumerate(zip(self._names, self._name_keys)):
+            if len(matches) >= limit:
+                break
+            start = bisect.bisect_left(name_keys, key)
+            for name_key, index in names[start:start + self.MAX_SEARCH_CANDIDATES]:
+                if not name_key.startswith(key):
+                    break
+                matches.setdefault(index, rank)
+
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (item[1], len(self._suggestions[item[0]]['display']), self._suggestions[item[0]]['display']),
+        )
+        return [dict(self._suggestions[index]) for index, _ in ranked[:limit]]
+
+
+_lookup: Optional[MunicipalityLookup] = None
+_checked_at = float('-inf')
+_lock = threading.Lock()
+
+
+def _current_version() -> int:
+    return PostalCode.objects.aggregate(version=Max('import_version'))['version'] or 0
+
+
+def _build(version: int) -> MunicipalityLookup:
+    municipalities = Municipality.objects.values_list('id', 'name', 'canton', 'bfs_number')
+    if version:
+        postal_codes = PostalCode.objects.values_list('postal_code', 'locality', 'municipality_id')
+    else:
+        # No AMTOVZ import since the mapping table was introduced: fall back
+        # to the primary postal code stored on each municipality
+        postal_codes = (
+            (postal_code, name, municipality_id)
+            for municipality_id, name, postal_code in
+            Municipality.objects.exclude(postal_code='').values_list('id', 'name', 'postal_code')
+        )
+    return MunicipalityLookup(version, municipalities, postal_codes)
+
+
+def get_municipality_lookup() -> MunicipalityLookup:
+    """Return the process-wide lookup, rebuilding it if the import version changed"""
+    global _lookup, _checked_at
+
+    interval = getattr(settings, 'MUNICIPALITY_LOOKUP_CHECK_INTERVAL', 60)
+    now = time.monotonic()
+    lookup = _lookup
+    if lookup is not None and now - _checked_at < interval:
+        return lookup
+
+    with _lock:
+        if _lookup is not None and now - _checked_at < interval:
+            return _lookup
+        version = _current_version()
+        if _lookup is None or _lookup.version != version:
+            _lookup = _build(version)
+        _checked_at = now
+        return _lookup
+
+
+def invalidate_municipality_lookup():
+    """Force a version check on the next lookup in this process"""
+    global _checked_at
+    _checked_at = float('-inf')
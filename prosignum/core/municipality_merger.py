@@ -0,0 +1,213 @@
+"""
+Municipality mergers
+
+When municipalities merge, the AMTOVZ import creates the new municipality
+(new BFS number) and moves the postal codes, but the old municipality
+stays referenced by signatures (on_delete=PROTECT), counts, samples and
+reviewer groups. merge_municipality() moves everything over and retires
+the old municipality:
+
+- Electronic and paper signatures are reassigned in batches of
+  MERGER_BATCH_SIZE rows, one UPDATE ... RETURNING per batch in its own
+  transaction together with the matching SignatureCount deltas, so row
+  locks are short and the counts are right after every batch.
+- The final transaction locks the old municipality row (new signatures for
+  it wait), moves stragglers, what is left in SignatureCount, review
+  samples (open ones are discarded: their population changed), intake
+  anomalies and remaining postal codes, hands the members and permissions
+  of the old reviewer group to the new one (unless another municipality
+  of the same name still uses the group) and deletes the old
+  municipality.
+
+Final results of finalized initiatives keep the municipality names of
+their snapshot.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .aggregates import ELECTRONIC, PAPER, adjust_counts
+from .models import (
+    IntakeAnomaly, Municipality, PaperSignature, PaperSignatureBatch, PostalCode, ReviewSample, Signature,
+    SignatureCount,
+)
+from .municipality_lookup import invalidate_municipality_lookup
+from .review_queue import municipality_group_name
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MergerError(Exception):
+    pass
+
+
+def resolve_mapping(pairs):
+    """[(old Municipality, new Municipality)] for (old BFS number, new BFS number) pairs"""
+    pairs = [(old, new) for old, new in pairs if old != new]
+    olds = [old for old, _ in pairs]
+    if len(set(olds)) != len(olds):
+        raise MergerError('A BFS number is mapped more than once')
+    chained = set(olds) & {new for _, new in pairs}
+    if chained:
+        raise MergerError(f'Chained mappings (map to the final BFS number directly): {sorted(chained)}')
+
+    municipalities = Municipality.objects.in_bulk([bfs for pair in pairs for bfs in pair], field_name='bfs_number')
+    missing = sorted({bfs for pair in pairs for bfs in pair} - municipalities.keys())
+    if missing:
+        raise MergerError(f'Unknown BFS numbers (import the new AMTOVZ file first): {missing}')
+    return [(municipalities[old], municipalities[new]) for old, new in pairs]
+
+
+def affected_rows(old):
+    """Rows referencing a municipality, by kind"""
+    return {
+        'signatures': Signature.objects.filter(municipality=old).count(),
+        'paper_signatures': PaperSignature.objects.filter(municipality=old).count(),
+        'review_samples': ReviewSample.objects.filter(municipality=old).count(),
+        'postal_codes': PostalCode.objects.filter(municipality=old).count(),
+    }
+
+
+def _reassign_batch(old, new, channel, batch_size):
+    """Move up to batch_size signatures of one channel and their counts. Returns the number of moved rows."""
+    if channel == ELECTRONIC:
+        table = Signature._meta.db_table
+        sql = f"""
+            UPDATE {table} s SET municipality_id = %s
+            WHERE s.id IN (SELECT id FROM {table} WHERE municipality_id = %s LIMIT %s FOR UPDATE)
+            RETURNING s.initiative_id, s.status, TRUE
+        """
+    else:
+        table = PaperSignature._meta.db_table
+        # Paper signatures are counted once their batch is imported completely
+        sql = f"""
+            UPDATE {table} s SET municipality_id = %s
+            FROM {PaperSignatureBatch._meta.db_table} b
+            WHERE b.id = s.batch_id
+            AND s.id IN (SELECT id FROM {table} WHERE municipality_id = %s LIMIT %s FOR UPDATE)
+            RETURNING s.initiative_id, s.status, b.completed_at IS NOT NULL
+        """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [new.pk, old.pk, batch_size])
+            rows = cursor.fetchall()
+        deltas = Counter()
+        for initiative_id, status, counted in rows:
+            if counted:
+                deltas[(initiative_id, old.pk, channel, status)] -= 1
+                deltas[(initiative_id, new.pk, channel, status)] += 1
+        adjust_counts(deltas)
+    return len(rows)
+
+
+def _reassign(old, new, channel, batch_size, progress=None):
+    total = 0
+    while True:
+        moved = _reassign_batch(old, new, channel, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if progress:
+            progress(channel, total)
+
+
+def _move_reviewer_group(old, new):
+    """
+    Hand the members and permissions of the old reviewer group to the new one
+
+    Returns (moved members, shared). Names are not unique (e.g. Buchs
+    AG/SG/ZH): while another municipality maps to the old group, its
+    members may review that municipality only, so the group is left alone
+    (shared=True) and the reviewers have to be reassigned by hand.
+    """
+    old_group = Group.objects.filter(name=municipality_group_name(old.name)).first()
+    if old_group is None:
+        return 0, False
+    new_group, _ = Group.objects.get_or_create(name=municipality_group_name(new.name))
+    if new_group == old_group:
+        return 0, False
+    if any(
+        municipality_group_name(name) == old_group.name
+        for name in Municipality.objects.exclude(pk=old.pk).filter(name__iexact=old.name).values_list('name', flat=True)
+    ):
+        return 0, True
+    members = list(old_group.user_set.all())
+    new_group.user_set.add(*members)
+    new_group.permissions.add(*old_group.permissions.all())
+    old_group.delete()
+    return len(members), False
+
+
+def _finish(old, new, batch_size):
+    """Move the remaining references and delete the old municipality (one transaction)"""
+    with transaction.atomic():
+        # New signatures referencing the old municipality wait for this transaction
+        Municipality.objects.select_for_update().get(pk=old.pk)
+        stragglers = {channel: _reassign(old, new, channel, batch_size) for channel in (ELECTRONIC, PAPER)}
+
+        # Normally all zero by now; moved as they are so that totals do not change
+        remaining = SignatureCount.objects.filter(municipality=old)
+        deltas = Counter()
+        for initiative_id, channel, status, count in remaining.values_list('initiative_id', 'channel', 'status', 'count'):
+            deltas[(initiative_id, new.pk, channel, status)] += count
+        adjust_counts(deltas)
+        remaining.delete()
+
+        ReviewSample.objects.filter(municipality=old, status='open').update(status='discarded', completed_at=timezone.now())
+        ReviewSample.objects.filter(municipality=old).update(municipality=new)
+        IntakeAnomaly.objects.filter(municipality=old).update(municipality=new)
+
+        # Postal codes not replaced by an AMTOVZ import yet; the version bump refreshes the lookups
+        existing = set(PostalCode.objects.filter(municipality=new).values_list('postal_code', 'locality'))
+        postal_codes = PostalCode.objects.filter(municipality=old)
+        duplicates = [
+            pk for pk, postal_code, locality in postal_codes.values_list('pk', 'postal_code', 'locality')
+            if (postal_code, locality) in existing
+        ]
+        PostalCode.objects.filter(pk__in=duplicates).delete()
+        if postal_codes.exists():
+            version = (PostalCode.objects.aggregate(version=Max('import_version'))['version'] or 0) + 1
+            postal_codes.update(municipality=new, import_version=version)
+
+        reviewers, shared = _move_reviewer_group(old, new)
+        old.delete()
+    return stragglers, reviewers, shared
+
+
+def merge_municipality(old, new, batch_size=None, progress=None):
+    """
+    Merge municipality ``old`` into ``new`` and delete ``old``
+
+    Args:
+        progress: Optional callable(channel, moved rows) called per batch
+
+    Returns a dict with the moved signatures per channel, the reviewers
+    added to the new municipality's group and whether the old group was
+    left alone because another municipality shares it.
+    """
+    batch_size = batch_size or settings.MERGER_BATCH_SIZE
+    moved = {channel: _reassign(old, new, channel, batch_size, progress) for channel in (ELECTRONIC, PAPER)}
+    stragglers, reviewers, shared = _finish(old, new, batch_size)
+    for channel, rows in stragglers.items():
+        moved[channel] += rows
+
+    invalidate_municipality_lookup()
+    logger.info(
+        f'Merged municipality {old.bfs_number} {old.name} into {new.bfs_number} {new.name} '
+        f'({moved[ELECTRONIC]} electronic, {moved[PAPER]} paper signatures, {reviewers} reviewers)'
+    )
+    if shared:
+        logger.warning(
+            f'Reviewer group of {old.name} is shared with another municipality, '
+            f'reviewers of {old.bfs_number} have to be reassigned to {new.bfs_number} by hand'
+        )
+    return {
+        'signatures': moved[ELECTRONIC], 'paper_signatures': moved[PAPER], 'reviewers': reviewers,
+        'reviewer_group_shared': shared,
+    }
@@ -0,0 +1,55 @@
+"""Text normalization shared by lookups, search and deduplication"""
+import unicodedata
+
+from .encryption import blind_index
+from .search import normalize_ahv_number
+
+IDENTITY = 'identity'
+AHV = 'ahv'
+NAME = 'name'
+
+
+def normalize_name(value: str) -> str:
+    """Accent- and case-insensitive form of a name (e.g. 'Zürich' -> 'zurich')"""
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def identity_value(given_name: str, family_name: str, birth_date) -> str:
+    """
+    Normalized name and birth date of a signer, used to match signatures across channels
+
+    Case, accents and whitespace are normalized so that transcribed paper
+    entries match the spelling of the E-ID claims.
+    """
+    return f"{normalize_name(given_name)}|{normalize_name(family_name)}|{birth_date}"
+
+
+def identity_hash(given_name: str, family_name: str, birth_date) -> str:
+    """Keyed hash of identity_value() (the ``identity_hash`` blind index)"""
+    return blind_index(IDENTITY, identity_value(given_name, family_name, birth_date))
+
+
+def ahv_index_value(value):
+    """AHV number in canonical form for its blind index (None if empty)"""
+    if not value or not value.strip():
+        return None
+    return normalize_ahv_number(value) or value.strip()
+
+
+def name_index_value(value):
+    """Normalized name for its blind index (None if empty)"""
+    if not value:
+        return None
+    return normalize_name(value) or None
+
+
+def ahv_hash(value):
+    """Blind index of an AHV number, for lookups on ``ahv_number_index``"""
+    return blind_index(AHV, ahv_index_value(value))
+
+
+def name_hash(value):
+    """Blind index of a name, for exact (case- and accent-insensitive) lookups"""
+    return blind_index(NAME, name_index_value(value))
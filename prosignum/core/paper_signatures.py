@@ -0,0 +1,208 @@
+"""
+Bulk ingestion of scanned paper signature lists
+
+CSV format (semicolon separated, UTF-8, header row):
+
+    given_name;family_name;birth_date;street_and_number;postal_code;bfs_number;ahv_number
+
+``birth_date`` is YYYY-MM-DD or DD.MM.YYYY, ``ahv_number`` is optional.
+
+Rows are streamed into PaperSignature with bulk_create and deduplicated
+afterwards in a handful of set-based UPDATE statements against electronic
+signatures (AHV number and name/birth date blind indexes, see
+core/encryption.py) and other paper signatures.
+"""
+import csv
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .aggregates import add_paper_batch_counts
+from .finalization import initiative_is_finalized
+from .models import Initiative, Municipality, PaperSignature, Signature
+from .normalization import identity_hash
+from .search import normalize_ahv_number
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Parse errors kept on the batch for the import report
+MAX_REPORTED_ERRORS = 100
+
+# Electronic signatures that block a paper signature (rejected ones do not count)
+COUNTED_SIGNATURE_STATUSES = ['pending', 'accepted']
+
+
+def _parse_date(value):
+    value = value.strip()
+    for date_format in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid birth date '{value}'")
+
+
+def _parse_row(row, municipality_ids, initiative_id, batch_id):
+    given_name = row['given_name'].strip()
+    family_name = row['family_name'].strip()
+    if not given_name or not family_name:
+        raise ValueError("missing name")
+
+    birth_date = _parse_date(row['birth_date'])
+
+    bfs_number = int(row['bfs_number'])
+    if bfs_number not in municipality_ids:
+        raise ValueError(f"unknown BFS number {bfs_number}")
+
+    ahv_number = None
+    raw_ahv = (row.get('ahv_number') or '').strip()
+    if raw_ahv:
+        ahv_number = normalize_ahv_number(raw_ahv)
+        if ahv_number is None:
+            raise ValueError(f"invalid AHV number '{raw_ahv}'")
+
+    return PaperSignature(
+        batch_id=batch_id,
+        initiative_id=initiative_id,
+        municipality_id=municipality_ids[bfs_number],
+        given_name=given_name,
+        family_name=family_name,
+        birth_date=birth_date,
+        street_and_number=(row.get('street_and_number') or '').strip(),
+        postal_code=(row.get('postal_code') or '').strip(),
+        # identity_hash and ahv_number_index are computed on insert
+        ahv_number=ahv_number,
+    )
+
+
+def load_paper_signatures(batch, stream, chunk_size=5000, progress=None):
+    """
+    Stream CSV rows into PaperSignature (status 'pending')
+
+    Args:
+        batch: PaperSignatureBatch the rows belong to
+        stream: Text stream of the CSV file
+        chunk_size: Rows per bulk_create
+        progress: Optional callable(rows_read)
+    """
+    municipality_ids = dict(Municipality.objects.values_list('bfs_number', 'id'))
+    reader = csv.DictReader(stream, delimiter=';')
+
+    buffer = []
+    errors = []
+    total = 0
+    error_count = 0
+
+    for line_number, row in enumerate(reader, start=2):
+        total += 1
+        try:
+            buffer.append(_parse_row(row, municipality_ids, batch.initiative_id, batch.id))
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(f"Line {line_number}: {e}")
+            continue
+
+        if len(buffer) >= chunk_size:
+            PaperSignature.objects.bulk_create(buffer, batch_size=chunk_size)
+            buffer = []
+            if progress:
+                progress(total)
+
+    if buffer:
+        PaperSignature.objects.bulk_create(buffer, batch_size=chunk_size)
+    if progress:
+        progress(total)
+
+    # Fresh statistics so that deduplication uses the identity/AHV indexes
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {PaperSignature._meta.db_table}')
+
+    batch.total_rows = total
+    batch.error_rows = error_count
+    batch.errors = '\n'.join(errors)
+    batch.save(update_fields=['total_rows', 'error_rows', 'errors'])
+
+
+def deduplicate_paper_signatures(batch):
+    """
+    Mark duplicates of a loaded batch and accept the remaining rows
+
+    Each step is one UPDATE over the whole batch. Returns a dict of
+    conflict -> number of rows marked as duplicate.
+    """
+    pending = PaperSignature.objects.filter(batch=batch, status='pending')
+    electronic = Signature.objects.filter(
+        initiative=OuterRef('initiative'),
+        status__in=COUNTED_SIGNATURE_STATUSES,
+    )
+
+    with transaction.atomic():
+        # Serialize deduplication per initiative
+        Initiative.objects.select_for_update().filter(pk=batch.initiative_id).first()
+        if initiative_is_finalized(batch.initiative_id):
+            raise ValueError("The final tally of this initiative has started, no more signatures can be imported")
+
+        conflicts = {}
+        conflicts['electronic_ahv'] = pending.filter(ahv_number_index__isnull=False).filter(
+            Exists(electronic.filter(participant__ahv_number_index=OuterRef('ahv_number_index')))
+        ).update(status='duplicate', conflict='electronic_ahv')
+
+        conflicts['electronic'] = pending.filter(
+            Exists(electronic.filter(identity_hash=OuterRef('identity_hash')))
+        ).update(status='duplicate', conflict='electronic')
+
+        # Earlier batches, then earlier rows of this batch
+        conflicts['paper'] = pending.filter(
+            Exists(PaperSignature.objects.filter(
+                initiative=OuterRef('initiative'),
+                status='accepted',
+                identity_hash=OuterRef('identity_hash'),
+            ))
+        ).update(status='duplicate', conflict='paper')
+        conflicts['paper'] += pending.filter(
+            Exists(PaperSignature.objects.filter(
+                initiative=OuterRef('initiative'),
+                batch=OuterRef('batch'),
+                status='pending',
+                identity_hash=OuterRef('identity_hash'),
+                id__lt=OuterRef('id'),
+            ))
+        ).update(status='duplicate', conflict='paper')
+
+        imported = pending.update(status='accepted')
+        add_paper_batch_counts(batch)
+
+        batch.imported_rows = imported
+        batch.duplicate_rows = sum(conflicts.values())
+        batch.completed_at = timezone.now()
+        batch.save(update_fields=['imported_rows', 'duplicate_rows', 'completed_at'])
+
+    return conflicts
+
+
+def import_paper_signatures(batch, stream, chunk_size=5000, progress=None):
+    """Load and deduplicate a CSV file of paper signatures into ``batch``"""
+    load_paper_signatures(batch, stream, chunk_size=chunk_size, progress=progress)
+    conflicts = deduplicate_paper_signatures(batch)
+    logger.info(
+        f"Imported paper signature batch {batch.pk}: {batch.imported_rows} accepted, "
+        f"{batch.duplicate_rows} duplicates, {batch.error_rows} errors"
+    )
+    return conflicts
+
+
+def has_paper_signature(initiative, participant):
+    """Whether a participant already signed an initiative on paper"""
+    accepted = PaperSignature.objects.filter(initiative=initiative, status='accepted')
+    if participant.ahv_number_index:
+        if accepted.filter(ahv_number_index=participant.ahv_number_index).exists():
+            return True
+    profile = participant.swiyu_profile
+    return accepted.filter(
+        identity_hash=identity_hash(profile.given_name, profile.family_name, profile.birth_date)
+    ).exists()
@@ -0,0 +1,123 @@
+"""
+Public signature progress of initiatives (JSON API for campaign sites)
+
+Progress is read from precomputed data only: the maintained SignatureCount
+rows or, once an initiative is finalized, its result snapshot. The
+signature tables are never queried.
+
+Payloads are versioned with the 'initiative-<id>' cache tag of
+core/http_cache.py, which changes whenever the initiative or its counts
+change:
+
+- The payload is stored in the Django cache together with the version it
+  was built for and rebuilt once per change, by the first process that
+  notices it.
+- Each process keeps the payloads it served for PROGRESS_API_LOCAL_TTL
+  seconds, so hot initiatives are answered without a cache round trip.
+- The ETag is derived from the version, so clients and the CDN revalidate
+  with 304.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .http_cache import initiative_tag, tag_versions
+from .models import Initiative
+
+# Part of the URL (api/v1/...) and of every payload
+API_VERSION = 1
+PUBLIC_STATUSES = ('active', 'closed', 'archived')
+# Upper bound of the per-process payload memo (ids are client supplied)
+LOCAL_MAX_ENTRIES = 1000
+
+# initiative_id -> (expires, version, payload)
+_local = {}
+
+
+def build_progress(initiative_id):
+    """Progress payload of a public initiative, or None"""
+    initiative = (
+        Initiative.objects
+        .filter(pk=initiative_id, status__in=PUBLIC_STATUSES)
+        .select_related('final_result')
+        .first()
+    )
+    if initiative is None:
+        return None
+
+    result = initiative.get_final_result()
+    if result:
+        totals = result.snapshot['totals']
+        electronic = totals.get('electronic:accepted', 0)
+        paper = totals.get('paper:accepted', 0)
+    else:
+        totals = initiative.get_signature_totals()
+        electronic = totals.get(('electronic', 'accepted'), 0)
+        paper = totals.get(('paper', 'accepted'), 0)
+    total = electronic + paper
+
+    return {
+        'id': initiative.pk,
+        'title': initiative.title,
+        'status': initiative.status,
+        'collection_start_date': initiative.collection_start_date.isoformat() if initiative.collection_start_date else None,
+        'collection_end_date': initiative.collection_end_date.isoformat() if initiative.collection_end_date else None,
+        'target': initiative.target_signatures,
+        'signatures': total,
+        'electronic': electronic,
+        'paper': paper,
+        'percentage': initiative.get_progress_percentage(total),
+        'final': result is not None,
+        'cantons': [
+            {'canton': row['canton'], 'signatures': row['count']}
+            for row in initiative.get_signatures_by_canton()
+        ],
+    }
+
+
+def get_progress(initiative_id):
+    """(version, payload) of an initiative; payload is None if it is not public"""
+    now = time.monotonic()
+    entry = _local.get(initiative_id)
+    if entry and entry[0] > now:
+        return entry[1], entry[2]
+
+    tag = initiative_tag(initiative_id)
+    payload_key = f'progress:v{API_VERSION}:{initiative_id}'
+    # Ids are client supplied: no versions for unknown initiatives
+    version = tag_versions([tag], create=False).get(tag)
+    cached = cache.get(payload_key)
+
+    if version is not None and cached and cached[0] == version:
+        payload = cached[1]
+    else:
+        payload = build_progress(initiative_id)
+        if payload is not None:
+            # Versions are only created for existing initiatives
+            if version is None:
+                version = tag_versions([tag])[tag]
+            payload['updated_at'] = datetime.fromtimestamp(version, tz=dt_timezone.utc).isoformat()
+            cache.set(payload_key, (version, payload))
+
+    if len(_local) >= LOCAL_MAX_ENTRIES:
+        _local.clear()
+    _local[initiative_id] = (now + settings.PROGRESS_API_LOCAL_TTL, version, payload)
+    return version, payload
+
+
+def progress_etag(versions, cantons):
+    """ETag of a response with the progress of the given {initiative_id: version}"""
+    key = '|'.join([
+        settings.HTTP_CACHE_RELEASE, f'v{API_VERSION}', 'cantons' if cantons else '',
+        *(f'{initiative_id}={version!r}' for initiative_id, version in sorted(versions.items())),
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def public_payload(payload, cantons):
+    if cantons:
+        return payload
+    return {key: value for key, value in payload.items() if key != 'cantons'}
@@ -0,0 +1,80 @@
+"""
+Token bucket rate limiting in the Django cache
+
+Buckets live in the default cache, so all application processes share them
+when a shared backend (Redis, Memcached, database) is configured. A bucket
+is stored as one (tokens, updated_at) entry and refilled lazily on access.
+Concurrent consumers can race between read and write, which lets a few
+extra requests through under contention; the limits are meant to protect
+backends from surges, not to be exact quotas.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'ratelimit'
+
+
+class TokenBucket:
+    """
+    Args:
+        name: Bucket name (e.g. 'swiyu:client:<ip hash>')
+        rate: Tokens added per second
+        capacity: Maximum number of tokens (burst size)
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.key = f'{KEY_PREFIX}:{name}'
+        self.rate = rate
+        self.capacity = capacity
+
+    def consume(self, tokens=1):
+        """Take tokens from the bucket. Returns (allowed, retry_after_seconds)."""
+        now = time.time()
+        state = cache.get(self.key)
+        if state is None:
+            available = self.capacity
+        else:
+            available, updated_at = state
+            available = min(self.capacity, available + (now - updated_at) * self.rate)
+
+        allowed = available >= tokens
+        if allowed:
+            available -= tokens
+            retry_after = 0
+        else:
+            retry_after = (tokens - available) / self.rate
+
+        # Keep the entry until the bucket would be full again
+        ttl = math.ceil((self.capacity - available) / self.rate) + 1
+        cache.set(self.key, (available, now), ttl)
+        return allowed, retry_after
+
+
+def client_ip(request):
+    """IP address of the client, from RATELIMIT_CLIENT_IP_HEADER if behind a trusted proxy"""
+    header = getattr(settings, 'RATELIMIT_CLIENT_IP_HEADER', '')
+    if header and request.META.get(header):
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    # Hashed so that cache keys do not contain IP addresses
+    return hashlib.sha256(client_ip(request).encode()).hexdigest()[:32]
+
+
+def check_rate_limits(*buckets):
+    """
+    Consume one token from each bucket in order, stopping at the first refusal
+
+    Returns (allowed, retry_after_seconds).
+    """
+    for bucket in buckets:
+        allowed, retry_after = bucket.consume()
+        if not allowed:
+            return False, retry_after
+    return True, 0
@@ -0,0 +1,202 @@
+"""
+Anonymization of signer data of archived initiatives
+
+apply_retention() anonymizes the electronic and paper signatures of an
+archived initiative whose retention period (RetentionPolicy, or
+RETENTION_DAYS per status) has passed since Initiative.archived_at:
+
+- Rows keep initiative, municipality, channel and status, so the
+  maintained counts (SignatureCount) and the final result are unchanged;
+  names, birth date, address, AHV number, the blind indexes and the link
+  to the participant are cleared.
+- Rows are updated in small batches (RETENTION_BATCH_SIZE), each in its
+  own transaction. Rows locked by a reviewer are skipped (SKIP LOCKED) and
+  picked up by the next run.
+- In the same transaction as the electronic signatures, the E-ID claims
+  stored with the login verifications of their participants are purged,
+  and participants left without signatures on non-archived initiatives are
+  removed with their user account and Swiyu profile (names, birth date,
+  AHV number). Their signatures on other archived initiatives are detached
+  and keep their own copy until those are due.
+- Between batches the engine pauses so that it only writes for the
+  RETENTION_DUTY_CYCLE share of the time; autovacuum keeps up with the
+  dead rows and other traffic is not starved.
+
+Once the longest retention period has passed, uploaded paper lists and
+generated certification documents of the initiative are deleted as well.
+"""
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .certification import initiative_directory
+from .models import Initiative, PaperSignature, Participant, RetentionPolicy, Signature
+from swiyu.models import SwiyuVerification
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Values written over the personal data
+SIGNATURE_ANONYMIZED = {
+    'participant': None,
+    'given_name': '',
+    'family_name': '',
+    'birth_date': None,
+    'street_and_number': '',
+    'postal_code': '',
+    'address': '',
+    'id_number': '',
+    'review_notes': '',
+    'identity_hash': '',
+    'given_name_index': None,
+    'family_name_index': None,
+    'review_lease_owner': None,
+    'review_lease_expires_at': None,
+}
+PAPER_ANONYMIZED = {
+    'given_name': '',
+    'family_name': '',
+    'birth_date': None,
+    'street_and_number': '',
+    'postal_code': '',
+    'ahv_number': None,
+    'ahv_number_index': None,
+    'identity_hash': '',
+    'given_name_index': None,
+    'family_name_index': None,
+}
+
+
+def retention_days(initiative):
+    """Retention period in days per status"""
+    days = dict(settings.RETENTION_DAYS)
+    days.update(RetentionPolicy.objects.filter(initiative=initiative).values_list('status', 'retention_days'))
+    return days
+
+
+def due_statuses(initiative, now=None):
+    """Statuses whose retention period has passed"""
+    if initiative.status != 'archived' or not initiative.archived_at:
+        return []
+    now = now or timezone.now()
+    return sorted(
+        status for status, days in retention_days(initiative).items()
+        if initiative.archived_at + timedelta(days=days) <= now
+    )
+
+
+def pending_rows(initiative, statuses):
+    """(channel, status) -> rows still holding personal data"""
+    rows = {}
+    for channel, model in (('electronic', Signature), ('paper', PaperSignature)):
+        for status in statuses:
+            count = model.objects.filter(initiative=initiative, status=status, anonymized_at__isnull=True).count()
+            if count:
+                rows[(channel, status)] = count
+    return rows
+
+
+def _release_participants(participant_ids):
+    """Purge the login claims of participants and remove those without signatures on non-archived initiatives"""
+    participants = Participant.objects.filter(pk__in={pk for pk in participant_ids if pk is not None})
+    SwiyuVerification.objects.filter(
+        user__participant_profile__in=participants, verified_claims__isnull=False,
+    ).update(verified_claims=None)
+
+    active = Signature.objects.filter(participant=OuterRef('pk')).exclude(initiative__status='archived')
+    # Staff and initiative creators keep their account
+    released = participants.exclude(Exists(active)).filter(user__is_staff=False, user__created_initiatives__isnull=True)
+    user_ids = list(released.values_list('user_id', flat=True))
+    if not user_ids:
+        return 0
+    Signature.objects.filter(participant__user_id__in=user_ids).update(participant=None)
+    # The participant protects its Swiyu profile, which goes with the user (as do the verifications)
+    Participant.objects.filter(user_id__in=user_ids).delete()
+    User.objects.filter(pk__in=user_ids).delete()
+    return len(user_ids)
+
+
+def _anonymize(queryset, values, batch_size, duty_cycle, progress):
+    model = queryset.model
+    total = 0
+    last_id = 0
+    while True:
+        started = time.monotonic()
+        with transaction.atomic():
+            ids = list(
+                queryset.filter(id__gt=last_id)
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            participant_ids = []
+            if model is Signature:
+                participant_ids = list(model.objects.filter(id__in=ids).values_list('participant_id', flat=True).distinct())
+            model.objects.filter(id__in=ids).update(**values, anonymized_at=timezone.now())
+            if participant_ids:
+                _release_participants(participant_ids)
+
+        total += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(len(ids))
+
+        elapsed = time.monotonic() - started
+        time.sleep(elapsed * (1 - duty_cycle) / duty_cycle)
+
+
+def _delete_files(initiative):
+    for batch in initiative.paper_signature_batches.exclude(source_file=''):
+        batch.source_file.delete(save=False)
+        batch.errors = ''
+        batch.save(update_fields=['source_file', 'errors'])
+
+    directory = initiative_directory(settings.CERTIFICATION_OUTPUT_DIR, initiative.pk)
+    if directory.exists():
+        shutil.rmtree(directory)
+
+
+def apply_retention(initiative, batch_size=None, duty_cycle=None, progress=None):
+    """
+    Anonymize the signatures of an archived initiative that are due
+
+    Args:
+        progress: Optional callable(channel, status, rows) called per batch
+
+    Returns a dict of (channel, status) -> anonymized rows.
+    """
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    duty_cycle = min(1.0, max(0.05, duty_cycle or settings.RETENTION_DUTY_CYCLE))
+    statuses = due_statuses(initiative)
+    results = {}
+
+    for channel, model, values in (
+        ('electronic', Signature, SIGNATURE_ANONYMIZED),
+        ('paper', PaperSignature, PAPER_ANONYMIZED),
+    ):
+        for status in statuses:
+            queryset = model.objects.filter(initiative=initiative, status=status, anonymized_at__isnull=True)
+            rows = _anonymize(
+                queryset, values, batch_size, duty_cycle,
+                progress and (lambda n, channel=channel, status=status: progress(channel, status, n)),
+            )
+            if rows:
+                results[(channel, status)] = rows
+                logger.info(f'Anonymized {rows} {channel} {status} signature(s) of initiative {initiative.pk}')
+
+    if statuses and set(statuses) >= set(retention_days(initiative)):
+        _delete_files(initiative)
+    return results
+
+
+def archived_initiatives():
+    return Initiative.objects.filter(status='archived', archived_at__isnull=False).order_by('archived_at')
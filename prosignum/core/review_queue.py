@@ -0,0 +1,96 @@
+"""
+Reviewer work queue
+
+Each reviewer claims a disjoint batch of pending signatures from their
+municipalities. Claiming uses SELECT ... FOR UPDATE SKIP LOCKED, so
+concurrent claims never wait on each other, and a lease on the claimed
+rows (review_lease_owner / review_lease_expires_at) keeps them out of
+other reviewers' batches until it expires.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Municipality, Signature
+
+MUNICIPALITY_GROUP_PREFIX = 'municipality_'
+
+
+def municipality_group_name(name):
+    """Name of the reviewer group of a municipality (as created by the signal in models.py)"""
+    return f"{MUNICIPALITY_GROUP_PREFIX}{name.lower().replace(' ', '_').replace('-', '_')}"
+
+
+def reviewer_municipality_ids(user):
+    """IDs of the municipalities a reviewer is responsible for (based on group membership)"""
+    # Group format: municipality_{name} (created by signal in models.py)
+    q = Q()
+    for group_name in user.groups.values_list('name', flat=True):
+        if group_name.startswith(MUNICIPALITY_GROUP_PREFIX):
+            mun_name = group_name[len(MUNICIPALITY_GROUP_PREFIX):].replace('_', ' ')  # Restore spaces
+            q |= Q(name__iexact=mun_name)
+    if not q:
+        return []
+    return list(Municipality.objects.filter(q).values_list('id', flat=True))
+
+
+def reviewable_signatures(user):
+    """Signatures a user may review"""
+    if user.is_superuser:
+        return Signature.objects.all()
+    if not user.has_perm('core.can_review_signatures'):
+        return Signature.objects.none()
+    return Signature.objects.filter(municipality_id__in=reviewer_municipality_ids(user))
+
+
+def active_lease_q(now=None):
+    """Signatures currently leased to some reviewer"""
+    return Q(review_lease_expires_at__gte=now or timezone.now())
+
+
+def leased_to_other_q(user, now=None):
+    """Signatures currently leased to a reviewer other than ``user``"""
+    return active_lease_q(now) & ~Q(review_lease_owner=user)
+
+
+def claim_review_batch(user, size=None):
+    """
+    Lease the next batch of pending signatures to a reviewer
+
+    A reviewer who still holds an unexpired batch gets that batch back with a
+    renewed lease. Returns the number of signatures in the batch.
+    """
+    size = size or settings.REVIEW_BATCH_SIZE
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.REVIEW_LEASE_SECONDS)
+    pending = reviewable_signatures(user).filter(status='pending')
+
+    with transaction.atomic():
+        renewed = pending.filter(review_lease_owner=user, review_lease_expires_at__gte=now).update(
+            review_lease_expires_at=lease_until
+        )
+        if renewed:
+            return renewed
+
+        ids = list(
+            pending
+            .filter(Q(review_lease_expires_at__isnull=True) | Q(review_lease_expires_at__lt=now))
+            .order_by('signed_at', 'id')
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', flat=True)[:size]
+        )
+        return Signature.objects.filter(id__in=ids).update(
+            review_lease_owner=user,
+            review_lease_expires_at=lease_until,
+        )
+
+
+def release_review_batch(user):
+    """Return a reviewer's unfinished signatures to the queue"""
+    return Signature.objects.filter(review_lease_owner=user).update(
+        review_lease_owner=None,
+        review_lease_expires_at=None,
+    )
@@ -0,0 +1,272 @@
+"""
+Sample-based review of pending signatures
+
+Instead of checking every pending signature, reviewers check a random
+sample per municipality (stratum) and the rest is accepted in bulk when
+the sample shows a low enough error rate:
+
+- draw_samples() streams the ids of an initiative's pending signatures
+  once, in id order, through a server-side cursor and keeps a reservoir
+  per municipality (Algorithm R). The reservoir size follows from the
+  pending count in SignatureCount (sample_size()). Every stratum has its
+  own random generator seeded from the sample's seed and the municipality,
+  so a draw is reproducible from the seed and the population.
+- Reviewers accept or reject the sampled signatures as usual (filter
+  "Review sample" in the signature admin); a rejected signature counts as
+  an error.
+- sample_statistics() gives the Wilson score interval of the error rate
+  at REVIEW_SAMPLE_CONFIDENCE, narrowed by the finite population
+  correction. When all sampled signatures are reviewed and the upper bound
+  is at most REVIEW_SAMPLE_MAX_ERROR_RATE, accept_population() accepts the
+  signatures that were pending at the draw, in batches of
+  REVIEW_SAMPLE_BATCH_SIZE through transition_signatures() (counts stay
+  maintained). Signatures in another reviewer's batch are left to that
+  reviewer. Signatures arriving after the draw need a new sample.
+"""
+import math
+import random
+import secrets
+from statistics import NormalDist
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .aggregates import ELECTRONIC, transition_signatures
+from .finalization import initiative_is_finalized, lock_initiatives
+from .models import ReviewSample, Signature, SignatureCount
+from .review_queue import active_lease_q, leased_to_other_q
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip of the streaming cursor
+STREAM_CHUNK_SIZE = 10000
+
+
+class SamplingError(Exception):
+    pass
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+
+
+def sample_size(population, confidence=None, expected_error_rate=None, margin=None):
+    """Sample size estimating the error rate within ``margin`` (finite population corrected)"""
+    if population <= 0:
+        return 0
+    z = _z(confidence or settings.REVIEW_SAMPLE_CONFIDENCE)
+    p = expected_error_rate if expected_error_rate is not None else settings.REVIEW_SAMPLE_EXPECTED_ERROR_RATE
+    margin = margin or settings.REVIEW_SAMPLE_MARGIN
+    n0 = z * z * p * (1 - p) / (margin * margin)
+    n = math.ceil(n0 / (1 + (n0 - 1) / population))
+    return min(population, max(n, settings.REVIEW_SAMPLE_MIN_SIZE))
+
+
+def error_rate_interval(errors, reviewed, population, confidence=None):
+    """(lower, upper) bound of the population's error rate (Wilson score interval with finite population correction)"""
+    if not reviewed:
+        return 0.0, 1.0
+    rate = errors / reviewed
+    if reviewed >= population:
+        # Everything was reviewed
+        return rate, rate
+    z = _z(confidence or settings.REVIEW_SAMPLE_CONFIDENCE)
+    if population > 1:
+        z *= math.sqrt((population - reviewed) / (population - 1))
+    z2 = z * z
+    denominator = 1 + z2 / reviewed
+    centre = (rate + z2 / (2 * reviewed)) / denominator
+    half_width = z * math.sqrt(rate * (1 - rate) / reviewed + z2 / (4 * reviewed * reviewed)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def sample_statistics(size, reviewed, errors, population):
+    """
+    Result of a sample
+
+    Returns a dict with the error rate, its confidence interval and the
+    verdict: 'incomplete' (sampled signatures left to review), 'pass' (the
+    remaining population may be accepted in bulk) or 'fail' (review it in
+    full).
+    """
+    lower, upper = error_rate_interval(errors, reviewed, population)
+    if reviewed < size:
+        verdict = 'incomplete'
+    elif upper <= settings.REVIEW_SAMPLE_MAX_ERROR_RATE:
+        verdict = 'pass'
+    else:
+        verdict = 'fail'
+    return {
+        'size': size,
+        'reviewed': reviewed,
+        'errors': errors,
+        'error_rate': errors / reviewed if reviewed else None,
+        'lower': lower,
+        'upper': upper,
+        'confidence': settings.REVIEW_SAMPLE_CONFIDENCE,
+        'verdict': verdict,
+    }
+
+
+def with_review_counts(queryset):
+    """Annotate ReviewSamples with sample_size, reviewed_count and error_count"""
+    return queryset.annotate(
+        sample_size=Count('signatures'),
+        reviewed_count=Count('signatures', filter=~Q(signatures__status='pending')),
+        error_count=Count('signatures', filter=Q(signatures__status='rejected')),
+    )
+
+
+def review_result(sample):
+    """sample_statistics() of a ReviewSample (annotated by with_review_counts() or not)"""
+    if not hasattr(sample, 'sample_size'):
+        sample = with_review_counts(ReviewSample.objects.filter(pk=sample.pk)).get()
+    return sample_statistics(sample.sample_size, sample.reviewed_count, sample.error_count, sample.population_size)
+
+
+def _population(initiative_id, municipality_id=None, max_signature_id=None):
+    signatures = Signature.objects.filter(initiative_id=initiative_id, status='pending', anonymized_at__isnull=True)
+    if municipality_id is not None:
+        signatures = signatures.filter(municipality_id=municipality_id)
+    if max_signature_id is not None:
+        signatures = signatures.filter(id__lte=max_signature_id)
+    return signatures
+
+
+def draw_samples(initiative, municipality_ids=None, seed=None, user=None):
+    """
+    Draw a sample of the pending signatures per municipality
+
+    Municipalities that already have an open sample for the initiative are
+    skipped. Returns the created ReviewSamples.
+    """
+    if initiative_is_finalized(initiative.pk):
+        raise SamplingError(f'The final tally of "{initiative.title}" has started')
+    seed = seed or secrets.token_hex(8)
+
+    pending = SignatureCount.objects.filter(initiative=initiative, channel=ELECTRONIC, status='pending', count__gt=0)
+    if municipality_ids is not None:
+        pending = pending.filter(municipality_id__in=municipality_ids)
+    open_strata = set(
+        ReviewSample.objects.filter(initiative=initiative, status='open').values_list('municipality_id', flat=True)
+    )
+    sizes = {
+        municipality_id: sample_size(count)
+        for municipality_id, count in pending.values_list('municipality_id', 'count')
+        if municipality_id not in open_strata
+    }
+    if not sizes:
+        return []
+
+    max_signature_id = Signature.objects.filter(initiative=initiative).aggregate(Max('id'))['id__max']
+    reservoirs = {municipality_id: [] for municipality_id in sizes}
+    seen = dict.fromkeys(sizes, 0)
+    generators = {municipality_id: random.Random(f'{seed}:{municipality_id}') for municipality_id in sizes}
+
+    rows = _population(initiative.pk, max_signature_id=max_signature_id)
+    if municipality_ids is not None:
+        rows = rows.filter(municipality_id__in=list(sizes))
+    for signature_id, municipality_id in rows.order_by('id').values_list('id', 'municipality_id').iterator(
+        chunk_size=STREAM_CHUNK_SIZE
+    ):
+        if municipality_id not in sizes:
+            # Stratum with an open sample
+            continue
+        reservoir, size, i = reservoirs[municipality_id], sizes[municipality_id], seen[municipality_id]
+        if i < size:
+            reservoir.append(signature_id)
+        else:
+            j = generators[municipality_id].randrange(i + 1)
+            if j < size:
+                reservoir[j] = signature_id
+        seen[municipality_id] = i + 1
+
+    samples = []
+    with transaction.atomic():
+        for municipality_id in sorted(sizes):
+            if not reservoirs[municipality_id]:
+                continue
+            sample = ReviewSample.objects.create(
+                initiative=initiative,
+                municipality_id=municipality_id,
+                seed=seed,
+                population_size=seen[municipality_id],
+                max_signature_id=max_signature_id,
+                created_by=user,
+            )
+            sample.signatures.through.objects.bulk_create([
+                sample.signatures.through(reviewsample_id=sample.pk, signature_id=signature_id)
+                for signature_id in sorted(reservoirs[municipality_id])
+            ])
+            samples.append(sample)
+
+    logger.info(
+        f'Drew {len(samples)} review sample(s) for initiative {initiative.pk} '
+        f'({sum(len(r) for r in reservoirs.values())} of {sum(seen.values())} pending signatures, seed {seed})'
+    )
+    return samples
+
+
+def accept_population(sample, user=None, batch_size=None, progress=None):
+    """
+    Accept the signatures of a passed sample's population that are still pending
+
+    Rows locked by a concurrent review or leased to another reviewer (any
+    reviewer without ``user``) are skipped. Returns the number of accepted
+    signatures.
+    """
+    batch_size = batch_size or settings.REVIEW_SAMPLE_BATCH_SIZE
+    if sample.status != 'open':
+        raise SamplingError(f'{sample} is {sample.get_status_display().lower()}')
+    if initiative_is_finalized(sample.initiative_id):
+        raise SamplingError(f'The final tally of initiative {sample.initiative_id} has started')
+    result = review_result(sample)
+    if result['verdict'] != 'pass':
+        raise SamplingError(
+            f"{sample} does not allow bulk acceptance ({result['verdict']}: "
+            f"{result['reviewed']}/{result['size']} reviewed, upper bound {result['upper']:.2%})"
+        )
+
+    population = _population(sample.initiative_id, sample.municipality_id, sample.max_signature_id)
+    accepted = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            if lock_initiatives([sample.initiative_id]):
+                raise SamplingError(f'The final tally of initiative {sample.initiative_id} has started')
+            now = timezone.now()
+            leased = leased_to_other_q(user, now) if user else active_lease_q(now)
+            ids = list(
+                population.filter(id__gt=last_id)
+                .exclude(leased)
+                .order_by('id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            accepted += transition_signatures(
+                Signature.objects.filter(id__in=ids, status='pending'),
+                'accepted',
+                reviewed_by=user,
+                reviewed_at=now,
+                review_notes=f'Accepted with review sample #{sample.pk}',
+            )
+        last_id = ids[-1]
+        if progress:
+            progress(accepted)
+
+    ReviewSample.objects.filter(pk=sample.pk).update(
+        status='accepted', accepted_count=accepted, completed_at=timezone.now(),
+    )
+    logger.info(f'{sample}: accepted {accepted} signature(s) in bulk')
+    return accepted
+
+
+def discard_samples(queryset):
+    """Close open samples without accepting anything (e.g. after a failed sample was reviewed in full)"""
+    return queryset.filter(status='open').update(status='discarded', completed_at=timezone.now())
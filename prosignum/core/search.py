@@ -0,0 +1,21 @@
+"""
+Helpers for index-friendly admin search
+
+Free-text admin search goes through pg_trgm GIN indexes (see the
+``*_trgm_idx`` indexes on SwiyuUserProfile). Inputs with a recognizable
+exact format are routed to equality lookups instead; for encrypted fields
+these go through the blind indexes (see core/encryption.py).
+"""
+import re
+
+AHV_PATTERN = re.compile(r'^756[.\s]?\d{4}[.\s]?\d{4}[.\s]?\d{2}$')
+
+
+def normalize_ahv_number(value: str):
+    """Return an AHV number in its canonical form (756.1234.5678.97), or None"""
+    value = value.strip()
+    if not AHV_PATTERN.match(value):
+        return None
+    digits = re.sub(r'\D', '', value)
+    return f"{digits[:3]}.{digits[3:7]}.{digits[7:11]}.{digits[11:]}"
+
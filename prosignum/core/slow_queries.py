@@ -0,0 +1,260 @@
+"""
+Slow-query capture (opt-in with SLOW_QUERY_LOG_ENABLED)
+
+An execute wrapper installed on every new database connection times each
+query. Queries slower than SLOW_QUERY_THRESHOLD_MS are recorded with
+
+- the source that issued them: the URL name of the view (set by
+  SlowQueryMiddleware), the background job type, or the management command,
+- the normalized SQL (literals and placeholders replaced by ``?``, IN lists
+  collapsed) and its fingerprint, so that repetitions can be grouped,
+- the parameters with personal data redacted: only numbers, booleans and
+  the values of model field choices (statuses, channels) are kept; dates
+  and all other strings are redacted,
+- for a sample of SELECTs (SLOW_QUERY_EXPLAIN_RATE) the output of
+  ``EXPLAIN (ANALYZE, BUFFERS)``, with the literals of its conditions
+  replaced like in the SQL. The query is executed a second time for that,
+  inside a savepoint that is rolled back.
+
+Records are kept in a ring buffer of SLOW_QUERY_BUFFER_SIZE slots in the
+Django cache (shared by all processes with a shared cache backend). They are
+shown in the admin (/admin/slow-queries/) and by ``python manage.py
+slow_queries``.
+"""
+import contextvars
+import functools
+import hashlib
+import random
+import re
+import sys
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'slow-queries'
+MAX_SQL_LENGTH = 4000
+MAX_PARAMS = 50
+
+_source = contextvars.ContextVar('slow_query_source', default=None)
+# Set while a capture runs, so that its own queries (EXPLAIN, database cache) are not captured
+_capturing = contextvars.ContextVar('slow_query_capturing', default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\$\d+')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_REPEATED_TUPLES = re.compile(r'(\([^()]*\))(?:, \1)+')
+_WHITESPACE = re.compile(r'\s+')
+# Plan lines with expressions (conditions, keys, output columns) that may contain literals
+_PLAN_EXPRESSION = re.compile(r'^(\s*(?:->\s*)?(?:[A-Z][\w-]* )*(?:Cond|Filter|Key|Output)): (.*)$')
+
+
+@contextmanager
+def query_source(name):
+    """Attribute the queries run inside the block to ``name``"""
+    token = _source.set(name)
+    try:
+        yield
+    finally:
+        _source.reset(token)
+
+
+def current_source():
+    source = _source.get()
+    if source:
+        return source
+    if sys.argv and sys.argv[0].endswith('manage.py') and len(sys.argv) > 1:
+        return f'command:{sys.argv[1]}'
+    return 'unknown'
+
+
+def normalize_sql(sql):
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _REPEATED_TUPLES.sub(r'\1, ...', sql)
+    return sql
+
+
+def normalize_plan_line(line):
+    """Replace the literals of a plan line's expression, keeping its indentation"""
+    match = _PLAN_EXPRESSION.match(line)
+    if not match:
+        return line
+    expression = _NUMBER.sub('?', _STRING.sub('?', match.group(2)))
+    return f'{match.group(1)}: {expression}'
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+@functools.cache
+def enum_values():
+    """String values of the model fields with choices (statuses, channels, ...)"""
+    values = set()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            for value, _ in getattr(field, 'flatchoices', None) or ():
+                if isinstance(value, str):
+                    values.add(value)
+    return frozenset(values)
+
+
+def redact_param(value):
+    if value is None or isinstance(value, (bool, int, float, Decimal)):
+        return value
+    if isinstance(value, str) and value in enum_values():
+        return value
+    if isinstance(value, (list, tuple)):
+        return [redact_param(item) for item in value[:MAX_PARAMS]]
+    return f'<redacted {type(value).__name__}>'
+
+
+def redact_params(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact_param(value) for key, value in list(params.items())[:MAX_PARAMS]}
+    return [redact_param(value) for value in list(params)[:MAX_PARAMS]]
+
+
+def _explain(connection, sql, params):
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+                plan = '\n'.join(normalize_plan_line(row[0]) for row in cursor.fetchall())
+            # Roll back the savepoint: releases row locks and undoes volatile functions of the repeated query
+            transaction.set_rollback(True, using=connection.alias)
+        return plan
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+
+
+def _record(connection, sql, params, duration):
+    normalized = normalize_sql(sql)
+    plan = None
+    if (
+        connection.vendor == 'postgresql'
+        and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE
+        and normalized.upper().startswith('SELECT')
+    ):
+        plan = _explain(connection, sql, params)
+
+    record = {
+        'at': timezone.now().isoformat(),
+        'duration_ms': round(duration * 1000, 1),
+        'source': current_source(),
+        'alias': connection.alias,
+        'fingerprint': fingerprint(normalized),
+        'sql': normalized[:MAX_SQL_LENGTH],
+        'params': redact_params(params),
+        'plan': plan,
+    }
+
+    sequence_key = f'{KEY_PREFIX}:sequence'
+    cache.add(sequence_key, 0, timeout=None)
+    try:
+        sequence = cache.incr(sequence_key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(sequence_key, 1, timeout=None)
+        sequence = 1
+    cache.set(f'{KEY_PREFIX}:{sequence % settings.SLOW_QUERY_BUFFER_SIZE}', record, timeout=None)
+
+
+def capture_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper (see connection.execute_wrapper())"""
+    if _capturing.get():
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+            token = _capturing.set(True)
+            try:
+                _record(context['connection'], sql, None if many else params, duration)
+            except Exception:
+                logger.exception('Could not record slow query')
+            finally:
+                _capturing.reset(token)
+
+
+def recent_queries():
+    """Records of the ring buffer, newest first"""
+    keys = [f'{KEY_PREFIX}:{slot}' for slot in range(settings.SLOW_QUERY_BUFFER_SIZE)]
+    return sorted(cache.get_many(keys).values(), key=lambda record: record['at'], reverse=True)
+
+
+def top_offenders(records=None, order_by='total'):
+    """Records grouped by fingerprint, ordered by 'total', 'count' or 'max' duration"""
+    groups = {}
+    for record in records if records is not None else recent_queries():
+        group = groups.setdefault(record['fingerprint'], {
+            'fingerprint': record['fingerprint'],
+            'sql': record['sql'],
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'sources': set(),
+            'last_at': record['at'],
+            'plan': None,
+        })
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['max_ms'] = max(group['max_ms'], record['duration_ms'])
+        group['sources'].add(record['source'])
+        group['last_at'] = max(group['last_at'], record['at'])
+        group['plan'] = group['plan'] or record['plan']
+
+    key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}[order_by]
+    rows = sorted(groups.values(), key=lambda group: group[key], reverse=True)
+    for row in rows:
+        row['total_ms'] = round(row['total_ms'], 1)
+        row['mean_ms'] = round(row['total_ms'] / row['count'], 1)
+        row['sources'] = sorted(row['sources'])
+    return rows
+
+
+def clear_queries():
+    cache.delete_many([f'{KEY_PREFIX}:{slot}' for slot in range(settings.SLOW_QUERY_BUFFER_SIZE)])
+
+
+class SlowQueryMiddleware:
+    """Attributes the queries of a request to its view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with query_source(f'{request.method} {request.path}'):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        name = match.view_name if match and match.url_name else f'{view_func.__module__}.{view_func.__qualname__}'
+        _source.set(f'view:{name}')
+
+
+@receiver(connection_created)
+def install_wrapper(sender, connection, **kwargs):
+    if settings.SLOW_QUERY_LOG_ENABLED and capture_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(capture_slow_queries)
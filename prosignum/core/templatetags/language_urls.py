@@ -0,0 +1,20 @@
+from django import template
+from django.urls import translate_url
+from django.utils.translation import get_language
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def language_url(context, lang_code):
+    """
+    The current page under the URL prefix of another language
+
+    Empty for pages outside i18n_patterns (e.g. /swiyu/, /api/), which have
+    no language prefix; switch with the set_language form there.
+    """
+    path = context['request'].get_full_path()
+    url = translate_url(path, lang_code)
+    if url == path and lang_code != get_language():
+        return ''
+    return url
@@ -2,11 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.db.models import Max, Q
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET, require_http_methods
 from django.utils.translation import gettext as _
+from .http_cache import initiative_tag, public_page
+from .intake_monitor import intake_admitted
 from .models import Initiative, Participant, Signature, Municipality
+from .municipality_lookup import get_municipality_lookup
+from .paper_signatures import has_paper_signature
+from .progress import API_VERSION, get_progress, progress_etag, public_payload
+from .waiting_room import get_ticket, grant_pass, has_pass, queue_status, safe_next_url, waiting_room
 
 
+def _listing_changed_at(request):
+    # Initiatives enter and leave the listing by time, without being saved
+    now = timezone.now()
+    boundaries = Initiative.objects.filter(status='active').aggregate(
+        started=Max('collection_start_date', filter=Q(collection_start_date__lte=now)),
+        ended=Max('collection_end_date', filter=Q(collection_end_date__lt=now)),
+    )
+    return max(filter(None, boundaries.values()), default=None)
+
+
+@public_page('initiatives', changed_at=_listing_changed_at)
 def home(request):
     """Homepage view"""
     now = timezone.now()
@@ -34,8 +57,35 @@ def home(request):
     for initiative in initiatives:
         initiative.already_signed = initiative.id in signed_initiative_ids
 
+    # Closed initiatives with a final result
+    closed_initiatives = Initiative.objects.filter(
+        status='closed',
+        final_result__completed_at__isnull=False,
+    ).select_related('final_result').order_by('-collection_end_date')
+
     return render(request, 'core/home.html', {
         'initiatives': initiatives,
+        'closed_initiatives': closed_initiatives,
+    })
+
+
+@public_page('initiative-{initiative_id}')
+def initiative_results(request, initiative_id):
+    """Final result of a closed initiative by canton and municipality"""
+    initiative = get_object_or_404(Initiative.objects.select_related('final_result'), id=initiative_id)
+    result = initiative.get_final_result()
+    if result is None:
+        messages.info(request, _('The final result of this initiative is not available yet.'))
+        return redirect('home')
+
+    totals = result.snapshot['totals']
+    return render(request, 'core/initiative_results.html', {
+        'initiative': initiative,
+        'result': result,
+        'electronic': totals.get('electronic:accepted', 0),
+        'paper': totals.get('paper:accepted', 0),
+        'cantons': result.snapshot['cantons'],
+        'municipalities': result.snapshot['municipalities'],
     })
 
 
@@ -51,21 +101,25 @@ def logout_view(request):
     return redirect('home')
 
 
+@public_page('pages')
 def legal_notice(request):
     """Legal notice page"""
     return render(request, 'pages/legal.html')
 
 
+@public_page('pages')
 def impressum(request):
     """Impressum page"""
     return render(request, 'pages/impressum.html')
 
 
+@public_page('pages')
 def contact(request):
     """Contact page"""
     return render(request, 'pages/contact.html')
 
 
+@waiting_room
 @login_required
 def sign_initiative(request, initiative_id):
     """Sign an initiative"""
@@ -89,7 +143,7 @@ def sign_initiative(request, initiative_id):
         participant=participant
     ).first()
 
-    if existing_signature:
+    if existing_signature or has_paper_signature(initiative, participant):
         messages.info(request, _("You have already signed this initiative."))
         return redirect('home')
 
@@ -103,11 +157,17 @@ def sign_initiative(request, initiative_id):
             messages.error(request, _("Please fill in all required fields."))
             return render(request, 'core/sign_initiative.html', {
                 'initiative': initiative,
-                'municipalities': Municipality.objects.all().order_by('name')
             })
 
         municipality = get_object_or_404(Municipality, id=municipality_id)
 
+        if not intake_admitted(initiative.pk, municipality.pk):
+            # Unusual burst of signatures from this municipality (see core/intake_monitor.py)
+            messages.error(request, _("Too many signatures are being submitted right now. Please try again in a minute."))
+            return render(request, 'core/sign_initiative.html', {
+                'initiative': initiative,
+            }, status=429)
+
         # Create signature
         Signature.objects.create(
             initiative=initiative,
@@ -124,26 +184,130 @@ def sign_initiative(request, initiative_id):
         messages.success(request, _("Your signature has been submitted and is pending review by your municipality."))
         return redirect('home')
 
-    # GET request - show signing form
-    municipalities = Municipality.objects.all().order_by('name')
-
-    # Build PLZ to municipality mapping for JavaScript
-    import json
-    plz_to_municipality = {}
-    for municipality in municipalities:
-        if municipality.postal_code:
-            plz = municipality.postal_code
-            if plz not in plz_to_municipality:
-                plz_to_municipality[plz] = []
-            plz_to_municipality[plz].append({
-                'id': municipality.id,
-                'name': municipality.name,
-                'canton': municipality.canton,
-                'display': f"{municipality.name} ({municipality.canton})"
-            })
-
+    # GET request - show signing form (municipalities are searched via municipality_search)
     return render(request, 'core/sign_initiative.html', {
         'initiative': initiative,
-        'municipalities': municipalities,
-        'plz_to_municipality_json': json.dumps(plz_to_municipality),
     })
+
+
+@require_GET
+@cache_control(public=True, max_age=settings.MUNICIPALITY_SEARCH_MAX_AGE)
+def municipality_search(request):
+    """Typeahead search for municipalities and localities (by name prefix or PLZ)"""
+    lookup = get_municipality_lookup()
+
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 50)
+    except ValueError:
+        limit = 10
+
+    postal_code = request.GET.get('postal_code', '').strip()
+    if postal_code:
+        results = lookup.postal_code_suggestions(postal_code)
+    else:
+        results = lookup.search(request.GET.get('q', '')[:100], limit=limit)
+
+    return JsonResponse({'results': results})
+
+
+@require_GET
+def waiting_room_status(request):
+    """Position of the visitor's waiting room ticket (polled by the waiting page)"""
+    next_url = safe_next_url(request)
+    ticket = get_ticket(request)
+
+    if ticket is None or has_pass(request):
+        # Admitted already, or the ticket expired: reloading the page admits or re-queues
+        response = JsonResponse({'admitted': True, 'redirect': next_url})
+    else:
+        admitted, position, wait = queue_status(ticket)
+        response = JsonResponse({
+            'admitted': admitted,
+            'position': position,
+            'wait_seconds': wait,
+            'redirect': next_url if admitted else None,
+        })
+        if admitted:
+            grant_pass(response)
+
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _progress_response(request, data, versions, cantons):
+    """JSON response with ETag/304, short caching, cache tags and CORS"""
+    etag = f'"{progress_etag(versions, cantons)}"'
+    response = get_conditional_response(request, etag=etag) or JsonResponse(data)
+    response['ETag'] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.PROGRESS_API_MAX_AGE,
+        stale_while_revalidate=settings.PUBLIC_CACHE_STALE_WHILE_REVALIDATE,
+    )
+    if settings.CDN_CACHE_TAG_HEADER:
+        response[settings.CDN_CACHE_TAG_HEADER] = ','.join(initiative_tag(pk) for pk in sorted(versions))
+    return _cors(response)
+
+
+def _cors(response):
+    # Public read-only data, embeddable from any site
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Access-Control-Expose-Headers'] = 'ETag'
+    return response
+
+
+def _cors_preflight():
+    response = HttpResponse(status=204)
+    response['Access-Control-Allow-Methods'] = 'GET, HEAD, OPTIONS'
+    response['Access-Control-Allow-Headers'] = 'If-None-Match'
+    response['Access-Control-Max-Age'] = '86400'
+    return _cors(response)
+
+
+@require_http_methods(['GET', 'HEAD', 'OPTIONS'])
+def initiative_progress(request, initiative_id):
+    """Signature progress of one initiative (?cantons=1 adds the canton breakdown)"""
+    if request.method == 'OPTIONS':
+        return _cors_preflight()
+
+    version, payload = get_progress(initiative_id)
+    if payload is None:
+        response = JsonResponse({'version': API_VERSION, 'error': 'not_found'}, status=404)
+        response['Cache-Control'] = f'public, max-age={settings.PROGRESS_API_MAX_AGE}'
+        return _cors(response)
+
+    cantons = request.GET.get('cantons') == '1'
+    data = {'version': API_VERSION, 'initiative': public_payload(payload, cantons)}
+    return _progress_response(request, data, {initiative_id: version}, cantons)
+
+
+@require_http_methods(['GET', 'HEAD', 'OPTIONS'])
+def initiatives_progress(request):
+    """Signature progress of several initiatives (?ids=1,2,3, optional ?cantons=1)"""
+    if request.method == 'OPTIONS':
+        return _cors_preflight()
+
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.GET.get('ids', '').split(',') if value.strip()))
+    except ValueError:
+        ids = None
+    if not ids or len(ids) > settings.PROGRESS_API_BATCH_LIMIT:
+        return _cors(JsonResponse({
+            'version': API_VERSION,
+            'error': f'ids must list 1 to {settings.PROGRESS_API_BATCH_LIMIT} initiative ids',
+        }, status=400))
+
+    cantons = request.GET.get('cantons') == '1'
+    versions = {}
+    initiatives = []
+    not_found = []
+    for initiative_id in ids:
+        version, payload = get_progress(initiative_id)
+        if payload is None:
+            not_found.append(initiative_id)
+        else:
+            versions[initiative_id] = version
+            initiatives.append(public_payload(payload, cantons))
+
+    data = {'version': API_VERSION, 'initiatives': initiatives, 'not_found': not_found}
+    # Unknown ids must be part of the validator as well
+    return _progress_response(request, data, {**versions, **{pk: None for pk in not_found}}, cantons)
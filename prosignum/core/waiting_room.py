@@ -0,0 +1,216 @@
+"""
+Virtual waiting room for surges on the signing and login pages
+
+Views decorated with @waiting_room admit visitors in arrival order at a
+rate the backend can sustain:
+
+- A visitor without an admission pass draws a ticket (an atomic counter in
+  the cache) which is stored in a signed cookie.
+- The admission frontier advances at ``rate`` tickets per second and may
+  run ahead of the last issued ticket by ``WAITING_ROOM_BURST``, so normal
+  traffic is admitted immediately. Tickets at or below the frontier are
+  admitted and receive a signed pass cookie valid for
+  WAITING_ROOM_PASS_SECONDS.
+- Everybody else sees the waiting page, which polls the status endpoint
+  for their position and estimated wait.
+- The rate adapts to the latency of admitted requests (additive increase,
+  multiplicative decrease around WAITING_ROOM_TARGET_LATENCY). Views whose
+  own work is cheap measure the protected backend call instead
+  (``measure=False`` and ``with measured_latency():``), e.g. the login
+  page only renders while starting a verification calls the verifier.
+- JSON endpoints (``json=True``) answer visitors who are not admitted yet
+  with status 'waiting' and a retry_after instead of the waiting page.
+
+All state lives in the default cache and is shared between processes when
+a shared cache backend is configured. Updates of the frontier are not
+atomic; concurrent updates can lose a fraction of a step, which only
+delays admission slightly.
+"""
+import math
+import time
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+
+TICKET_COOKIE = 'waiting_room_ticket'
+PASS_COOKIE = 'waiting_room_pass'
+SALT = 'core.waiting_room'
+
+ISSUED_KEY = 'waiting_room:issued'
+STATE_KEY = 'waiting_room:state'
+LATENCY_KEY = 'waiting_room:latency'
+
+# Weight of a new latency sample in the moving average
+LATENCY_SMOOTHING = 0.2
+
+
+def _issue_ticket():
+    cache.add(ISSUED_KEY, 0, timeout=None)
+    return cache.incr(ISSUED_KEY)
+
+
+def _issued():
+    return cache.get(ISSUED_KEY, 0)
+
+
+def _adjust_rate(rate):
+    """Additive increase while latency is below target, multiplicative decrease above"""
+    latency = cache.get(LATENCY_KEY)
+    if latency is None:
+        return rate
+    if latency > settings.WAITING_ROOM_TARGET_LATENCY:
+        rate *= 0.7
+    else:
+        rate += settings.WAITING_ROOM_RATE_STEP
+    return min(settings.WAITING_ROOM_MAX_RATE, max(settings.WAITING_ROOM_MIN_RATE, rate))
+
+
+def get_admission_state():
+    """
+    Advance and return the admission state
+
+    Returns (frontier, rate): tickets up to ``frontier`` are admitted and
+    ``rate`` tickets per second are admitted from now on.
+    """
+    now = time.time()
+    issued = _issued()
+    state = cache.get(STATE_KEY)
+    if state is None:
+        frontier, rate, updated_at, adjusted_at = issued + settings.WAITING_ROOM_BURST, settings.WAITING_ROOM_INITIAL_RATE, now, now
+    else:
+        frontier, rate, updated_at, adjusted_at = state
+        frontier = min(frontier + rate * (now - updated_at), issued + settings.WAITING_ROOM_BURST)
+        if now - adjusted_at >= settings.WAITING_ROOM_ADJUST_INTERVAL:
+            rate = _adjust_rate(rate)
+            adjusted_at = now
+
+    cache.set(STATE_KEY, (frontier, rate, now, adjusted_at), timeout=None)
+    return frontier, rate
+
+
+def record_latency(seconds):
+    """Feed the duration of an admitted request into the moving average"""
+    latency = cache.get(LATENCY_KEY)
+    latency = seconds if latency is None else latency + LATENCY_SMOOTHING * (seconds - latency)
+    cache.set(LATENCY_KEY, latency, timeout=settings.WAITING_ROOM_ADJUST_INTERVAL * 10)
+
+
+@contextmanager
+def measured_latency():
+    """Record the duration of the block (if WAITING_ROOM_ENABLED)"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if settings.WAITING_ROOM_ENABLED:
+            record_latency(time.monotonic() - started)
+
+
+def has_pass(request):
+    try:
+        request.get_signed_cookie(PASS_COOKIE, salt=SALT, max_age=settings.WAITING_ROOM_PASS_SECONDS)
+    except (KeyError, signing.BadSignature):
+        return False
+    return True
+
+
+def get_ticket(request):
+    try:
+        return int(request.get_signed_cookie(TICKET_COOKIE, salt=SALT, max_age=settings.WAITING_ROOM_TICKET_SECONDS))
+    except (KeyError, ValueError, signing.BadSignature):
+        return None
+
+
+def grant_pass(response):
+    response.set_signed_cookie(
+        PASS_COOKIE, '1', salt=SALT, max_age=settings.WAITING_ROOM_PASS_SECONDS,
+        httponly=True, samesite='Lax', secure=not settings.DEBUG,
+    )
+    response.delete_cookie(TICKET_COOKIE)
+
+
+def queue_status(ticket):
+    """Return (admitted, position, estimated_wait_seconds) of a ticket"""
+    frontier, rate = get_admission_state()
+    if ticket <= frontier:
+        return True, 0, 0
+    position = math.ceil(ticket - frontier)
+    return False, position, math.ceil(position / rate)
+
+
+def waiting_room(view_func=None, *, measure=True, json=False):
+    """
+    Admit requests to a view through the waiting room (if WAITING_ROOM_ENABLED)
+
+    Args:
+        measure: Record the duration of admitted requests (see measured_latency())
+        json: Answer with JSON instead of the waiting page
+    """
+    if view_func is None:
+        return lambda view_func: waiting_room(view_func, measure=measure, json=json)
+
+    def admit(request, *args, **kwargs):
+        if not measure:
+            return view_func(request, *args, **kwargs)
+        with measured_latency():
+            return view_func(request, *args, **kwargs)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not settings.WAITING_ROOM_ENABLED:
+            return view_func(request, *args, **kwargs)
+
+        if has_pass(request):
+            return admit(request, *args, **kwargs)
+
+        ticket = get_ticket(request)
+        new_ticket = ticket is None
+        if new_ticket:
+            ticket = _issue_ticket()
+
+        admitted, position, wait = queue_status(ticket)
+        if admitted:
+            response = admit(request, *args, **kwargs)
+            grant_pass(response)
+            return response
+
+        if json:
+            retry_after = max(wait, settings.WAITING_ROOM_POLL_INTERVAL)
+            response = JsonResponse({
+                'status': 'waiting',
+                'position': position,
+                'retry_after': retry_after,
+                'message': 'Too many visitors right now, please wait',
+            }, status=503)
+            response['Retry-After'] = str(retry_after)
+        else:
+            response = render(request, 'core/waiting_room.html', {
+                'position': position,
+                'wait_seconds': wait,
+                'status_url': f"{reverse('waiting_room_status')}?{urlencode({'next': request.get_full_path()})}",
+                'poll_interval': settings.WAITING_ROOM_POLL_INTERVAL,
+            })
+        response['Cache-Control'] = 'no-store'
+        if new_ticket:
+            response.set_signed_cookie(
+                TICKET_COOKIE, str(ticket), salt=SALT, max_age=settings.WAITING_ROOM_TICKET_SECONDS,
+                httponly=True, samesite='Lax', secure=not settings.DEBUG,
+            )
+        return response
+
+    return wrapper
+
+
+def safe_next_url(request):
+    next_url = request.GET.get('next', '/')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return next_url
+    return '/'
@@ -39,12 +39,15 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'swiyu',
     'core',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.http_cache.PublicCacheMiddleware',  # Above session/CSRF/messages to see their cookies
+    'core.slow_queries.SlowQueryMiddleware',  # Attributes slow queries to views
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # For i18n language switching
     'django.middleware.common.CommonMiddleware',
@@ -91,6 +94,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Rate limits and the waiting room need a cache shared by all processes in
+# production, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache (redis package)
+# with CACHE_LOCATION=redis://redis:6379/0
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -170,10 +185,130 @@ UNFOLD = {
     "SHOW_THEME_SWITCHER": False,
 }
 
+# Municipality lookup (in-memory PLZ index, see core/municipality_lookup.py)
+MUNICIPALITY_LOOKUP_CHECK_INTERVAL = int(os.environ.get('MUNICIPALITY_LOOKUP_CHECK_INTERVAL', 60))  # seconds
+MUNICIPALITY_SEARCH_MAX_AGE = int(os.environ.get('MUNICIPALITY_SEARCH_MAX_AGE', 3600))  # seconds
+
+# Admin changelists: counts above this use planner estimates (see core/admin_pagination.py)
+ADMIN_EXACT_COUNT_THRESHOLD = int(os.environ.get('ADMIN_EXACT_COUNT_THRESHOLD', 10000))
+
+# Cache lifetime of per-initiative admin statistics
+INITIATIVE_STATS_CACHE_TIMEOUT = int(os.environ.get('INITIATIVE_STATS_CACHE_TIMEOUT', 60))  # seconds
+
+# Reviewer work queue (see core/review_queue.py)
+REVIEW_BATCH_SIZE = int(os.environ.get('REVIEW_BATCH_SIZE', 50))
+REVIEW_LEASE_SECONDS = int(os.environ.get('REVIEW_LEASE_SECONDS', 900))  # 15 minutes
+
+# Sample-based review (see core/sampling.py)
+REVIEW_SAMPLE_CONFIDENCE = float(os.environ.get('REVIEW_SAMPLE_CONFIDENCE', 0.95))
+REVIEW_SAMPLE_EXPECTED_ERROR_RATE = float(os.environ.get('REVIEW_SAMPLE_EXPECTED_ERROR_RATE', 0.02))  # planning value for the sample size
+REVIEW_SAMPLE_MARGIN = float(os.environ.get('REVIEW_SAMPLE_MARGIN', 0.01))  # targeted half width of the confidence interval
+REVIEW_SAMPLE_MIN_SIZE = int(os.environ.get('REVIEW_SAMPLE_MIN_SIZE', 50))
+REVIEW_SAMPLE_MAX_ERROR_RATE = float(os.environ.get('REVIEW_SAMPLE_MAX_ERROR_RATE', 0.03))  # bulk acceptance up to this upper bound
+REVIEW_SAMPLE_BATCH_SIZE = int(os.environ.get('REVIEW_SAMPLE_BATCH_SIZE', 1000))  # signatures per transaction when accepting in bulk
+
+# Anomaly detection on the signature intake, in memory per process (see core/intake_monitor.py)
+INTAKE_MONITOR_ENABLED = os.environ.get('INTAKE_MONITOR_ENABLED', 'True') == 'True'
+INTAKE_BASELINE_MINUTES = int(os.environ.get('INTAKE_BASELINE_MINUTES', 60))  # span of the moving baseline
+INTAKE_WARMUP_MINUTES = int(os.environ.get('INTAKE_WARMUP_MINUTES', 10))  # no flags while a new process learns
+INTAKE_ANOMALY_SIGMA = float(os.environ.get('INTAKE_ANOMALY_SIGMA', 6))  # standard deviations above the baseline
+INTAKE_ANOMALY_MIN_COUNT = int(os.environ.get('INTAKE_ANOMALY_MIN_COUNT', 30))  # signatures per minute and process
+INTAKE_REGULARITY_MAX_CV = float(os.environ.get('INTAKE_REGULARITY_MAX_CV', 0.2))  # inter-arrival variation below this is flagged
+INTAKE_THROTTLE_ENABLED = os.environ.get('INTAKE_THROTTLE_ENABLED', 'False') == 'True'  # cap flagged bursts at the threshold
+
+# Slow-query capture (see core/slow_queries.py)
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG_ENABLED', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+SLOW_QUERY_EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', 0.05))  # share of slow SELECTs run again with EXPLAIN ANALYZE
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', 500))  # ring buffer slots in the cache
+
+# Background jobs (see core/jobs.py)
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # seconds
+JOB_HEARTBEAT_INTERVAL = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 15))  # seconds
+JOB_STALE_TIMEOUT = int(os.environ.get('JOB_STALE_TIMEOUT', 120))  # seconds without heartbeat
+JOB_RETRY_BASE_DELAY = int(os.environ.get('JOB_RETRY_BASE_DELAY', 30))  # seconds
+JOB_RETRY_MAX_DELAY = int(os.environ.get('JOB_RETRY_MAX_DELAY', 3600))  # seconds
+# Uploaded paper signature lists until their import job succeeded; contain personal data, keep outside MEDIA_ROOT
+PAPER_SIGNATURE_UPLOAD_DIR = os.environ.get('PAPER_SIGNATURE_UPLOAD_DIR', str(BASE_DIR / 'paper_uploads'))
+
+# Field-level encryption of personal data (see core/encryption.py)
+# Comma separated Fernet keys, the first one encrypts; derived from SECRET_KEY if unset and DEBUG is on
+FIELD_ENCRYPTION_KEYS = [key.strip() for key in os.environ.get('FIELD_ENCRYPTION_KEYS', '').split(',') if key.strip()]
+BLIND_INDEX_KEY = os.environ.get('BLIND_INDEX_KEY', '')  # HMAC key of the lookup columns
+
+# Anonymization of signer data of archived initiatives (see core/retention.py)
+# Default days after archiving per signature status, overridden per initiative by RetentionPolicy
+RETENTION_DAYS = {
+    status: int(days) for status, days in (
+        item.split(':') for item in os.environ.get('RETENTION_DAYS', 'pending:0,rejected:0,duplicate:0,accepted:90').split(',')
+    )
+}
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))  # rows per transaction
+RETENTION_DUTY_CYCLE = float(os.environ.get('RETENTION_DUTY_CYCLE', 0.5))  # share of time spent writing, pauses fill the rest
+
+# Municipality mergers (see core/municipality_merger.py)
+MERGER_BATCH_SIZE = int(os.environ.get('MERGER_BATCH_SIZE', 5000))  # signatures per transaction
+
+# Certifications of voting rights per municipality (see core/certification.py); contain personal data, keep outside MEDIA_ROOT
+CERTIFICATION_OUTPUT_DIR = os.environ.get('CERTIFICATION_OUTPUT_DIR', str(BASE_DIR / 'certifications'))
+CERTIFICATION_WORKERS = int(os.environ.get('CERTIFICATION_WORKERS', 0))  # worker processes, 0 = number of CPUs
+
+# HTTP caching of public pages (see core/http_cache.py)
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 0))  # seconds, browsers revalidate with the ETag
+PUBLIC_CACHE_S_MAXAGE = int(os.environ.get('PUBLIC_CACHE_S_MAXAGE', 300))  # seconds at the CDN, changes are purged
+PUBLIC_CACHE_STALE_WHILE_REVALIDATE = int(os.environ.get('PUBLIC_CACHE_STALE_WHILE_REVALIDATE', 30))  # seconds
+HTTP_CACHE_RELEASE = os.environ.get('HTTP_CACHE_RELEASE', '')  # part of every ETag, change per deployment
+CDN_CACHE_TAG_HEADER = os.environ.get('CDN_CACHE_TAG_HEADER', 'Cache-Tag')  # Cloudflare; empty to omit
+CDN_PURGE_INTERVAL = int(os.environ.get('CDN_PURGE_INTERVAL', 10))  # seconds, at most one purge per tag
+# Purge by cache tag (API token with Cache Purge permission); purging is off without a zone
+CLOUDFLARE_ZONE_ID = os.environ.get('CLOUDFLARE_ZONE_ID', '')
+CLOUDFLARE_API_TOKEN = os.environ.get('CLOUDFLARE_API_TOKEN', '')
+
+# Public progress JSON API (see core/progress.py)
+PROGRESS_API_MAX_AGE = int(os.environ.get('PROGRESS_API_MAX_AGE', 15))  # seconds
+PROGRESS_API_LOCAL_TTL = float(os.environ.get('PROGRESS_API_LOCAL_TTL', 1))  # seconds a process reuses a payload
+PROGRESS_API_BATCH_LIMIT = int(os.environ.get('PROGRESS_API_BATCH_LIMIT', 50))  # initiatives per batch request
+
+# Waiting room for the signing and login pages (see core/waiting_room.py)
+WAITING_ROOM_ENABLED = os.environ.get('WAITING_ROOM_ENABLED', 'False') == 'True'
+WAITING_ROOM_INITIAL_RATE = float(os.environ.get('WAITING_ROOM_INITIAL_RATE', 20))  # admissions per second
+WAITING_ROOM_MIN_RATE = float(os.environ.get('WAITING_ROOM_MIN_RATE', 2))
+WAITING_ROOM_MAX_RATE = float(os.environ.get('WAITING_ROOM_MAX_RATE', 200))
+WAITING_ROOM_RATE_STEP = float(os.environ.get('WAITING_ROOM_RATE_STEP', 1))  # additive increase per adjustment
+WAITING_ROOM_BURST = int(os.environ.get('WAITING_ROOM_BURST', 50))  # visitors admitted at once when idle
+WAITING_ROOM_TARGET_LATENCY = float(os.environ.get('WAITING_ROOM_TARGET_LATENCY', 0.5))  # seconds
+WAITING_ROOM_ADJUST_INTERVAL = int(os.environ.get('WAITING_ROOM_ADJUST_INTERVAL', 5))  # seconds
+WAITING_ROOM_PASS_SECONDS = int(os.environ.get('WAITING_ROOM_PASS_SECONDS', 900))  # admission pass lifetime
+WAITING_ROOM_TICKET_SECONDS = int(os.environ.get('WAITING_ROOM_TICKET_SECONDS', 3600))
+WAITING_ROOM_POLL_INTERVAL = int(os.environ.get('WAITING_ROOM_POLL_INTERVAL', 5))  # seconds
+
 # Swiyu Configuration
 SWIYU_VERIFIER_API_URL = os.environ.get('SWIYU_VERIFIER_API_URL', 'http://localhost:8082')
+# Comma separated list of verifier instances to balance over (defaults to SWIYU_VERIFIER_API_URL)
+SWIYU_VERIFIER_API_URLS = [
+    url.strip() for url in os.environ.get('SWIYU_VERIFIER_API_URLS', SWIYU_VERIFIER_API_URL).split(',') if url.strip()
+]
 SWIYU_VERIFICATION_TIMEOUT = int(os.environ.get('SWIYU_VERIFICATION_TIMEOUT', 300))  # 5 minutes
 SWIYU_POLL_INTERVAL = int(os.environ.get('SWIYU_POLL_INTERVAL', 2))  # seconds
+# Rate limits for creating verifications (token buckets, see core/ratelimit.py)
+SWIYU_CLIENT_RATE = float(os.environ.get('SWIYU_CLIENT_RATE', 6))  # per client and minute
+SWIYU_CLIENT_BURST = int(os.environ.get('SWIYU_CLIENT_BURST', 3))
+SWIYU_GLOBAL_RATE = float(os.environ.get('SWIYU_GLOBAL_RATE', 20))  # all clients, per second
+SWIYU_GLOBAL_BURST = int(os.environ.get('SWIYU_GLOBAL_BURST', 50))
+# Request header with the client IP when behind a trusted proxy (e.g. HTTP_CF_CONNECTING_IP for Cloudflare)
+RATELIMIT_CLIENT_IP_HEADER = os.environ.get('RATELIMIT_CLIENT_IP_HEADER', '')
+# Login page polls with a signed token; SwiyuVerification rows are only written for finished verifications
+SWIYU_STATELESS_LOGIN = os.environ.get('SWIYU_STATELESS_LOGIN', 'False') == 'True'
+
+# Verifier client resilience (see swiyu/swiyu_service.py and swiyu/circuit_breaker.py)
+SWIYU_CONNECT_TIMEOUT = float(os.environ.get('SWIYU_CONNECT_TIMEOUT', 1))  # seconds
+SWIYU_CREATE_DEADLINE = float(os.environ.get('SWIYU_CREATE_DEADLINE', 4))  # seconds for creating a verification
+SWIYU_STATUS_DEADLINE = float(os.environ.get('SWIYU_STATUS_DEADLINE', 2))  # seconds for a status check, retries included
+SWIYU_STATUS_RETRIES = int(os.environ.get('SWIYU_STATUS_RETRIES', 2))
+SWIYU_RETRY_BACKOFF = float(os.environ.get('SWIYU_RETRY_BACKOFF', 0.1))  # seconds, doubled per retry
+SWIYU_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('SWIYU_BREAKER_FAILURE_THRESHOLD', 5))  # consecutive failures per endpoint
+SWIYU_BREAKER_RESET_TIMEOUT = int(os.environ.get('SWIYU_BREAKER_RESET_TIMEOUT', 30))  # seconds
+SWIYU_MAX_CONCURRENT_CALLS = int(os.environ.get('SWIYU_MAX_CONCURRENT_CALLS', 4))  # per process, all endpoints
 
 # CSRF and Security for Cloudflare
 CSRF_TRUSTED_ORIGINS = os.environ.get('CSRF_TRUSTED_ORIGINS', '').split(',') if os.environ.get('CSRF_TRUSTED_ORIGINS') else []
@@ -5,21 +5,28 @@ from django.views.i18n import set_language
 from django.conf import settings
 from django.conf.urls.static import static
 from core import views as core_views
+from core.admin import slow_queries_view
 
 admin.site.site_header = "Prosignum Administration"
 admin.site.site_title = "Prosignum Admin"
 admin.site.index_title = "Prosignum Management"
 
 urlpatterns = [
+    path('admin/slow-queries/', admin.site.admin_view(slow_queries_view), name='slow_queries'),
     path('admin/', admin.site.urls),
     path('i18n/setlang/', set_language, name='set_language'),
     path('swiyu/', include('swiyu.urls')),
+    path('api/municipalities/search/', core_views.municipality_search, name='municipality_search'),
+    path('api/v1/initiatives/progress/', core_views.initiatives_progress, name='initiatives_progress'),
+    path('api/v1/initiatives/<int:initiative_id>/progress/', core_views.initiative_progress, name='initiative_progress'),
+    path('api/waiting-room/status/', core_views.waiting_room_status, name='waiting_room_status'),
 ]
 
 urlpatterns += i18n_patterns(
     path('', core_views.home, name='home'),
     path('profile/', core_views.profile, name='profile'),
     path('initiative/<int:initiative_id>/sign/', core_views.sign_initiative, name='sign_initiative'),
+    path('initiative/<int:initiative_id>/results/', core_views.initiative_results, name='initiative_results'),
     path('logout/', core_views.logout_view, name='logout'),
     path('legal/', core_views.legal_notice, name='legal'),
     path('impressum/', core_views.impressum, name='impressum'),
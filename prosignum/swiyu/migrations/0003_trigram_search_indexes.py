@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:02
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built concurrently to avoid locking large tables
+    atomic = False
+
+    dependencies = [
+        ('swiyu', '0002_alter_swiyuuserprofile_birth_place'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddIndexConcurrently(
+            model_name='swiyuuserprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('given_name'), name='gin_trgm_ops'), name='swiyu_profile_given_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='swiyuuserprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('family_name'), name='gin_trgm_ops'), name='swiyu_profile_family_trgm_idx'),
+        ),
+    ]
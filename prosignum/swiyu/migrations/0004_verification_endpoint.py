@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swiyu', '0003_trigram_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='swiyuverification',
+            name='verifier_endpoint',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
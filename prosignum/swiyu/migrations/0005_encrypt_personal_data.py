@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:27
+
+import core.encryption
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('swiyu', '0004_verification_endpoint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='swiyuverification',
+            name='verified_claims',
+            field=core.encryption.EncryptedJSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, transaction
+
+
+def encrypt_existing_rows(apps, schema_editor):
+    """Encrypt plaintext verified claims, one transaction per chunk (see reencrypt_fields)"""
+    # Frozen copy of the chunk loop of core.encryption.reencrypt_model() as of this migration
+    SwiyuVerification = apps.get_model('swiyu', 'SwiyuVerification')
+    rows = SwiyuVerification.objects.filter(verified_claims__isnull=False).order_by('pk').only('pk', 'verified_claims')
+    last_pk = None
+    while True:
+        chunk = list((rows.filter(pk__gt=last_pk) if last_pk else rows)[:2000])
+        if not chunk:
+            return
+        with transaction.atomic():
+            SwiyuVerification.objects.bulk_update(chunk, ['verified_claims'], batch_size=500)
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Data only: commits per chunk, an interrupted run is simply repeated
+    atomic = False
+
+    dependencies = [
+        ('swiyu', '0005_encrypt_personal_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(encrypt_existing_rows, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex, OpClass
 import uuid
 
+from core.encryption import EncryptedJSONField
+
 
 class SwiyuVerification(models.Model):
     """Track Swiyu verification requests"""
@@ -16,10 +20,12 @@ class SwiyuVerification(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     verification_id = models.CharField(max_length=255, unique=True, db_index=True)
     verification_url = models.TextField()
+    # Verifier instance that owns the verification (status checks must go there)
+    verifier_endpoint = models.CharField(max_length=255, blank=True, default='')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
-    # Store verified claims when completed
-    verified_claims = models.JSONField(null=True, blank=True)
+    # Store verified claims when completed (encrypted)
+    verified_claims = EncryptedJSONField(null=True, blank=True)
     error_code = models.CharField(max_length=100, null=True, blank=True)
 
     # Link to user if this is for login
@@ -60,6 +66,11 @@ class SwiyuUserProfile(models.Model):
     class Meta:
         verbose_name = "Swiyu User Profile"
         verbose_name_plural = "Swiyu User Profiles"
+        indexes = [
+            # Participant admin search (icontains compiles to UPPER(col) LIKE UPPER(...))
+            GinIndex(OpClass(Upper('given_name'), name='gin_trgm_ops'), name='swiyu_profile_given_trgm_idx'),
+            GinIndex(OpClass(Upper('family_name'), name='gin_trgm_ops'), name='swiyu_profile_family_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.given_name} {self.family_name}"
@@ -1,24 +1,205 @@
 import hashlib
+import random
+import threading
+import time
 import requests
 import logging
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from django.conf import settings
+from urllib3.exceptions import NewConnectionError
+
+from .circuit_breaker import CircuitBreaker, CircuitOpen, Deadline
 
 logger = logging.getLogger(__name__)
 
+# Attempts with less time left than this are not started
+MIN_ATTEMPT_SECONDS = 0.2
+
+
+class SwiyuServiceError(Exception):
+    """The verifier rejected or could not process a request"""
+
+
+class SwiyuUnavailable(SwiyuServiceError):
+    """The verifier is unreachable, overloaded or the circuit breaker is open"""
+
+    def __init__(self, message, retry_after: Optional[float] = None, sent: bool = True):
+        super().__init__(message)
+        self.retry_after = retry_after or settings.SWIYU_BREAKER_RESET_TIMEOUT
+        # False if the request never reached the verifier (safe to send elsewhere)
+        self.sent = sent
+
+
+def _not_sent(error) -> bool:
+    """Whether a request failed before a connection to the verifier was established"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        reason = getattr(error.args[0], 'reason', None)
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class VerifierEndpoint:
+    """
+    One verifier instance with its own circuit breaker (passive health check)
+    and count of requests currently in flight from this process
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.SWIYU_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.SWIYU_BREAKER_RESET_TIMEOUT,
+        )
+        self._lock = threading.Lock()
+        self._outstanding = 0
+
+    @property
+    def outstanding(self) -> int:
+        with self._lock:
+            return self._outstanding
+
+    def start_request(self):
+        with self._lock:
+            self._outstanding += 1
+
+    def finish_request(self):
+        with self._lock:
+            self._outstanding -= 1
+
+    @property
+    def healthy(self) -> bool:
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def __repr__(self):
+        return f"<VerifierEndpoint {self.url} {self.breaker.state} outstanding={self.outstanding}>"
+
+
+_endpoints = {}
+_bulkhead = None
+_state_lock = threading.Lock()
+
+
+def get_endpoint(url: str) -> VerifierEndpoint:
+    """Process-wide state of a verifier endpoint (also for endpoints no longer configured)"""
+    url = url.rstrip('/')
+    with _state_lock:
+        if url not in _endpoints:
+            _endpoints[url] = VerifierEndpoint(url)
+        return _endpoints[url]
+
+
+def configured_endpoints():
+    return [get_endpoint(url) for url in settings.SWIYU_VERIFIER_API_URLS]
+
+
+def _get_bulkhead() -> threading.BoundedSemaphore:
+    # Caps the threads of a process waiting on the verifier at the same time
+    global _bulkhead
+    with _state_lock:
+        if _bulkhead is None:
+            _bulkhead = threading.BoundedSemaphore(settings.SWIYU_MAX_CONCURRENT_CALLS)
+        return _bulkhead
+
 
 class SwiyuVerifierService:
-    """Real Swiyu verifier service client"""
+    """
+    Real Swiyu verifier service client
+
+    New verifications are spread over all configured verifier instances
+    (SWIYU_VERIFIER_API_URLS) by least outstanding requests, skipping
+    instances whose circuit is open. Status checks go to the instance that
+    owns the verification.
+    """
 
     def __init__(self):
-        self.api_url = settings.SWIYU_VERIFIER_API_URL
+        self.endpoints = configured_endpoints()
 
-    def create_verification_request(self, purpose: str = "User Authentication") -> Tuple[str, str]:
+    def _candidates(self):
+        """Healthy endpoints, least outstanding requests first (random tie-break)"""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        random.shuffle(healthy)
+        return sorted(healthy, key=lambda endpoint: endpoint.outstanding)
+
+    def _retry_after(self):
+        return min((endpoint.breaker.retry_after() for endpoint in self.endpoints), default=None)
+
+    def _request(self, endpoint: VerifierEndpoint, method: str, path: str, deadline: Deadline,
+                 retries: int = 0, **kwargs) -> requests.Response:
+        """
+        Call a verifier endpoint within a deadline
+
+        Connection errors, timeouts, 429 and 5xx responses count as failures of
+        the endpoint's circuit breaker and are retried (up to ``retries`` times,
+        with jittered exponential backoff) as long as the deadline allows it.
+        Only idempotent requests may pass ``retries``. Raises CircuitOpen if the
+        breaker rejects the first attempt.
+        """
+        bulkhead = _get_bulkhead()
+        if not bulkhead.acquire(blocking=False):
+            raise SwiyuUnavailable("Too many concurrent requests to the Swiyu verifier", retry_after=1)
+
+        try:
+            attempt = 0
+            while True:
+                remaining = deadline.remaining()
+                if remaining < MIN_ATTEMPT_SECONDS:
+                    raise SwiyuUnavailable("Swiyu verifier did not respond in time")
+                try:
+                    endpoint.breaker.before_call()
+                except CircuitOpen as e:
+                    if attempt == 0:
+                        raise
+                    raise SwiyuUnavailable("Swiyu verifier is temporarily unavailable", retry_after=e.retry_after)
+
+                error = None
+                endpoint.start_request()
+                try:
+                    response = requests.request(
+                        method,
+                        f"{endpoint.url}{path}",
+                        timeout=(min(settings.SWIYU_CONNECT_TIMEOUT, remaining), remaining),
+                        **kwargs
+                    )
+                except requests.exceptions.RequestException as e:
+                    error = e
+                else:
+                    if response.status_code == 429 or response.status_code >= 500:
+                        error = f"HTTP {response.status_code}"
+                finally:
+                    endpoint.finish_request()
+
+                if error is None:
+                    # The verifier answered, even if it rejected the request
+                    endpoint.breaker.record_success()
+                    try:
+                        response.raise_for_status()
+                    except requests.exceptions.HTTPError as e:
+                        raise SwiyuServiceError(f"Swiyu verifier rejected the request: {e} - Response: {response.text}")
+                    return response
+
+                endpoint.breaker.record_failure()
+                logger.warning(f"Swiyu verifier {method} {endpoint.url}{path} failed (attempt {attempt + 1}): {error}")
+
+                attempt += 1
+                if attempt > retries:
+                    break
+                delay = settings.SWIYU_RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if delay + MIN_ATTEMPT_SECONDS > deadline.remaining():
+                    break
+                time.sleep(delay)
+
+            raise SwiyuUnavailable(f"Failed to communicate with Swiyu verifier: {error}", sent=not _not_sent(error))
+        finally:
+            bulkhead.release()
+
+    def create_verification_request(self, purpose: str = "User Authentication") -> Tuple[str, str, str]:
         """
         Create a verification request with Swiyu Generic Verifier
 
         Returns:
-            Tuple of (verification_id, verification_url)
+            Tuple of (verification_id, verification_url, verifier_endpoint)
         """
         # Define presentation definition for Swiss E-ID (BetaId)
         presentation_definition = {
@@ -59,72 +240,90 @@ class SwiyuVerifierService:
             "presentation_definition": presentation_definition
         }
 
-        try:
-            response = requests.post(
-                f"{self.api_url}/management/api/verifications",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-            response.raise_for_status()
+        # Creating a verification is not idempotent, so it is never retried.
+        # It only moves on to the next endpoint if nothing was sent (open
+        # circuit, connection refused or connect timeout).
+        deadline = Deadline(settings.SWIYU_CREATE_DEADLINE)
+        for endpoint in self._candidates():
+            try:
+                response = self._request(
+                    endpoint,
+                    'POST',
+                    '/management/api/verifications',
+                    deadline,
+                    json=payload,
+                    headers={"Content-Type": "application/json"},
+                )
+                break
+            except CircuitOpen:
+                continue
+            except SwiyuUnavailable as e:
+                if not e.sent and not deadline.expired:
+                    continue
+                logger.error(f"Failed to create verification request at {endpoint.url}: {e}")
+                raise
+            except SwiyuServiceError as e:
+                logger.error(f"Failed to create verification request at {endpoint.url}: {e}")
+                raise
+        else:
+            raise SwiyuUnavailable("All Swiyu verifiers are temporarily unavailable", retry_after=self._retry_after())
 
-            data = response.json()
-            verification_id = data['id']  # New API uses 'id' not 'verification_id'
-            verification_url = data['verification_url']
+        data = response.json()
+        verification_id = data['id']  # New API uses 'id' not 'verification_id'
+        verification_url = data['verification_url']
 
-            logger.info(f"Created verification request: {verification_id}")
-            return verification_id, verification_url
+        logger.info(f"Created verification request {verification_id} at {endpoint.url}")
+        return verification_id, verification_url, endpoint.url
 
-        except requests.exceptions.RequestException as e:
-            error_detail = ""
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_detail = f" - Response: {e.response.text}"
-                except:
-                    pass
-            logger.error(f"Failed to create verification request: {e}{error_detail}")
-            raise Exception(f"Failed to communicate with Swiyu verifier: {str(e)}{error_detail}")
-
-    def check_verification_status(self, verification_id: str) -> Dict:
+    def check_verification_status(self, verification_id: str, endpoint: str = '') -> Dict:
         """
         Check the status of a verification request
 
+        Args:
+            verification_id: ID returned by create_verification_request
+            endpoint: Verifier instance that owns the verification
+                (verifications created before load balancing default to the first one)
+
         Returns:
             Dict with status and verified_claims (if completed)
         """
+        owner = get_endpoint(endpoint) if endpoint else self.endpoints[0]
         try:
-            response = requests.get(
-                f"{self.api_url}/management/api/verifications/{verification_id}",
-                timeout=10
+            response = self._request(
+                owner,
+                'GET',
+                f'/management/api/verifications/{verification_id}',
+                Deadline(settings.SWIYU_STATUS_DEADLINE),
+                retries=settings.SWIYU_STATUS_RETRIES,
             )
-            response.raise_for_status()
-
-            data = response.json()
+        except CircuitOpen as e:
+            raise SwiyuUnavailable("Swiyu verifier is temporarily unavailable", retry_after=e.retry_after)
+        except SwiyuServiceError as e:
+            logger.error(f"Failed to check verification status: {e}")
+            raise
 
-            # Map new API response format to expected format
-            state = data.get('state', '').lower()  # Convert PENDING/FAILED/SUCCESS
-            # Map SUCCESS to completed for Django compatibility
-            if state == 'success':
-                state = 'completed'
+        data = response.json()
 
-            # Extract error from wallet_response if present
-            wallet_response = data.get('wallet_response', {})
-            error_code = wallet_response.get('error_code') if wallet_response else None
+        # Map new API response format to expected format
+        state = data.get('state', '').lower()  # Convert PENDING/FAILED/SUCCESS
+        # Map SUCCESS to completed for Django compatibility
+        if state == 'success':
+            state = 'completed'
 
-            # Extract verified claims from wallet_response
-            verified_claims = None
-            if wallet_response and wallet_response.get('credential_subject_data'):
-                verified_claims = wallet_response.get('credential_subject_data')
+        # Extract error from wallet_response if present
+        wallet_response = data.get('wallet_response', {})
+        error_code = wallet_response.get('error_code') if wallet_response else None
 
-            return {
-                'status': state,
-                'verified_claims': verified_claims,
-                'error': error_code
-            }
+        # Extract verified claims from wallet_response
+        verified_claims = None
+        if wallet_response and wallet_response.get('credential_subject_data'):
+            verified_claims = wallet_response.get('credential_subject_data')
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to check verification status: {e}")
-            raise Exception(f"Failed to communicate with Swiyu verifier: {str(e)}")
+        return {
+            'status': state,
+            'verified_claims': verified_claims,
+            'error': error_code
+        }
 
     @staticmethod
     def hash_eid_claims(claims: Dict) -> str:
@@ -148,7 +347,7 @@ class MockSwiyuService:
     def __init__(self):
         self._verifications = {}
 
-    def create_verification_request(self, purpose: str = "User Authentication") -> Tuple[str, str]:
+    def create_verification_request(self, purpose: str = "User Authentication") -> Tuple[str, str, str]:
         import uuid
         verification_id = str(uuid.uuid4())
         verification_url = f"openid4vp://verify?request_id={verification_id}"
@@ -159,9 +358,9 @@ class MockSwiyuService:
             'purpose': purpose
         }
 
-        return verification_id, verification_url
+        return verification_id, verification_url, 'mock'
 
-    def check_verification_status(self, verification_id: str) -> Dict:
+    def check_verification_status(self, verification_id: str, endpoint: str = '') -> Dict:
         from datetime import datetime
         if verification_id not in self._verifications:
             return {'status': 'failed', 'error': 'verification_not_found'}
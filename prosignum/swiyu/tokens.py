@@ -0,0 +1,27 @@
+"""
+Signed verification tokens for the stateless login flow
+
+In stateless mode (SWIYU_STATELESS_LOGIN) the login page does not store a
+SwiyuVerification row. Instead, the verifier's ID, the owning verifier
+instance and the expiry are signed into a token that the page polls with.
+A row is only written once the verification completes or fails.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'swiyu.verification'
+
+
+def make_verification_token(verification_id, verifier_endpoint):
+    return signing.dumps({'id': verification_id, 'endpoint': verifier_endpoint}, salt=SALT, compress=True)
+
+
+def read_verification_token(token):
+    """
+    Return (verification_id, verifier_endpoint) of a token
+
+    Raises signing.SignatureExpired once the verification has timed out and
+    signing.BadSignature for tampered tokens.
+    """
+    data = signing.loads(token, salt=SALT, max_age=settings.SWIYU_VERIFICATION_TIMEOUT)
+    return data['id'], data['endpoint']
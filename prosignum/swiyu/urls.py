@@ -5,5 +5,7 @@ app_name = 'swiyu'
 
 urlpatterns = [
     path('login/', views.swiyu_login_page, name='login'),
+    path('login/start/', views.swiyu_start_verification, name='start'),
     path('status/<uuid:verification_uuid>/', views.swiyu_check_status, name='check_status'),
+    path('status/token/<str:token>/', views.swiyu_check_token_status, name='check_token_status'),
 ]
@@ -1,42 +1,99 @@
 import qrcode
 import io
 import base64
+import math
 from datetime import timedelta
 from django.shortcuts import render, redirect
 from django.contrib.auth import login
 from django.contrib.auth.models import User
+from django.core import signing
+from django.db import transaction
 from django.http import JsonResponse
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from django.conf import settings
 
 from .models import SwiyuVerification, SwiyuUserProfile
-from .swiyu_service import SwiyuVerifierService
+from .swiyu_service import SwiyuVerifierService, SwiyuUnavailable, configured_endpoints
+from .tokens import make_verification_token, read_verification_token
 from core.models import Participant
+from core.ratelimit import TokenBucket, check_rate_limits, client_key
+from core.waiting_room import measured_latency, waiting_room
 
 
+# Only renders; the verifier call is measured in swiyu_start_verification
+@waiting_room(measure=False)
 def swiyu_login_page(request):
-    """Display the Swiyu E-ID login page with QR code"""
+    """
+    Display the Swiyu E-ID login page
+
+    The verification (and its QR code) is only created once the user starts
+    the E-ID step, so page views by crawlers or reloads never reach the verifier.
+    """
 
     if request.user.is_authenticated:
         return redirect('/')
 
+    # Fail fast while every verifier instance is known to be down
+    endpoints = configured_endpoints()
+    if not any(endpoint.healthy for endpoint in endpoints):
+        return _unavailable_page(request, min(endpoint.breaker.retry_after() for endpoint in endpoints))
+
+    context = {
+        'start_url': reverse('swiyu:start'),
+        'expires_in': getattr(settings, 'SWIYU_VERIFICATION_TIMEOUT', 300),
+        'poll_interval': getattr(settings, 'SWIYU_POLL_INTERVAL', 2),
+    }
+    return render(request, 'swiyu/login.html', context)
+
+
+@require_http_methods(["POST"])
+@waiting_room(measure=False, json=True)
+def swiyu_start_verification(request):
+    """AJAX endpoint creating a verification request and its QR code"""
+
+    if request.user.is_authenticated:
+        return JsonResponse({'status': 'completed', 'redirect': '/'})
+
+    allowed, retry_after = check_rate_limits(
+        TokenBucket(f'swiyu:client:{client_key(request)}', settings.SWIYU_CLIENT_RATE / 60, settings.SWIYU_CLIENT_BURST),
+        TokenBucket('swiyu:global', settings.SWIYU_GLOBAL_RATE, settings.SWIYU_GLOBAL_BURST),
+    )
+    if not allowed:
+        retry_after = math.ceil(retry_after)
+        response = JsonResponse({
+            'status': 'rate_limited',
+            'retry_after': retry_after,
+            'message': 'Too many login attempts, please wait'
+        }, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
     try:
         # Create verification request
         service = SwiyuVerifierService()
-        verification_id, verification_url = service.create_verification_request(
-            purpose="Login to Prosignum"
-        )
+        with measured_latency():
+            verification_id, verification_url, verifier_endpoint = service.create_verification_request(
+                purpose="Login to Prosignum"
+            )
 
-        # Store verification in database
         timeout = getattr(settings, 'SWIYU_VERIFICATION_TIMEOUT', 300)
-        expires_at = timezone.now() + timedelta(seconds=timeout)
-        verification = SwiyuVerification.objects.create(
-            verification_id=verification_id,
-            verification_url=verification_url,
-            status='pending',
-            expires_at=expires_at
-        )
+        if settings.SWIYU_STATELESS_LOGIN:
+            # No database write: the page polls with a signed token
+            token = make_verification_token(verification_id, verifier_endpoint)
+            status_url = reverse('swiyu:check_token_status', args=[token])
+        else:
+            # Store verification in database
+            expires_at = timezone.now() + timedelta(seconds=timeout)
+            verification = SwiyuVerification.objects.create(
+                verification_id=verification_id,
+                verification_url=verification_url,
+                verifier_endpoint=verifier_endpoint,
+                status='pending',
+                expires_at=expires_at
+            )
+            status_url = reverse('swiyu:check_status', args=[verification.id])
 
         # Generate QR code
         qr = qrcode.QRCode(
@@ -56,19 +113,21 @@ def swiyu_login_page(request):
         img.save(buffer, format='PNG')
         qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
 
-        poll_interval = getattr(settings, 'SWIYU_POLL_INTERVAL', 2)
-
-        context = {
-            'verification_id': str(verification.id),
+        return JsonResponse({
+            'status': 'pending',
+            'status_url': status_url,
             'qr_code': qr_code_base64,
             'expires_in': timeout,
-            'poll_interval': poll_interval,
-        }
+        })
 
-        return render(request, 'swiyu/login.html', context)
+    except SwiyuUnavailable as e:
+        return _unavailable_status(e.retry_after)
 
     except Exception as e:
-        return render(request, 'swiyu/error.html', {'error': str(e)})
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
 
 
 @require_http_methods(["GET"])
@@ -96,7 +155,10 @@ def swiyu_check_status(request, verification_uuid):
 
         # Check with Swiyu API
         service = SwiyuVerifierService()
-        result = service.check_verification_status(verification.verification_id)
+        try:
+            result = service.check_verification_status(verification.verification_id, verification.verifier_endpoint)
+        except SwiyuUnavailable as e:
+            return _unavailable_status(e.retry_after)
 
         if result['status'] == 'completed':
             # Verification successful
@@ -142,6 +204,99 @@ def swiyu_check_status(request, verification_uuid):
         }, status=500)
 
 
+@require_http_methods(["GET"])
+def swiyu_check_token_status(request, token):
+    """AJAX endpoint to check verification status in stateless mode (signed token instead of a row)"""
+
+    try:
+        verification_id, verifier_endpoint = read_verification_token(token)
+    except signing.SignatureExpired:
+        return JsonResponse({
+            'status': 'expired',
+            'message': 'Verification request expired'
+        })
+    except signing.BadSignature:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Verification not found'
+        }, status=404)
+
+    try:
+        # Finished verifications are persisted, later polls are answered from the row
+        verification = SwiyuVerification.objects.filter(verification_id=verification_id).first()
+        if verification is not None:
+            return JsonResponse({
+                'status': verification.status,
+                'redirect': '/' if verification.status == 'completed' else None
+            })
+
+        service = SwiyuVerifierService()
+        try:
+            result = service.check_verification_status(verification_id, verifier_endpoint)
+        except SwiyuUnavailable as e:
+            return _unavailable_status(e.retry_after)
+
+        if result['status'] not in ['completed', 'failed']:
+            # Still pending
+            return JsonResponse({
+                'status': 'pending'
+            })
+
+        with transaction.atomic():
+            verification, created = SwiyuVerification.objects.get_or_create(
+                verification_id=verification_id,
+                defaults={
+                    'verifier_endpoint': verifier_endpoint,
+                    'status': result['status'],
+                    'verified_claims': result['verified_claims'],
+                    'error_code': result.get('error'),
+                    'expires_at': timezone.now(),
+                },
+            )
+            if created and verification.status == 'completed':
+                # Only the poll that persisted the result logs in
+                user = _get_or_create_user_from_claims(result['verified_claims'])
+                verification.user = user
+                verification.save(update_fields=['user', 'updated_at'])
+                login(request, user)
+
+        if verification.status == 'completed':
+            return JsonResponse({
+                'status': 'completed',
+                'redirect': '/'
+            })
+        return JsonResponse({
+            'status': 'failed',
+            'error': verification.error_code
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=500)
+
+
+def _unavailable_status(retry_after):
+    """Status response while the verifier is unreachable: keep the client polling, but slower"""
+    retry_after = math.ceil(retry_after)
+    response = JsonResponse({
+        'status': 'unavailable',
+        'retry_after': retry_after,
+        'message': 'Verifier temporarily unavailable'
+    }, status=503)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _unavailable_page(request, retry_after):
+    """Fast-fail page while the verifier is unreachable"""
+    retry_after = math.ceil(retry_after)
+    response = render(request, 'swiyu/unavailable.html', {'retry_after': retry_after}, status=503)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
 def _get_or_create_user_from_claims(claims: dict) -> User:
     """
     Get or create a Django user from Swiyu verified claims